@@ -0,0 +1,121 @@
+"""
+Benchmark tra cứu tín chỉ / gợi ý môn học của trợ lý học tập (frontend/app.py) trên file điểm giả lập.
+So sánh cách cũ (đọc lại cả 2 file CSV + lọc + merge cho mỗi tin nhắn) với AcademicRecords
+(đọc một lần, tra theo mã sinh viên), và thời gian đọc lại khi file điểm thay đổi.
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_academic_records --students 50000 --courses-per-student 40
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.academic.records import AcademicRecords, TOTAL_CREDITS_REQUIRED
+
+
+def write_fixtures(directory: str, students: int, courses_per_student: int, curriculum_size: int, seed: int):
+    rng = np.random.default_rng(seed)
+    course_ids = [f"TEE{index:04d}" for index in range(curriculum_size)]
+    curriculum = pd.DataFrame({
+        "Mã HP": course_ids,
+        "Tên HP": [f"Học phần {index}" for index in range(curriculum_size)],
+        "Số TC": rng.integers(2, 5, size=curriculum_size),
+        # Tối đa 2 môn tiên quyết, luôn là môn đứng trước trong CTĐT (đồ thị không chu trình)
+        "Học phần tiên quyết": [
+            ", ".join(rng.choice(course_ids[:index], size=min(index, int(rng.integers(0, 3))), replace=False))
+            for index in range(curriculum_size)
+        ],
+    })
+    student_ids = np.array([f"K{2000000000 + index:011d}" for index in range(students)])
+    grades = pd.DataFrame({
+        "Mã sinh viên": np.repeat(student_ids, courses_per_student),
+        "Mã MH": rng.choice(course_ids, size=students * courses_per_student),
+        "Điểm": rng.uniform(0, 10, size=students * courses_per_student).round(1),
+    }).sample(frac=1.0, random_state=seed)
+    grades_path = os.path.join(directory, "grades.csv")
+    curriculum_path = os.path.join(directory, "curriculum.csv")
+    grades.to_csv(grades_path, index=False)
+    curriculum.to_csv(curriculum_path, index=False)
+    return grades_path, curriculum_path, student_ids.tolist()
+
+
+def legacy_lookup(grades_path: str, curriculum_path: str, student_id: str):
+    """Đúng các bước của frontend/app.py trước đây."""
+    df_diem = pd.read_csv(grades_path)
+    df_ctdt = pd.read_csv(curriculum_path)
+    student_courses = df_diem[df_diem['Mã sinh viên'].str.strip() == student_id.strip()]
+    merged_data = pd.merge(student_courses, df_ctdt, left_on='Mã MH', right_on='Mã HP', how='left')
+    total_credits_earned = merged_data[merged_data['Điểm'] >= 4.0]['Số TC'].sum()
+    all_courses = df_ctdt[['Mã HP', 'Tên HP', 'Số TC']]
+    untaken_courses = all_courses[~all_courses['Mã HP'].isin(set(student_courses['Mã MH']))]
+    return total_credits_earned, untaken_courses.sort_values(by='Số TC', ascending=False).head(5)
+
+
+def store_lookup(records: AcademicRecords, student_id: str):
+    record = records.student(student_id)
+    suggestions = records.untaken_courses(record).sort_values(by="Số TC", ascending=False).head(5)
+    return record.credits_earned, suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--courses-per-student", type=int, default=40)
+    parser.add_argument("--curriculum-size", type=int, default=60)
+    parser.add_argument("--legacy-lookups", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        grades_path, curriculum_path, student_ids = write_fixtures(
+            directory, args.students, args.courses_per_student, args.curriculum_size, args.seed)
+        print(f"Fixtures: {args.students} students x {args.courses_per_student} rows, "
+              f"{os.path.getsize(grades_path) / 1e6:.1f} MB grades CSV ({time.perf_counter() - start:.1f}s)")
+        rng = random.Random(args.seed)
+
+        legacy = []
+        for student_id in rng.sample(student_ids, args.legacy_lookups):
+            start = time.perf_counter()
+            legacy_lookup(grades_path, curriculum_path, student_id)
+            legacy.append(time.perf_counter() - start)
+        print(f"Legacy (read_csv + filter + merge per message): "
+              f"mean={statistics.mean(legacy) * 1000:.1f}ms over {len(legacy)} lookups")
+
+        records = AcademicRecords(grades_path, curriculum_path)
+        start = time.perf_counter()
+        records.snapshot()
+        print(f"AcademicRecords initial load: {time.perf_counter() - start:.2f}s")
+
+        # Kết quả phải khớp cách cũ khi không có môn học lại
+        sample = rng.choice(student_ids)
+        new_credits, _ = store_lookup(records, sample)
+        print(f"Sample {sample}: {new_credits:.0f} / {TOTAL_CREDITS_REQUIRED} credits "
+              f"(legacy, counting retakes twice: {legacy_lookup(grades_path, curriculum_path, sample)[0]:.0f})")
+
+        lookups = []
+        for student_id in rng.choices(student_ids, k=args.lookups):
+            start = time.perf_counter()
+            store_lookup(records, student_id)
+            lookups.append(time.perf_counter() - start)
+        lookups.sort()
+        print(f"AcademicRecords lookup: p50={lookups[len(lookups) // 2] * 1000:.2f}ms "
+              f"p95={lookups[int(len(lookups) * 0.95) - 1] * 1000:.2f}ms over {len(lookups)} lookups")
+
+        # Ghi lại file điểm: lần tra tiếp theo (sau check_interval) phải đọc lại
+        os.utime(grades_path, None)
+        records._checked_at = 0.0
+        start = time.perf_counter()
+        records.student(sample)
+        print(f"Reload after grades file change: {time.perf_counter() - start:.2f}s (loads={records.loads})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark các loại index FAISS (flat / hnsw / ivfpq) trên kho vector tổng hợp: thời gian build,
+bộ nhớ (kích thước index khi serialize), độ trễ mỗi truy vấn và recall@k so với tìm kiếm chính xác,
+quét nprobe (IVF-PQ) và efSearch (HNSW).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_ann_index --sizes 10000 100000 1000000 --dim 384
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from core.retreival.index_factory import build_index, set_search_params
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int):
+    """Vector dạng cụm (gần với embedding thật hơn phân phối đều)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(16, n // 1000), dim)).astype(np.float32)
+    def sample(count):
+        points = centers[rng.integers(len(centers), size=count)]
+        return (points + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+    return sample(n), sample(n_queries)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def run(index, queries, truth, k: int, label: str) -> None:
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query[None, :], k)
+    latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+    _, found = index.search(queries, k)
+    print(f"  {label:22s} {latency_ms:8.3f}ms/query recall@{k}={recall_at_k(found, truth, k):.3f}")
+
+
+def main(args) -> None:
+    faiss.omp_set_num_threads(args.threads)
+    for n in args.sizes:
+        vectors, queries = synthetic_corpus(n, args.dim, args.queries, args.seed)
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+        print(f"n={n} dim={args.dim}")
+
+        for index_type in ("flat", "hnsw", "ivfpq"):
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, {"hnsw_m": args.hnsw_m, "pq_m": args.pq_m})
+            index.add(vectors)
+            build_s = time.perf_counter() - start
+            memory_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+            print(f" {index_type:6s} ({type(index).__name__}) build={build_s:.1f}s memory={memory_mb:.1f}MB")
+            if isinstance(index, faiss.IndexHNSW):
+                for ef_search in args.ef_search:
+                    set_search_params(index, ef_search=ef_search)
+                    run(index, queries, truth, args.k, f"efSearch={ef_search}")
+            elif isinstance(index, faiss.IndexIVF):
+                for nprobe in args.nprobe:
+                    set_search_params(index, nprobe=nprobe)
+                    run(index, queries, truth, args.k, f"nprobe={nprobe}")
+            else:
+                run(index, queries, truth, args.k, "exact")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384, help="384 = paraphrase-multilingual-MiniLM")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--threads", type=int, default=1, help="Số thread OpenMP của FAISS")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""
+Load benchmark cho /ask: so sánh throughput khi xử lý đồng bộ (trước) và async (sau).
+
+LLM được thay bằng FakeLLM có độ trễ cố định nên không cần API key.
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_ask_concurrency --requests 64 --concurrency 16 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from langchain_core.documents import Document
+
+import serve
+from core.llm.fake_llm import FakeLLM
+from core.llm.registry import LLM_BACKEND, register_llm
+
+
+def install_stubs(llm_latency: float) -> None:
+    # ASGITransport không chạy lifespan: tự warm-up (load index, model) trước khi đo
+    serve.start_warmup()
+    serve.warmup.wait()
+    register_llm(LLM_BACKEND, FakeLLM(latency=llm_latency))
+
+    if serve.vector_Hugging.vector_db is None:
+        # Không có index: dùng context cố định để request vẫn đi tới LLM
+        def fixed_retrivel(state):
+            return {**state, "context": [Document(page_content="Học phí năm học 2025-2026.")]}
+        serve.retrivel = fixed_retrivel
+
+    @serve.app.post("/ask_blocking", include_in_schema=False)
+    async def ask_blocking(request: serve.QuestionRequest):
+        # Handler cũ: retrieval + generate chạy thẳng trên event loop
+        state = {"question": request.question, "context": [], "answer": ""}
+        state = serve.retrivel(state)
+        return serve.generate(state)
+
+
+async def run_load(client: httpx.AsyncClient, path: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json={"question": f"Học phí ngành Kỹ thuật máy tính? #{i}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def probe_static():
+        # Đo độ trễ của trang tĩnh trong lúc đang tải /ask
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await client.get("/login")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(probe_static(), *(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput_rps": total / elapsed,
+        "p50_s": latencies[len(latencies) // 2],
+        "p95_s": latencies[int(len(latencies) * 0.95) - 1],
+        "static_page_s": results[0],
+    }
+
+
+async def main(args) -> None:
+    install_stubs(args.llm_latency)
+    transport = httpx.ASGITransport(app=serve.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, path in (("before (blocking)", "/ask_blocking"), ("after (async)", "/ask")):
+            stats = await run_load(client, path, args.requests, args.concurrency)
+            print(f"{label:18s} throughput={stats['throughput_rps']:.2f} req/s "
+                  f"p50={stats['p50_s']:.3f}s p95={stats['p95_s']:.3f}s "
+                  f"static_page={stats['static_page_s']:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""
+So sánh time-to-first-byte của /ask và /ask/stream với FakeLLM (không cần API key).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_ask_stream_ttfb --llm-latency 3
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import serve
+from benchmarks.bench_ask_concurrency import install_stubs
+
+
+async def measure(path: str, question: str):
+    """Gọi thẳng ASGI app (httpx.ASGITransport gom cả body nên không đo được TTFB)."""
+    body = json.dumps({"question": question}).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    start = time.perf_counter()
+    first_byte = None
+
+    async def send(message):
+        nonlocal first_byte
+        if message["type"] == "http.response.body" and message.get("body") and first_byte is None:
+            first_byte = time.perf_counter() - start
+
+    await serve.app(scope, receive, send)
+    return first_byte, time.perf_counter() - start
+
+
+async def main(args) -> None:
+    install_stubs(args.llm_latency)
+    for path in ("/ask", "/ask/stream"):
+        ttfb, total = await measure(path, "Học phí ngành Kỹ thuật máy tính là bao nhiêu?")
+        print(f"{path:12s} ttfb={ttfb:.3f}s total={total:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=3.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+Load benchmark đăng ký / đăng nhập đầu học kỳ: nhiều sinh viên đăng ký rồi đăng nhập cùng lúc.
+Đo throughput, p50/p95 và độ trễ của /api/me (kiểm tra token, không bcrypt) trong lúc đang tải —
+nếu bcrypt chạy trên event loop thì /api/me phải chờ. Dùng DB người dùng tạm (USER_DB_PATH).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_auth --users 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("USER_DB_PATH", os.path.join(tempfile.mkdtemp(), "users.sqlite3"))
+
+import serve  # noqa: E402
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return f"p50={latencies[len(latencies) // 2]:.3f}s p95={latencies[int(len(latencies) * 0.95) - 1]:.3f}s"
+
+
+async def run_phase(client: httpx.AsyncClient, label: str, requests, concurrency: int, token: str) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(path: str, body: dict):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def probe_me():
+        # Kiểm tra token trong lúc đang tải
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        (await client.get("/api/me", headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(probe_me(), *(one(path, body) for path, body in requests))
+    elapsed = time.perf_counter() - start
+    print(f"{label:10s} {len(requests) / elapsed:.1f} req/s {summarize(latencies)} /api/me={results[0]:.3f}s")
+
+
+async def main(args) -> None:
+    transport = httpx.ASGITransport(app=serve.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        admin = await client.post("/api/login", json={"email": serve.ADMIN_EMAIL, "password": serve.ADMIN_PASSWORD_PLAIN})
+        token = admin.json()["token"]
+        run_id = int(time.time())
+        users = [{"fullname": f"Sinh viên {i}", "email": f"sv{run_id}_{i}@tnut.edu.vn", "role": "student",
+                  "password": f"matkhau{i}"} for i in range(args.users)]
+        await run_phase(client, "register", [("/api/register", user) for user in users], args.concurrency, token)
+        for pending in (await client.get("/api/pending-users")).json():
+            await client.post(f"/api/approve-user/{pending['id']}")
+        logins = [("/api/login", {"email": user["email"], "password": user["password"]}) for user in users]
+        await run_phase(client, "login", logins, args.concurrency, token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""
+Benchmark embed chunks khi build index: cách cũ (HuggingFaceEmbeddings.embed_documents mặc định)
+so với BulkEmbedder (batch sắp theo độ dài, tùy chọn multi-process), kèm kiểm tra vector giống nhau
+(sai khác tối đa vượt --tolerance thì thoát với mã lỗi).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_bulk_embed --batch-sizes 32 64 128 --multi-process
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from config.config import MODEL_NAME_EMBEDDING
+from core.embeding.bulk_embed import BulkEmbedder
+
+
+def load_chunk_texts(limit: int):
+    # Import muộn: chỉ cần serve để đọc và chia chunk tài liệu trong DOCUMENT_DIR
+    from serve import DOCUMENT_DIR, load_documents_from_dir, processor
+    chunks = processor.split_text(load_documents_from_dir(DOCUMENT_DIR))
+    texts = [chunk.page_content for chunk in chunks]
+    return texts[:limit] if limit else texts
+
+
+def main(args) -> None:
+    texts = load_chunk_texts(args.limit)
+    embeddings = HuggingFaceEmbeddings(model_name=MODEL_NAME_EMBEDDING)
+    print(f"{len(texts)} chunks")
+
+    start = time.perf_counter()
+    baseline = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    elapsed = time.perf_counter() - start
+    print(f"{'default embed_documents':32s} {len(texts) / elapsed:8.1f} chunks/sec")
+
+    # Chunk có xuống dòng: embed_documents thay "\n" bằng khoảng trắng, BulkEmbedder phải làm giống vậy
+    multiline = sum("\n" in text for text in texts)
+    print(f"{multiline} chunks contain newlines")
+
+    failed = []
+    configs = [(batch_size, False) for batch_size in args.batch_sizes]
+    if args.multi_process:
+        configs += [(batch_size, True) for batch_size in args.batch_sizes]
+    for batch_size, multi_process in configs:
+        embedder = BulkEmbedder(embeddings, batch_size=batch_size, multi_process=multi_process)
+        vectors = embedder.embed_texts(texts)
+        label = f"bulk batch={batch_size}{' multi-process' if multi_process else ''}"
+        diff = float(np.abs(vectors - baseline).max())
+        if diff > args.tolerance:
+            failed.append(label)
+        print(f"{label:32s} {embedder.last_stats['chunks_per_sec']:8.1f} chunks/sec "
+              f"max|diff|={diff:.2e}{'' if diff <= args.tolerance else '  MISMATCH'}")
+    if failed:
+        sys.exit(f"Bulk vectors differ from embed_documents by more than {args.tolerance:g}: {failed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--multi-process", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1e-4,
+                        help="Sai khác tối đa cho phép so với embed_documents")
+    parser.add_argument("--limit", type=int, default=0, help="Chỉ dùng N chunk đầu (0 = tất cả)")
+    main(parser.parse_args())
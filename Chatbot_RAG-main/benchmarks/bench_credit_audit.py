@@ -0,0 +1,71 @@
+"""
+Benchmark API kiểm tra tín chỉ (/api/students/{id}/audit và /api/students/audit) trên dữ liệu điểm giả lập
+có cột môn tiên quyết. So sánh kiểm tra từng sinh viên một (cách của trợ lý Streamlit) với CreditAuditor
+tính theo lô cho cả khoá, và độ trễ một sinh viên khi chưa / đã có trong cache.
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_credit_audit --students 50000 --cohort-size 5000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks.bench_academic_records import store_lookup, write_fixtures
+from core.academic.audit import CreditAuditor
+from core.academic.records import AcademicRecords
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--courses-per-student", type=int, default=40)
+    parser.add_argument("--curriculum-size", type=int, default=60)
+    parser.add_argument("--cohort-size", type=int, default=5000)
+    parser.add_argument("--max-term-credits", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        grades_path, curriculum_path, student_ids = write_fixtures(
+            directory, args.students, args.courses_per_student, args.curriculum_size, args.seed)
+        records = AcademicRecords(grades_path, curriculum_path)
+        records.snapshot()
+        cohort = random.Random(args.seed).sample(student_ids, args.cohort_size)
+
+        start = time.perf_counter()
+        for student_id in cohort:
+            store_lookup(records, student_id)
+        per_student = time.perf_counter() - start
+        print(f"Per-student lookups (Streamlit path, no prerequisites): {per_student:.2f}s "
+              f"for {len(cohort)} students")
+
+        auditor = CreditAuditor(records, max_term_credits=args.max_term_credits)
+        start = time.perf_counter()
+        auditor._current_tables()
+        print(f"Audit tables (student x course matrices + prerequisite DAG): {time.perf_counter() - start:.2f}s, "
+              f"{auditor.stats()['prerequisite_edges']} prerequisite edges")
+
+        start = time.perf_counter()
+        results = auditor.audit_many(cohort)
+        print(f"Batch audit: {time.perf_counter() - start:.2f}s for {len(results)} students")
+
+        sample = results[cohort[0]]
+        print(f"Sample {sample['student_id']}: {sample['credits_earned']:.0f} credits, "
+              f"{len(sample['recommendations'])} courses / {sample['recommended_credits']:.0f} credits recommended")
+
+        fresh = [student_id for student_id in student_ids if student_id not in results][:200]
+        for label, ids in (("cold", fresh), ("cached", fresh)):
+            latencies = []
+            for student_id in ids:
+                start = time.perf_counter()
+                auditor.audit(student_id)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(f"Single audit ({label}): p50={latencies[len(latencies) // 2] * 1000:.2f}ms "
+                  f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f}ms")
+        print(f"Cache: {auditor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
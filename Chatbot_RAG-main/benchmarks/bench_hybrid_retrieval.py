@@ -0,0 +1,88 @@
+"""
+Benchmark truy xuất dense (FAISS) so với hybrid (FAISS + BM25, gộp RRF) trên vector store của data/.
+Không có bộ câu hỏi gán nhãn nên dùng truy vấn "known-item": lấy một đoạn ngắn (ưu tiên đoạn chứa mã HP)
+từ một chunk ngẫu nhiên, chunk đó là đáp án đúng; đo recall@k và độ trễ từng bước.
+Chạy từ thư mục Chatbot_RAG-main (cần vectordb/ đã build):
+
+    python -m benchmarks.bench_hybrid_retrieval --queries 200 --k 3 5 7
+"""
+import argparse
+import random
+import re
+import time
+
+import numpy as np
+
+from core.retreival.hybrid import dense_search_ids, reciprocal_rank_fusion
+
+CODE_RE = re.compile(r"\b[A-Z]{2,}\d{3,}\w*\b")
+
+
+def sample_queries(vector_db, n: int, words: int, seed: int):
+    """[(query, relevant_id)]: đoạn quanh mã HP nếu chunk có mã, ngược lại một cửa sổ từ ngẫu nhiên."""
+    rng = random.Random(seed)
+    ids = list(vector_db.index_to_docstore_id.values())
+    rng.shuffle(ids)
+    queries = []
+    for doc_id in ids:
+        tokens = vector_db.docstore.search(doc_id).page_content.split()
+        if len(tokens) < words:
+            continue
+        code_positions = [i for i, token in enumerate(tokens) if CODE_RE.search(token)]
+        start = rng.choice(code_positions) if code_positions else rng.randrange(len(tokens) - words + 1)
+        start = max(0, min(start - words // 2, len(tokens) - words))
+        queries.append((" ".join(tokens[start:start + words]), doc_id))
+        if len(queries) == n:
+            break
+    return queries
+
+
+def main(args) -> None:
+    # Import muộn: serve dựng HuggingEmbed + vector store (kèm BM25) khi import
+    from serve import start_warmup, vector_Hugging, warmup
+    start_warmup()
+    warmup.wait()
+    vector_db, bm25 = vector_Hugging.vector_db, vector_Hugging.bm25
+    queries = sample_queries(vector_db, args.queries, args.words, args.seed)
+    max_k = max(args.k)
+    print(f"{vector_db.index.ntotal} chunks, {len(bm25.postings)} BM25 terms, {len(queries)} queries")
+
+    timings = {"embed": [], "dense": [], "bm25": [], "rrf": []}
+    dense_runs, hybrid_runs = [], []
+    for question, relevant in queries:
+        start = time.perf_counter()
+        embedding = vector_Hugging.embeddings.embed_query(question)
+        timings["embed"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        dense = dense_search_ids(vector_db, embedding, args.fetch_k)
+        timings["dense"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sparse = [doc_id for doc_id, _ in bm25.search(question, args.fetch_k)]
+        timings["bm25"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fused = reciprocal_rank_fusion([dense, sparse])
+        timings["rrf"].append(time.perf_counter() - start)
+
+        dense_runs.append((dense[:max_k], relevant))
+        hybrid_runs.append((fused[:max_k], relevant))
+
+    for name, values in timings.items():
+        values = np.array(values) * 1000
+        print(f"{name:6s} p50={np.percentile(values, 50):8.3f}ms p95={np.percentile(values, 95):8.3f}ms")
+    for k in args.k:
+        dense_recall = np.mean([relevant in ranked[:k] for ranked, relevant in dense_runs])
+        hybrid_recall = np.mean([relevant in ranked[:k] for ranked, relevant in hybrid_runs])
+        print(f"recall@{k}: dense={dense_recall:.3f} hybrid={hybrid_recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=6, help="Số từ trong mỗi truy vấn")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 7])
+    parser.add_argument("--fetch-k", type=int, default=20, help="Số kết quả mỗi retriever trước khi gộp")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
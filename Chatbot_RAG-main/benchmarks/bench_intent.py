@@ -0,0 +1,140 @@
+"""
+Microbenchmark phân loại intent: automaton Aho-Corasick (core.rag.intent) so với cách cũ quét
+từng từ khóa bằng `in` trên câu hỏi; kèm độ chính xác trên bộ câu hỏi gán nhãn (có dấu / không dấu).
+Trước khi đo, kiểm tra định tuyến câu hỏi lẫn từ khóa sinh viên / tuyển sinh (thoát với mã lỗi nếu sai).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_intent --repeat 2000
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from core.rag.intent import GENERAL, IntentClassifier
+
+DEFAULT_LABELS = Path(__file__).with_name("intent_questions.jsonl")
+
+# Từ khóa của classify_intent() cũ trong serve.py
+OLD_STUDENT_KEYWORDS = ["điểm", "sinh viên", "lớp", "thời khóa biểu", "mã số sinh viên", "học kỳ"]
+OLD_ADMISSION_KEYWORDS = ["tuyển sinh", "ngành", "điểm chuẩn", "xét tuyển", "khối", "học phí"]
+
+
+def old_classify(question: str) -> str:
+    lower_q = question.lower()
+    is_student_query = any(keyword in lower_q for keyword in OLD_STUDENT_KEYWORDS)
+    is_admission_query = any(keyword in lower_q for keyword in OLD_ADMISSION_KEYWORDS)
+    if is_student_query and not is_admission_query:
+        return "student"
+    if is_admission_query and not is_student_query:
+        return "admission"
+    return GENERAL
+
+
+# Câu hỏi lẫn từ khóa của hai intent: (câu hỏi, intent khi exclusive=True, intent khi exclusive=False).
+# exclusive=True giữ quy tắc của classify_intent cũ: có từ khóa của cả hai thì dùng prompt chung.
+MIXED_QUESTIONS = [
+    ("Học phí của sinh viên năm nhất là bao nhiêu?", GENERAL, "admission"),
+    ("hoc phi cua sinh vien nam nhat", GENERAL, "admission"),
+    ("Sinh viên ngành Điện học kỳ 2 học những gì?", GENERAL, "student"),
+    ("Lớp ngành Cơ khí có bao nhiêu sinh viên?", GENERAL, "student"),
+    ("Sinh viên ngành Điện", GENERAL, GENERAL),
+    # "điểm" nằm trong "điểm chuẩn" không được tính: chỉ còn từ khóa tuyển sinh
+    ("Điểm chuẩn ngành Kỹ thuật điện năm 2024", "admission", "admission"),
+    ("Điểm thi học kỳ của sinh viên", "student", "student"),
+]
+
+
+def check_mixed(routes=None) -> bool:
+    """Kiểm tra intent của MIXED_QUESTIONS ở cả hai chế độ; in các câu sai."""
+    ok = True
+    for exclusive, column in ((True, 1), (False, 2)):
+        classifier = IntentClassifier(routes, exclusive=exclusive)
+        for case in MIXED_QUESTIONS:
+            result = classifier.classify(case[0])
+            if result.intent != case[column]:
+                ok = False
+                print(f"  x exclusive={exclusive}: {case[0]!r} -> {result.intent} "
+                      f"(cần {case[column]}, điểm {result.scores})")
+    print(f"Câu hỏi lẫn từ khóa: {'OK' if ok else 'SAI'} ({len(MIXED_QUESTIONS)} câu x 2 chế độ)")
+    return ok
+
+
+def load_labels(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def accuracy(name: str, classify, labeled) -> None:
+    correct, confusion = 0, Counter()
+    for item in labeled:
+        predicted = classify(item["question"])
+        correct += predicted == item["intent"]
+        if predicted != item["intent"]:
+            confusion[(item["intent"], predicted)] += 1
+    print(f"{name}: accuracy {correct}/{len(labeled)} = {correct / len(labeled):.1%}")
+    for (expected, predicted), count in confusion.most_common():
+        print(f"    {expected} -> {predicted}: {count}")
+
+
+def throughput(name: str, classify, questions, repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            classify(question)
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {elapsed / (repeat * len(questions)) * 1e6:.1f} µs / câu hỏi")
+
+
+def main(args) -> None:
+    # Các câu kiểm tra dựa trên từ khóa của bảng định tuyến mặc định
+    if not args.routes and not check_mixed():
+        sys.exit(1)
+    labeled = load_labels(args.labels)
+    start = time.perf_counter()
+    classifier = IntentClassifier.from_file(args.routes) if args.routes else IntentClassifier()
+    print(f"Dựng automaton ({len(classifier._keywords)} từ khóa): {(time.perf_counter() - start) * 1e3:.2f} ms")
+    print(f"{len(labeled)} câu hỏi gán nhãn: {dict(Counter(item['intent'] for item in labeled))}")
+
+    new_classify = lambda question: classifier.classify(question).intent
+    accuracy("keyword scan cũ", old_classify, labeled)
+    accuracy("automaton", new_classify, labeled)
+    if args.verbose:
+        for item in labeled:
+            result = classifier.classify(item["question"])
+            mark = " " if result.intent == item["intent"] else "x"
+            print(f"  {mark} {result.intent:<9} {result.confidence:.2f} {result.matches} | {item['question']}")
+
+    questions = [item["question"] for item in labeled]
+    throughput("keyword scan cũ", old_classify, questions, args.repeat)
+    throughput("automaton", new_classify, questions, args.repeat)
+
+    # Bảng định tuyến lớn (vd. thêm tên học phần / phòng ban): scan cũ tăng tuyến tính theo số từ khóa
+    for extra in args.scale:
+        keywords = [f"học phần mẫu số {i}" for i in range(extra)]
+        routes = {intent: {"keywords": dict(route["keywords"])} for intent, route in classifier.routes.items()}
+        routes["student"]["keywords"].update(dict.fromkeys(keywords, 1.0))
+        scaled = IntentClassifier(routes)
+        scan_keywords = OLD_STUDENT_KEYWORDS + keywords
+
+        def scan(question: str) -> bool:
+            lower_q = question.lower()
+            return any(keyword in lower_q for keyword in scan_keywords)
+
+        print(f"+{extra} từ khóa:")
+        throughput("  keyword scan cũ", scan, questions, max(1, args.repeat // 10))
+        throughput("  automaton", lambda question: scaled.classify(question).intent, questions,
+                   max(1, args.repeat // 10))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=Path, default=DEFAULT_LABELS, help="JSONL {question, intent}")
+    parser.add_argument("--routes", default="", help="bảng định tuyến JSON (mặc định: DEFAULT_ROUTES)")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--scale", type=int, nargs="*", default=[100, 1000],
+                        help="số từ khóa thêm vào bảng định tuyến để đo khả năng mở rộng")
+    parser.add_argument("--verbose", action="store_true", help="in intent / độ tin cậy từng câu")
+    main(parser.parse_args())
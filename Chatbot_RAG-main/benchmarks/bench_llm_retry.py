@@ -0,0 +1,149 @@
+"""
+Kiểm tra retry / fallback khi stream câu trả lời từ Gemini: dùng đúng lớp LLM (core.llm.gemini_llm) và
+LLMClient, chỉ thay model Gemini bằng model theo kịch bản (lỗi tạm thời, chunk bị chặn bởi safety filter,
+chunk chỉ có finish_reason). Mỗi kịch bản in thời gian và metrics; sai kết quả thì thoát với mã lỗi.
+Không gọi API thật. Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_llm_retry --backoff-base 0.05
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from core.llm.gemini_llm import LLM
+from core.llm.registry import LLMClient
+
+try:
+    from google.api_core.exceptions import ServiceUnavailable
+except ImportError:
+    # LLMClient nhận diện lỗi tạm thời theo tên lớp (như google.api_core.exceptions.ServiceUnavailable)
+    class ServiceUnavailable(Exception):
+        pass
+
+
+class Chunk:
+    """Giống GenerateContentResponse: `.text` báo ValueError khi chunk không có phần text."""
+
+    def __init__(self, text: str = None, finish_reason: int = 0, block_reason: str = None):
+        parts = [type("Part", (), {"text": text})()] if text is not None else []
+        content = type("Content", (), {"parts": parts})()
+        self.candidates = [] if block_reason else [type("Candidate", (), {
+            "content": content, "finish_reason": finish_reason})()]
+        self.prompt_feedback = type("PromptFeedback", (), {"block_reason": block_reason})()
+
+    @property
+    def text(self) -> str:
+        if not self.candidates or not self.candidates[0].content.parts:
+            raise ValueError("The `response.text` quick accessor only works when the response contains a valid `Part`.")
+        return self.candidates[0].content.parts[0].text
+
+
+class Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ScriptedModel:
+    """Thay cho genai.GenerativeModel: mỗi lần gọi lấy bước tiếp theo của kịch bản.
+
+    Bước là một Exception (ném ra khi gọi), danh sách chunk / Exception (stream; Exception ném ra giữa stream),
+    hoặc chuỗi (câu trả lời của request không stream).
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.calls = []
+
+    def _next(self, stream: bool):
+        self.calls.append("stream" if stream else "request")
+        step = self.steps.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+    @staticmethod
+    def _chunks(step):
+        for item in step:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        step = self._next(stream)
+        return self._chunks(step) if stream else Response(step)
+
+    async def generate_content_async(self, contents, stream=False, request_options=None):
+        step = self._next(stream)
+        if not stream:
+            return Response(step)
+
+        async def chunks():
+            for item in self._chunks(step):
+                yield item
+        return chunks()
+
+
+ANSWER = [Chunk("<p>Học phí "), Chunk("ngành Kỹ thuật điện "), Chunk("là ...</p>")]
+
+# (tên, kịch bản, kết quả mong đợi: chuỗi trả lời hoặc lớp lỗi, các lần gọi, retries, fallbacks)
+SCENARIOS = [
+    ("stream bình thường", [ANSWER], "".join(c.text for c in ANSWER), ["stream"], 0, 0),
+    ("chunk finish_reason / safety bị bỏ qua",
+     [[Chunk("<p>Một phần</p>"), Chunk(finish_reason=3), Chunk(block_reason="SAFETY"), Chunk(finish_reason=1)]],
+     "<p>Một phần</p>", ["stream"], 0, 0),
+    ("lỗi tạm thời rồi stream được", [ServiceUnavailable("503"), ANSWER],
+     "".join(c.text for c in ANSWER), ["stream", "stream"], 1, 0),
+    ("lỗi tạm thời giữa lúc mở stream", [[ServiceUnavailable("503")], ANSWER],
+     "".join(c.text for c in ANSWER), ["stream", "stream"], 1, 0),
+    ("stream lỗi hết lượt retry -> request không stream",
+     [ServiceUnavailable("503")] * 3 + ["<p>Câu trả lời đầy đủ</p>"],
+     "<p>Câu trả lời đầy đủ</p>", ["stream"] * 3 + ["request"], 2, 1),
+    ("fallback cũng lỗi", [ServiceUnavailable("503")] * 4, ServiceUnavailable, ["stream"] * 3 + ["request"], 2, 1),
+    ("lỗi không tạm thời: không retry", [ValueError("API key not valid")], ValueError, ["stream"], 0, 0),
+    ("lỗi sau chunk đầu tiên: không retry", [[ANSWER[0], ServiceUnavailable("503")]], ServiceUnavailable,
+     ["stream"], 0, 0),
+]
+
+
+async def collect_async(client: LLMClient) -> str:
+    return "".join([text async for text in client.astream_request("prompt")])
+
+
+def run(name: str, steps, expected, calls, retries, fallbacks, use_async: bool, backoff_base: float) -> bool:
+    llm = LLM(configure=False)
+    llm.llm = model = ScriptedModel(steps)
+    client = LLMClient("gemini", llm, max_retries=2, backoff_base=backoff_base)
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(collect_async(client)) if use_async else "".join(client.stream_request("prompt"))
+    except Exception as e:
+        result = e
+    elapsed = time.perf_counter() - start
+    metrics = client.metrics.snapshot()
+    if isinstance(expected, type):
+        ok = isinstance(result, expected)
+    else:
+        ok = result == expected
+    ok = ok and model.calls == calls and metrics["retries"] == retries and metrics["fallbacks"] == fallbacks
+    shown = f"{type(result).__name__}: {result}" if isinstance(result, Exception) else repr(result)
+    print(f"  {'ok' if ok else 'SAI':3s} {'async' if use_async else 'sync ':5s} {name}: {shown} "
+          f"calls={model.calls} retries={metrics['retries']} fallbacks={metrics['fallbacks']} "
+          f"errors={metrics['errors']} ({elapsed * 1000:.0f}ms)")
+    return ok
+
+
+def main(args) -> None:
+    failed = 0
+    for use_async in (False, True):
+        for name, steps, expected, calls, retries, fallbacks in SCENARIOS:
+            failed += not run(name, steps, expected, calls, retries, fallbacks, use_async, args.backoff_base)
+    print(f"{len(SCENARIOS) * 2 - failed}/{len(SCENARIOS) * 2} kịch bản đúng")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="LLM_BACKOFF_BASE cho các lần retry")
+    main(parser.parse_args())
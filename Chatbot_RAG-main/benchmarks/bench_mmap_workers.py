@@ -0,0 +1,92 @@
+"""
+Benchmark bộ nhớ khi nhiều worker uvicorn cùng phục vụ một index: mỗi worker load index như lúc khởi động
+(FAISS.load_local vào heap, hoặc VECTOR_STORE_MMAP=1: memory-map index.faiss + docstore SQLite),
+truy vấn vài lần rồi báo RSS / RSS anon / PSS. Tổng PSS là bộ nhớ thực của cả nhóm worker.
+Index giả lập (vector ngẫu nhiên, đoạn văn bản lặp lại) nằm trong thư mục tạm. Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_mmap_workers --chunks 50000 --dim 768 --workers 4
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from core.embeding.HuggingEmbed import HuggingEmbed
+from core.memory import process_memory
+from core.retreival.bm25 import BM25Index
+
+
+def build_store(path: str, chunks: int, dim: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((chunks, dim), dtype=np.float32)
+    texts = [f"Đoạn {i}: quy chế đào tạo, học phí và chuẩn đầu ra ngành {i % 40}. " * 6 for i in range(chunks)]
+    embed = HuggingEmbed(mmap=True)
+    embed.vector_db = FAISS(embedding_function=embed.embeddings, index=faiss.IndexFlatL2(dim),
+                            docstore=InMemoryDocstore(), index_to_docstore_id={})
+    embed.vector_db.add_embeddings(list(zip(texts, vectors.tolist())),
+                                   metadatas=[{"source": f"doc-{i % 100}.pdf"} for i in range(chunks)])
+    embed.bm25 = BM25Index()
+    embed.bm25.add(embed.vector_db.index_to_docstore_id.values(), texts)
+    # mmap=True: ghi cả index.pkl (chế độ heap) lẫn docstore.sqlite3 (chế độ mmap)
+    embed.save_vector_store(path)
+
+
+def worker(path: str, mmap: bool, dim: int, queries: int, loaded, measured, results) -> None:
+    start = time.perf_counter()
+    embed = HuggingEmbed(mmap=mmap)
+    embed.load_vector_store(path)
+    load_seconds = time.perf_counter() - start
+    vector_db = embed.vector_db
+    rng = np.random.default_rng()
+    for _ in range(queries):
+        _, indices = vector_db.index.search(rng.random((1, dim), dtype=np.float32), 7)
+        for position in indices[0]:
+            vector_db.docstore.search(vector_db.index_to_docstore_id[int(position)])
+    # Đo khi mọi worker đã load xong, để các trang dùng chung được chia cho cả nhóm
+    loaded.wait()
+    results.put({**process_memory(), "load_seconds": round(load_seconds, 2)})
+    measured.wait()
+
+
+def run(path: str, mmap: bool, args) -> None:
+    context = multiprocessing.get_context("spawn")
+    loaded, measured = context.Barrier(args.workers), context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, mmap, args.dim, args.queries, loaded, measured, results))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    label = "mmap + SQLite docstore" if mmap else "load_local (heap)"
+    for item in stats:
+        print(f"  {label} pid={item['pid']}: rss={item.get('rss_mb')}MB anon={item.get('rss_anon_mb')}MB "
+              f"pss={item.get('pss_mb')}MB load={item['load_seconds']}s")
+    print(f"{label}: total PSS over {args.workers} workers = {sum(item.get('pss_mb', 0) for item in stats):.0f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        build_store(path, args.chunks, args.dim, args.seed)
+        print(f"Built {args.chunks} x {args.dim} index in {time.perf_counter() - start:.1f}s")
+        run(path, False, args)
+        run(path, True, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Đo số token đầu vào gửi tới LLM mỗi request: prompt một chuỗi (như trước) so với prompt tách prefix tĩnh
+(system instruction / cached content). FakeLLM(prefix_cache=True) đếm token ước lượng và chỉ tính prefix
+ở lần đầu gặp, giống prefix được cache phía provider; không cần API key.
+Câu hỏi lấy từ benchmarks/intent_questions.jsonl, context từ vector store của data/ (nếu đã build).
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_prompt_prefix --repeat 3
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+import serve
+from core.llm.fake_llm import FakeLLM
+from core.rag.prompts import prompt_registry
+
+DEFAULT_QUESTIONS = Path(__file__).with_name("intent_questions.jsonl")
+
+
+def prepare_states(questions):
+    states = []
+    for question in questions:
+        state = serve.embed_question({"question": question, "context": [], "answer": ""})
+        if serve.vector_Hugging.vector_db is not None:
+            state = serve.retrivel(state)
+        else:
+            state = {**state, "context": [Document(page_content="Học phí năm học 2025-2026 là 15 triệu đồng.")]}
+        states.append(state)
+    return states
+
+
+def run(name: str, states, repeat: int, as_text: bool) -> None:
+    llm = FakeLLM(latency=0, prefix_cache=True)
+    render_seconds = 0.0
+    for _ in range(repeat):
+        for state in states:
+            start = time.perf_counter()
+            prompt = serve.build_prompt(state)
+            render_seconds += time.perf_counter() - start
+            if prompt is None:
+                continue
+            llm.post_request(prompt.text if as_text else prompt)
+    usage = llm.usage()
+    print(f"{name}: {usage['calls']} calls, {usage['input_tokens_per_call']} input tokens / call, "
+          f"{usage['cached_tokens']} tokens served from prefix cache, "
+          f"build_prompt {render_seconds / max(1, usage['calls']) * 1e6:.0f} µs / call")
+
+
+def main(args) -> None:
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    print(f"Prefix tĩnh (token ước lượng): {prompt_registry.prefix_tokens()}")
+    serve.start_warmup()
+    serve.warmup.wait()
+    states = prepare_states(questions)
+    # build_prompt trả về Prompt khi PROMPT_SYSTEM_PREFIX=1 (mặc định)
+    serve.PROMPT_SYSTEM_PREFIX = True
+    run("một chuỗi prompt", states, args.repeat, as_text=True)
+    run("prefix tĩnh tách riêng", states, args.repeat, as_text=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS, help="JSONL có trường question")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""
+Benchmark upload tài liệu: thông lượng và độ trễ của event loop trong lúc nhận nhiều file lớn.
+So sánh cách cũ (shutil.copyfileobj ngay trong handler async) với /api/uploads (ghi theo khối ở thread,
+băm SHA-256 trong lúc ghi), và lần upload lại cùng nội dung (bỏ qua, không tạo job index).
+Ghi vào thư mục tạm; job index chỉ được xếp hàng, không chạy. Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.bench_upload --files 8 --size-mb 20
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import httpx
+from fastapi import File, UploadFile
+
+import serve
+
+
+async def loop_lag_probe(stop: asyncio.Event, lags: list, interval: float = 0.01) -> None:
+    """Độ trễ lớn nhất của event loop: ngủ `interval` rồi đo thời gian thực sự đã trôi qua."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+@serve.app.post("/bench/legacy-upload", include_in_schema=False)
+async def legacy_upload(file: UploadFile = File(...)):
+    """Đúng cách ghi file của create_upload_file trước đây."""
+    with open(os.path.join(serve.DOCUMENT_DIR, file.filename), "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return {"message": "ok"}
+
+
+async def run(client: httpx.AsyncClient, label: str, requests) -> None:
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(loop_lag_probe(stop, lags))
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.post(path, files=files) for path, files in requests))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    total_mb = sum(len(content) for _, files in requests for _, (_, content, _) in files) / 1e6
+    statuses = {}
+    for response in responses:
+        for result in response.json().get("files", [{"status": response.status_code}]):
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    print(f"{label}: {total_mb / elapsed:.0f} MB/s, max loop lag={max(lags, default=0) * 1000:.0f}ms, "
+          f"statuses={statuses}, jobs queued={len(serve.retrain_jobs.list())}")
+
+
+async def main_async(args) -> None:
+    payloads = [os.urandom(args.size_mb * 1024 * 1024) for _ in range(args.files)]
+    transport = httpx.ASGITransport(app=serve.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await run(client, "Legacy copyfileobj", [
+            ("/bench/legacy-upload", [("file", (f"legacy-{i}.pdf", payload, "application/pdf"))])
+            for i, payload in enumerate(payloads)
+        ])
+        batch = [("/api/uploads", [("files", (f"doc-{i}.pdf", payload, "application/pdf"))
+                                   for i, payload in enumerate(payloads)])]
+        await run(client, "Streaming /api/uploads (one batch)", batch)
+        await run(client, "Re-upload same batch", batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        serve.DOCUMENT_DIR = directory
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Báo cáo thời gian khởi động: `python -X importtime -c "import serve"` (module nào tốn thời gian import),
+thời gian import serve (lúc uvicorn có thể nhận request) và thời gian từng bước warm-up tới khi /readyz sẵn sàng.
+Chạy từ thư mục Chatbot_RAG-main:
+
+    python -m benchmarks.profile_startup --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+def import_profile(module: str):
+    """[(cumulative_us, self_us, depth, name)] từ output của -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=os.environ.copy())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def main(args) -> None:
+    rows = import_profile(args.module)
+    total = sum(self_us for _, self_us, _, _ in rows)
+    print(f"-X importtime: {len(rows)} modules, tổng {total / 1e6:.2f}s")
+    print(f"\nTop {args.top} import trực tiếp của {args.module} (cumulative):")
+    for cumulative_us, _, _, name in sorted((r for r in rows if r[2] == 1), reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1e3:9.1f} ms  {name}")
+    print(f"\nTop {args.top} module (self):")
+    for _, self_us, _, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {name}")
+
+    # Trong process: import serve (server bắt đầu nhận request sau bước này) rồi warm-up
+    start = time.perf_counter()
+    import serve
+    print(f"\nimport serve: {time.perf_counter() - start:.2f}s")
+    if args.skip_warmup:
+        return
+    serve.start_warmup()
+    serve.warmup.wait()
+    report = serve.warmup.to_dict()
+    print(f"warm-up: {report['status']} sau {report['seconds']:.2f}s")
+    for step in report["steps"]:
+        print(f"  {step['seconds']:8.2f}s  {step['step']}{'' if step['ok'] else ' (lỗi)'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="serve")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--skip-warmup", action="store_true", help="chỉ đo import")
+    main(parser.parse_args())
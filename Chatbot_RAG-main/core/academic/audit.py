@@ -0,0 +1,259 @@
+import heapq
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from core.academic.records import (
+    AcademicRecords, CURRICULUM_CREDITS, CURRICULUM_ID, CURRICULUM_NAME, PASSING_GRADE,
+    TOTAL_CREDITS_REQUIRED, _Snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cột môn tiên quyết trong file CTĐT (danh sách Mã HP, ngăn cách bởi dấu phẩy / chấm phẩy / khoảng trắng)
+PREREQUISITE_COLUMN = "Học phần tiên quyết"
+_CODE_SPLIT_RE = re.compile(r"[,;/\s]+")
+
+# Số dòng sinh viên tính gợi ý trong một lượt (giới hạn bộ nhớ của ma trận sinh viên x môn)
+_BATCH_ROWS = 4096
+
+
+def parse_prerequisites(curriculum: pd.DataFrame, column: str) -> Dict[str, List[str]]:
+    """{Mã HP: [Mã HP tiên quyết]} from the curriculum; empty when the column does not exist."""
+    if column not in curriculum.columns:
+        return {}
+    prerequisites = {}
+    for course_id, value in zip(curriculum[CURRICULUM_ID], curriculum[column]):
+        if isinstance(value, str) and value.strip():
+            prerequisites[course_id] = [code for code in _CODE_SPLIT_RE.split(value.strip()) if code]
+    return prerequisites
+
+
+class PrerequisiteGraph:
+    """Prerequisite DAG over the curriculum courses, with everything a recommendation needs precomputed.
+
+    ``matrix[p, c]`` is set when course ``p`` is a prerequisite of ``c``;
+    ``order`` is a topological order; ``unlocks[c]`` counts the courses that
+    transitively depend on ``c``. Unknown prerequisite codes are ignored and
+    edges that would close a cycle are dropped (both logged).
+    """
+
+    def __init__(self, course_ids: Sequence[str], prerequisites: Dict[str, List[str]]):
+        self.course_ids = list(course_ids)
+        index = {course_id: position for position, course_id in enumerate(self.course_ids)}
+        size = len(self.course_ids)
+        self.matrix = np.zeros((size, size), dtype=bool)
+        unknown = 0
+        for course_id, required in prerequisites.items():
+            if course_id not in index:
+                continue
+            for code in required:
+                if code in index and code != course_id:
+                    self.matrix[index[code], index[course_id]] = True
+                else:
+                    unknown += 1
+        if unknown:
+            logger.warning(f"Ignored {unknown} unknown prerequisite codes.")
+        self.order = self._topological_order()
+        self.unlocks = self._count_unlocks()
+
+    def _topological_order(self) -> np.ndarray:
+        # Kahn; hàng đợi ưu tiên theo thứ tự trong CTĐT để kết quả ổn định
+        in_degree = self.matrix.sum(axis=0)
+        ready = [position for position in range(len(self.course_ids)) if in_degree[position] == 0]
+        heapq.heapify(ready)
+        order = []
+        while len(order) < len(self.course_ids):
+            if not ready:
+                # Chu trình: bỏ các cạnh vào môn đầu tiên còn lại
+                position = next(p for p in range(len(self.course_ids)) if in_degree[p] > 0)
+                logger.warning(f"Prerequisite cycle at {self.course_ids[position]}; dropping its prerequisites.")
+                self.matrix[:, position] = False
+                in_degree[position] = 0
+                heapq.heappush(ready, position)
+                continue
+            position = heapq.heappop(ready)
+            order.append(position)
+            in_degree[position] = -1
+            for child in np.flatnonzero(self.matrix[position]):
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    heapq.heappush(ready, int(child))
+        return np.array(order, dtype=np.int64)
+
+    def _count_unlocks(self) -> np.ndarray:
+        descendants = np.zeros_like(self.matrix)
+        for position in self.order[::-1]:
+            children = self.matrix[position]
+            descendants[position] = children | descendants[children].any(axis=0)
+        return descendants.sum(axis=1)
+
+    @classmethod
+    def from_curriculum(cls, curriculum: pd.DataFrame, column: str = PREREQUISITE_COLUMN) -> "PrerequisiteGraph":
+        return cls(curriculum[CURRICULUM_ID].tolist(), parse_prerequisites(curriculum, column))
+
+
+class _AuditTables:
+    """Per-snapshot student x course matrices and the prerequisite graph."""
+
+    def __init__(self, snapshot: _Snapshot, prerequisite_column: str):
+        self.snapshot = snapshot
+        curriculum = snapshot.curriculum
+        self.graph = PrerequisiteGraph.from_curriculum(curriculum, prerequisite_column)
+        self.course_ids = np.asarray(curriculum[CURRICULUM_ID].tolist(), dtype=object)
+        self.course_names = curriculum[CURRICULUM_NAME].fillna("").astype(str).tolist() \
+            if CURRICULUM_NAME in curriculum.columns else [""] * len(curriculum)
+        self.credits = pd.to_numeric(curriculum[CURRICULUM_CREDITS], errors="coerce").fillna(0).to_numpy(np.float32)
+        self.student_index = {student_id: row for row, student_id in enumerate(snapshot.student_ids.tolist())}
+
+        # Vị trí trong CTĐT của từng dòng điểm (-1 nếu môn không thuộc CTĐT)
+        positions = curriculum.index.get_indexer(snapshot.course_values)[snapshot.course_codes]
+        in_curriculum = positions >= 0
+        shape = (len(snapshot.student_ids), len(curriculum))
+        self.taken = np.zeros(shape, dtype=bool)
+        self.taken[snapshot.student_codes[in_curriculum], positions[in_curriculum]] = True
+        passed_rows = in_curriculum & (snapshot.grades >= PASSING_GRADE)
+        self.passed = np.zeros(shape, dtype=bool)
+        self.passed[snapshot.student_codes[passed_rows], positions[passed_rows]] = True
+
+        # Học lại nhiều lần chỉ tính một lần: cộng trên ma trận đã đỗ (sinh viên x môn)
+        rows, columns = np.nonzero(self.passed)
+        self.credits_earned = np.bincount(rows, weights=self.credits[columns], minlength=shape[0])
+        # Thứ tự xét gợi ý: mở khoá được nhiều môn trước, sau đó theo thứ tự topo
+        topo_rank = np.empty(len(curriculum), dtype=np.int64)
+        topo_rank[self.graph.order] = np.arange(len(curriculum))
+        self.priority = np.lexsort((topo_rank, -self.graph.unlocks))
+        self._prerequisites = self.graph.matrix.astype(np.float32)
+
+    def recommend(self, rows: np.ndarray, max_credits: float) -> np.ndarray:
+        """Boolean (len(rows) x courses) of courses to take next, greedily filled up to ``max_credits``."""
+        passed = self.passed[rows]
+        # Đủ điều kiện: chưa đỗ và đã đỗ mọi môn tiên quyết
+        missing = (~passed).astype(np.float32) @ self._prerequisites
+        eligible = ~passed & (missing == 0)
+        chosen = np.zeros_like(eligible)
+        total = np.zeros(len(rows), dtype=np.float32)
+        for position in self.priority:
+            fits = eligible[:, position] & (total + self.credits[position] <= max_credits)
+            chosen[:, position] = fits
+            total += fits * self.credits[position]
+        return chosen
+
+
+class CreditAuditor:
+    """Credit audit and next-term recommendations for one student or a whole cohort.
+
+    Student x course passed/taken matrices, earned credits and the
+    prerequisite DAG are built once per ``AcademicRecords`` snapshot;
+    recommendations are computed for many students at once and individual
+    results are kept in an LRU cache until the grade data changes.
+    """
+
+    def __init__(self, records: AcademicRecords, prerequisite_column: str = PREREQUISITE_COLUMN,
+                 max_term_credits: float = 20, credits_required: float = TOTAL_CREDITS_REQUIRED,
+                 cache_size: int = 4096):
+        self.records = records
+        self.prerequisite_column = prerequisite_column
+        self.max_term_credits = max_term_credits
+        self.credits_required = credits_required
+        self.cache_size = cache_size
+        self._tables: Optional[_AuditTables] = None
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _current_tables(self) -> _AuditTables:
+        snapshot = self.records.snapshot()
+        with self._lock:
+            if self._tables is None or self._tables.snapshot is not snapshot:
+                self._tables = _AuditTables(snapshot, self.prerequisite_column)
+                self._cache.clear()
+            return self._tables
+
+    def _result(self, tables: _AuditTables, row: int, chosen: np.ndarray) -> Dict:
+        earned = float(tables.credits_earned[row])
+        failed = tables.taken[row] & ~tables.passed[row]
+        recommendations = [
+            {
+                "course_id": tables.course_ids[position],
+                "name": tables.course_names[position],
+                "credits": float(tables.credits[position]),
+                "retake": bool(failed[position]),
+                "unlocks": int(tables.graph.unlocks[position]),
+            }
+            for position in tables.priority if chosen[position]
+        ]
+        return {
+            "student_id": tables.snapshot.student_ids[row],
+            "credits_earned": earned,
+            "credits_required": self.credits_required,
+            "credits_remaining": max(self.credits_required - earned, 0.0),
+            "passed_courses": int(tables.passed[row].sum()),
+            "failed_courses": tables.course_ids[failed].tolist(),
+            "recommended_credits": sum(item["credits"] for item in recommendations),
+            "recommendations": recommendations,
+        }
+
+    def audit_many(self, student_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """{student id: audit, or None if the student has no grade rows}, computed in vectorized batches."""
+        tables = self._current_tables()
+        results: Dict[str, Optional[Dict]] = {}
+        pending = {}
+        with self._lock:
+            for student_id in student_ids:
+                key = student_id.strip()
+                if key in results or key in pending:
+                    continue
+                cached = self._cache.get(key) if self._tables is tables else None
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    results[key] = cached
+                elif key in tables.student_index:
+                    self.misses += 1
+                    pending[key] = tables.student_index[key]
+                else:
+                    results[key] = None
+
+        keys = list(pending)
+        for start in range(0, len(keys), _BATCH_ROWS):
+            batch = keys[start:start + _BATCH_ROWS]
+            rows = np.array([pending[key] for key in batch], dtype=np.int64)
+            chosen = tables.recommend(rows, self.max_term_credits)
+            for key, row, row_chosen in zip(batch, rows, chosen):
+                results[key] = self._result(tables, int(row), row_chosen)
+
+        with self._lock:
+            if self._tables is tables:
+                for key in keys:
+                    self._cache[key] = results[key]
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def audit(self, student_id: str) -> Optional[Dict]:
+        return self.audit_many([student_id])[student_id.strip()]
+
+    def cohort(self, prefix: str) -> List[str]:
+        """Ids of all students whose id starts with ``prefix`` (e.g. the intake year)."""
+        tables = self._current_tables()
+        return [student_id for student_id in tables.snapshot.student_ids.tolist()
+                if student_id.startswith(prefix.strip())]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "prerequisite_edges": int(self._tables.graph.matrix.sum()) if self._tables else 0,
+            }
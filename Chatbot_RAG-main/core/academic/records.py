@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tên cột trong file xuất từ Sổ tay Điện tử
+STUDENT_ID = "Mã sinh viên"
+COURSE_ID = "Mã MH"
+GRADE = "Điểm"
+CURRICULUM_ID = "Mã HP"
+CURRICULUM_NAME = "Tên HP"
+CURRICULUM_CREDITS = "Số TC"
+
+PASSING_GRADE = 4.0
+TOTAL_CREDITS_REQUIRED = 141
+
+
+@dataclass
+class StudentRecord:
+    """Grade rows of one student, as views into the shared column arrays."""
+    student_id: str
+    course_ids: np.ndarray
+    grades: np.ndarray
+    credits: np.ndarray
+
+    @property
+    def passed_courses(self) -> List[str]:
+        # Học lại nhiều lần chỉ tính một lần
+        return sorted(set(self.course_ids[self.grades >= PASSING_GRADE].tolist()))
+
+    @property
+    def taken_courses(self) -> List[str]:
+        return sorted(set(self.course_ids.tolist()))
+
+    @property
+    def credits_earned(self) -> float:
+        passed = self.grades >= PASSING_GRADE
+        if not passed.any():
+            return 0.0
+        _, first = np.unique(self.course_ids[passed], return_index=True)
+        return float(self.credits[passed][first].sum())
+
+
+def _factorize_stripped(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(codes, values) of a string column, with values stripped of surrounding whitespace."""
+    codes, values = pd.factorize(column.fillna(""))
+    stripped_codes, stripped = pd.factorize(pd.Index(values).str.strip())
+    return stripped_codes[codes], np.asarray(stripped, dtype=object)
+
+
+class _Snapshot:
+    """One immutable load of the grade and curriculum files."""
+
+    def __init__(self, grades_path: str, curriculum_path: str, mtimes: Tuple[float, float]):
+        self.mtimes = mtimes
+        curriculum = pd.read_csv(curriculum_path, dtype={CURRICULUM_ID: str})
+        curriculum[CURRICULUM_ID] = curriculum[CURRICULUM_ID].fillna("").str.strip()
+        self.curriculum = curriculum.drop_duplicates(CURRICULUM_ID).set_index(CURRICULUM_ID, drop=False).rename_axis(None)
+        credits_by_course = pd.to_numeric(self.curriculum[CURRICULUM_CREDITS], errors="coerce").fillna(0)
+
+        grades = pd.read_csv(grades_path, usecols=[STUDENT_ID, COURSE_ID, GRADE],
+                             dtype={STUDENT_ID: str, COURSE_ID: str})
+        # Mã hoá theo giá trị khác nhau rồi mới strip: chỉ strip vài chục nghìn mã thay vì mọi dòng
+        student_codes, student_ids = _factorize_stripped(grades[STUDENT_ID])
+        course_codes, course_ids = _factorize_stripped(grades[COURSE_ID])
+        order = np.argsort(student_codes, kind="stable")
+        # Mã số (0..n-1) theo từng dòng, dùng cho các phép tính vector hoá trên cả khoá (core.academic.audit)
+        self.student_ids = student_ids
+        self.student_codes = student_codes[order]
+        self.course_values = course_ids
+        self.course_codes = course_codes[order]
+        self.course_ids = course_ids[self.course_codes]
+        self.grades = pd.to_numeric(grades[GRADE], errors="coerce").to_numpy(dtype=np.float32)[order]
+        # Số TC theo từng dòng điểm (0 nếu môn không có trong CTĐT), tính một lần lúc load
+        course_credits = credits_by_course.reindex(course_ids).fillna(0).to_numpy(dtype=np.float32)
+        self.credits = course_credits[self.course_codes]
+
+        stops = np.cumsum(np.bincount(student_codes, minlength=len(student_ids)))
+        starts = stops - np.bincount(student_codes, minlength=len(student_ids))
+        self.slices: Dict[str, slice] = {
+            student_id: slice(int(start), int(stop))
+            for student_id, start, stop in zip(student_ids.tolist(), starts, stops)
+        }
+
+    def student(self, student_id: str) -> Optional[StudentRecord]:
+        rows = self.slices.get(student_id.strip())
+        if rows is None:
+            return None
+        return StudentRecord(student_id.strip(), self.course_ids[rows], self.grades[rows], self.credits[rows])
+
+
+class AcademicRecords:
+    """Grade and curriculum tables loaded once and indexed by student id.
+
+    Grade rows are stored column-wise, sorted by ``Mã sinh viên``, with a
+    dict from student id to its row range, so a lookup is a dict access
+    plus array slicing. The curriculum is indexed by ``Mã HP``. Files are
+    re-read when their modification time changes (checked at most every
+    ``check_interval`` seconds).
+    """
+
+    def __init__(self, grades_path: str, curriculum_path: str, check_interval: float = 2.0):
+        self.grades_path = grades_path
+        self.curriculum_path = curriculum_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.last_load_seconds = None
+
+    def _mtimes(self) -> Tuple[float, float]:
+        return os.stat(self.grades_path).st_mtime, os.stat(self.curriculum_path).st_mtime
+
+    def snapshot(self) -> _Snapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            mtimes = self._mtimes()
+            self._checked_at = now
+            if self._snapshot is None or self._snapshot.mtimes != mtimes:
+                start = time.perf_counter()
+                self._snapshot = _Snapshot(self.grades_path, self.curriculum_path, mtimes)
+                self.loads += 1
+                self.last_load_seconds = time.perf_counter() - start
+                logger.info(f"Loaded academic records: {len(self._snapshot.slices)} students, "
+                            f"{len(self._snapshot.course_ids)} grade rows in {self.last_load_seconds:.2f}s")
+            return self._snapshot
+
+    @property
+    def version(self) -> Tuple[float, float]:
+        """Changes whenever either file is reloaded; usable as a cache key."""
+        return self.snapshot().mtimes
+
+    def student(self, student_id: str) -> Optional[StudentRecord]:
+        return self.snapshot().student(student_id)
+
+    def curriculum(self) -> pd.DataFrame:
+        return self.snapshot().curriculum
+
+    def untaken_courses(self, record: StudentRecord) -> pd.DataFrame:
+        curriculum = self.curriculum()
+        return curriculum[~curriculum[CURRICULUM_ID].isin(record.taken_courses)]
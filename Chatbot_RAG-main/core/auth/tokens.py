@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Optional
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenSigner:
+    """Stateless session tokens: base64url JSON claims plus an HMAC-SHA256 signature.
+
+    A token proves a past successful login until it expires, so pages can
+    check it without a database lookup or another bcrypt verification.
+    """
+
+    def __init__(self, secret: bytes, ttl_seconds: float = 8 * 3600):
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+
+    def _signature(self, payload: str) -> str:
+        return _b64encode(hmac.new(self.secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        body = {**claims, "exp": int(time.time() + self.ttl_seconds)}
+        payload = _b64encode(json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        return f"{payload}.{self._signature(payload)}"
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """The claims of a valid, unexpired token, else None."""
+        payload, _, signature = token.partition(".")
+        try:
+            if not payload or not hmac.compare_digest(signature.encode("utf-8"),
+                                                      self._signature(payload).encode("ascii")):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            # Token hỏng (ký tự lạ, base64 / JSON sai)
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims
@@ -0,0 +1,126 @@
+import os
+import queue
+import secrets
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fullname TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    role TEXT NOT NULL,
+    hashed_password TEXT NOT NULL,
+    student_id TEXT,
+    is_approved INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_approved ON users(is_approved, id);
+CREATE TABLE IF NOT EXISTS secrets (
+    name TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+"""
+
+PUBLIC_FIELDS = "id, fullname, email, role, student_id"
+
+
+class DuplicateEmailError(ValueError):
+    pass
+
+
+class UserRepository:
+    """User accounts in SQLite, shared through a small connection pool.
+
+    Email lookups go through the UNIQUE (case-insensitive) email index and
+    approval listings through ``idx_users_approved``; ids come from
+    AUTOINCREMENT instead of scanning for the current maximum. Student
+    accounts carry the student ID they registered with, checked by the
+    admin when approving.
+    """
+
+    def __init__(self, db_path: str = ".cache/users.sqlite3", pool_size: int = 4):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._pool.put(conn)
+        with self._connection() as conn, conn:
+            conn.executescript(SCHEMA)
+            # DB tạo trước khi có cột student_id
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(users)")}
+            if "student_id" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN student_id TEXT")
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM users WHERE email = ?", (email.strip(),)).fetchone()
+        return dict(row) if row else None
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def create(self, fullname: str, email: str, role: str, hashed_password: str,
+               is_approved: bool = False, student_id: Optional[str] = None) -> int:
+        try:
+            with self._connection() as conn, conn:
+                cursor = conn.execute(
+                    "INSERT INTO users (fullname, email, role, hashed_password, student_id, is_approved, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (fullname, email.strip(), role, hashed_password, student_id, int(is_approved), time.time()),
+                )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateEmailError(email) from e
+        return cursor.lastrowid
+
+    def list_users(self, approved: bool) -> List[Dict]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {PUBLIC_FIELDS} FROM users WHERE is_approved = ? ORDER BY id", (int(approved),)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def approve(self, user_id: int) -> Optional[bool]:
+        """True if approved now, False if it already was, None if there is no such user."""
+        with self._connection() as conn, conn:
+            cursor = conn.execute("UPDATE users SET is_approved = 1 WHERE id = ? AND is_approved = 0", (user_id,))
+            if cursor.rowcount:
+                return True
+            exists = conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone()
+        return False if exists else None
+
+    def ensure_user(self, fullname: str, email: str, role: str, hash_password: Callable[[], str]) -> bool:
+        """Create an approved account once; ``hash_password`` is only called when it does not exist yet."""
+        if self.get_by_email(email) is not None:
+            return False
+        try:
+            self.create(fullname, email, role, hash_password(), is_approved=True)
+        except DuplicateEmailError:
+            return False
+        return True
+
+    def secret(self, name: str, size: int = 32) -> bytes:
+        """A random secret stored in the DB on first use, so every worker and restart gets the same one."""
+        with self._connection() as conn, conn:
+            # INSERT OR IGNORE: worker khởi động cùng lúc vẫn đọc được cùng một giá trị
+            conn.execute("INSERT OR IGNORE INTO secrets (name, value) VALUES (?, ?)",
+                         (name, secrets.token_bytes(size)))
+            row = conn.execute("SELECT value FROM secrets WHERE name = ?", (name,)).fetchone()
+        return bytes(row["value"])
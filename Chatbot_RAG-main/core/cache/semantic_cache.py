@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed on question embeddings.
+
+    Questions are stored in small inner-product FAISS indexes over normalized
+    vectors, so a lookup returns the cached answer of the most similar earlier
+    question when its cosine similarity is above ``threshold``. Each entry
+    belongs to a ``scope`` (e.g. the intent and metadata filters the answer
+    was retrieved with) with its own index, and a lookup only considers
+    entries of the same scope: questions that differ only in the major they
+    name embed almost identically but must not share an answer. Entries are
+    evicted least-recently-used beyond ``max_entries`` and expire after
+    ``ttl_seconds``.
+    """
+
+    def __init__(self, threshold: float = 0.97, max_entries: int = 2000, ttl_seconds: float = 86400):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._indexes: Dict[Hashable, faiss.Index] = {}
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        x = np.asarray(vector, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(x)
+        return x
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        index = self._indexes[entry["scope"]]
+        index.remove_ids(np.array([entry_id], dtype="int64"))
+        if not index.ntotal:
+            del self._indexes[entry["scope"]]
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def lookup(self, vector: List[float], scope: Hashable = None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry (``question``, ``answer``, ``context``) for a similar question in ``scope``, or None."""
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                self.misses += 1
+                return None
+            scores, ids = index.search(self._normalize(vector), 1)
+            entry_id, score = int(ids[0][0]), float(scores[0][0])
+            entry = self._entries.get(entry_id)
+            if entry is None or score < self.threshold:
+                self.misses += 1
+                return None
+            if self._expired(entry, time.time()):
+                self._remove(entry_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return entry
+
+    def store(self, vector: List[float], question: str, answer: str, context: List[Any] = None,
+              scope: Hashable = None) -> None:
+        x = self._normalize(vector)
+        with self._lock:
+            now = time.time()
+            for entry_id in [i for i, e in self._entries.items() if self._expired(e, now)]:
+                self._remove(entry_id)
+            while len(self._entries) >= self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = faiss.IndexIDMap2(faiss.IndexFlatIP(x.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(x, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = {
+                "question": question, "answer": answer, "context": context or [], "created_at": now,
+                "scope": scope,
+            }
+
+    def clear(self) -> None:
+        """Drop every cached answer (called whenever the vector store changes)."""
+        with self._lock:
+            if self._entries:
+                logger.info(f"Invalidating {len(self._entries)} cached answers.")
+            self._entries.clear()
+            self._indexes.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "scopes": len(self._indexes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import msgpack
+import zstandard
+from langchain_core.documents import Document
+
+from core.indexing.manifest import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi output của loader thay đổi để bỏ qua các cache cũ
+CACHE_VERSION = 2
+INDEX_FILE = "index.json"
+
+
+class ParsedDocumentCache:
+    """On-disk cache of loader output so unchanged files are never parsed twice.
+
+    Entries are keyed by file path and validated with size + mtime; when only
+    the mtime changed (e.g. a file was copied back), the content hash decides.
+    Document lists are stored as zstd-compressed msgpack blobs.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/parsed", level: int = 3):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._index: Dict[str, Dict] = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _blob_path(self, blob: str) -> str:
+        return os.path.join(self.cache_dir, f"{blob}.msgpack.zst")
+
+    @staticmethod
+    def _blob_name(key: str, content_hash: str) -> str:
+        # Metadata (source) phụ thuộc đường dẫn nên blob gắn với cả đường dẫn lẫn nội dung
+        return hashlib.sha1(f"{key}:{content_hash}".encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read parsed document cache index: {e}")
+        return {}
+
+    def _save_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": self._index}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path())
+
+    def _read_blob(self, blob: str) -> Optional[List[Document]]:
+        try:
+            with open(self._blob_path(blob), "rb") as f:
+                records = msgpack.unpackb(self._decompressor.decompress(f.read()), raw=False)
+        except (OSError, ValueError, zstandard.ZstdError) as e:
+            logger.error(f"Could not read parsed document cache entry {blob}: {e}")
+            return None
+        return [Document(page_content=text, metadata=metadata) for text, metadata in records]
+
+    def get(self, file_path: str) -> Optional[List[Document]]:
+        """Return the cached documents of a file, or None if the file must be parsed."""
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None or entry["size"] != stat.st_size:
+            self.misses += 1
+            return None
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if file_sha256(file_path) != entry["sha256"]:
+                self.misses += 1
+                return None
+            with self._lock:
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self._save_index()
+        documents = self._read_blob(entry["blob"])
+        if documents is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return documents
+
+    def put(self, file_path: str, documents: List[Document], content_hash: str = None) -> None:
+        """Store the parsed documents of a file."""
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        content_hash = content_hash or file_sha256(file_path)
+        blob = self._blob_name(key, content_hash)
+        records = [(doc.page_content, doc.metadata) for doc in documents]
+        data = self._compressor.compress(msgpack.packb(records, use_bin_type=True, default=str))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        blob_path = self._blob_path(blob)
+        with open(blob_path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(blob_path + ".tmp", blob_path)
+        with self._lock:
+            self._index[key] = {
+                "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": content_hash, "blob": blob,
+            }
+            self._save_index()
+
+    def prune(self, existing_paths: List[str]) -> None:
+        """Forget files that no longer exist and delete blobs nobody references."""
+        keep = {os.path.abspath(path) for path in existing_paths}
+        with self._lock:
+            self._index = {key: entry for key, entry in self._index.items() if key in keep}
+            referenced = {entry["blob"] for entry in self._index.values()}
+            self._save_index()
+        for name in os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []:
+            if name.endswith(".msgpack.zst") and name.split(".", 1)[0] not in referenced:
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing import connection
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_community.document_loaders import (
+    PyPDFLoader, TextLoader, Docx2txtLoader, CSVLoader, UnstructuredExcelLoader
+)
+
+from core.chunking.metadata import annotate_documents
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = (".pdf", ".txt", ".docx", ".doc")
+TABULAR_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+
+def get_loader(file_path: str, include_tabular: bool = False):
+    """Return the langchain loader for a file, or None if the type is not supported."""
+    filename = os.path.basename(file_path).lower()
+    if filename.endswith(".pdf"):
+        return PyPDFLoader(file_path)
+    if filename.endswith(".txt"):
+        return TextLoader(file_path)
+    if filename.endswith((".docx", ".doc")):
+        return Docx2txtLoader(file_path)
+    if include_tabular and filename.endswith(".csv"):
+        return CSVLoader(file_path)
+    if include_tabular and filename.endswith((".xlsx", ".xls")):
+        return UnstructuredExcelLoader(file_path, mode="elements")
+    return None
+
+
+def load_file(file_path: str, include_tabular: bool = False) -> List[Document]:
+    """Load one file and attach its metadata (major, doc_type, year); errors propagate to the caller."""
+    loader = get_loader(file_path, include_tabular)
+    return annotate_documents(file_path, loader.load()) if loader else []
+
+
+def _timed_load(file_path: str, include_tabular: bool) -> Tuple[List[Document], float]:
+    start = time.perf_counter()
+    documents = load_file(file_path, include_tabular)
+    return documents, time.perf_counter() - start
+
+
+def _worker_main(conn) -> None:
+    """Loader process: loads the files sent over ``conn`` one at a time until it receives None."""
+    conn.send(None)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        try:
+            conn.send((True, _timed_load(*task)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _LoaderWorker:
+    """One loader process; ``task`` is the (index, file_path) it is loading, due by ``deadline``."""
+
+    def __init__(self, context, timeout: float):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task = None
+        # Process mới cũng có hạn (import / khởi động bị treo)
+        self.deadline = time.monotonic() + timeout
+
+    def submit(self, index: int, file_path: str, include_tabular: bool, timeout: float) -> None:
+        self.conn.send((file_path, include_tabular))
+        self.task = (index, file_path)
+        self.deadline = time.monotonic() + timeout
+
+    def stop(self, kill: bool = False) -> None:
+        if kill or not self.process.is_alive():
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.terminate()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def load_files_parallel(file_paths: List[str], max_workers: int = None, timeout: float = 120,
+                        include_tabular: bool = False
+                        ) -> Tuple[List[Tuple[str, List[Document]]], Dict[str, str]]:
+    """Load files over a pool of loader processes.
+
+    Returns ``(loaded, failed)``: ``(file_path, documents)`` pairs for the
+    files that loaded, in the order of ``file_paths`` (a file without text
+    has an empty list), and ``{file_path: reason}`` for the files that
+    raised, crashed their loader or ran for more than ``timeout`` seconds.
+    A failure is logged and does not affect the other files. Each
+    worker gets one file at a time, so a file's timeout only starts once it
+    is actually being loaded; a worker that times out is terminated and
+    replaced. Workers are started with ``spawn``: the caller may be a
+    background thread of a process that already loaded torch.
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+    documents_by_file: List[Optional[List[Document]]] = [None] * len(file_paths)
+    failed: Dict[str, str] = {}
+    if max_workers <= 1:
+        for index, file_path in enumerate(file_paths):
+            try:
+                documents, seconds = _timed_load(file_path, include_tabular)
+                logger.info(f"Loaded '{os.path.basename(file_path)}': {len(documents)} documents in {seconds:.2f}s")
+                documents_by_file[index] = documents
+            except Exception as e:
+                logger.error(f"Error loading {os.path.basename(file_path)}: {e}")
+                failed[file_path] = f"{type(e).__name__}: {e}"
+        return _loaded(file_paths, documents_by_file), failed
+
+    context = multiprocessing.get_context("spawn")
+    pending = deque(enumerate(file_paths))
+    workers = [_LoaderWorker(context, timeout) for _ in range(max_workers)]
+    try:
+        while workers and (pending or any(worker.task is not None for worker in workers)):
+            for worker in workers:
+                if worker.ready and worker.task is None and pending:
+                    index, file_path = pending.popleft()
+                    worker.submit(index, file_path, include_tabular, timeout)
+            busy = [worker for worker in workers if not worker.ready or worker.task is not None]
+            wait_seconds = max(0.0, min(worker.deadline for worker in busy) - time.monotonic())
+            ready = set(connection.wait([worker.conn for worker in busy], timeout=wait_seconds))
+            now = time.monotonic()
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        message = worker.conn.recv()
+                    except EOFError:
+                        message = (False, f"loader process exited with code {worker.process.exitcode}")
+                    if not worker.ready:
+                        if message is None:
+                            worker.ready = True
+                        else:
+                            # Không khởi động được process (vd. lỗi import): không tạo lại
+                            logger.error(f"Loader process failed to start: {message[1]}")
+                            worker.stop(kill=True)
+                            workers.remove(worker)
+                        continue
+                    index, file_path = worker.task
+                    worker.task = None
+                    ok, payload = message
+                    if ok:
+                        documents, seconds = payload
+                        logger.info(f"Loaded '{os.path.basename(file_path)}': {len(documents)} documents "
+                                    f"in {seconds:.2f}s")
+                        documents_by_file[index] = documents
+                    else:
+                        logger.error(f"Error loading {os.path.basename(file_path)}: {payload}")
+                        failed[file_path] = payload
+                    if not worker.process.is_alive():
+                        worker.stop()
+                        workers[workers.index(worker)] = _LoaderWorker(context, timeout)
+                elif worker.deadline <= now:
+                    worker.stop(kill=True)
+                    if worker.task is None:
+                        logger.error(f"Loader process did not start within {timeout}s.")
+                        workers.remove(worker)
+                        continue
+                    logger.error(f"Timed out loading {os.path.basename(worker.task[1])} after {timeout}s. "
+                                 f"Skipping it.")
+                    failed[worker.task[1]] = f"timed out after {timeout}s"
+                    workers[workers.index(worker)] = _LoaderWorker(context, timeout)
+        for _, file_path in pending:
+            logger.error(f"Error loading {os.path.basename(file_path)}: no loader process could be started")
+            failed[file_path] = "no loader process could be started"
+    finally:
+        for worker in workers:
+            worker.stop(kill=worker.task is not None)
+    return _loaded(file_paths, documents_by_file), failed
+
+
+def _loaded(file_paths: List[str], documents_by_file: List[Optional[List[Document]]]) -> List[Tuple[str, List[Document]]]:
+    return [(file_path, documents) for file_path, documents in zip(file_paths, documents_by_file)
+            if documents is not None]
@@ -0,0 +1,78 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+# Tăng khi metadata gắn vào tài liệu/chunk thay đổi để index được build lại (2: start_index)
+METADATA_VERSION = 2
+
+# Loại tài liệu, dùng để lọc khi truy xuất
+DOC_TYPE_PROGRAM = "chuong_trinh_dao_tao"
+DOC_TYPE_HANDBOOK = "so_tay"
+DOC_TYPE_OTHER = "khac"
+
+_PROGRAM_RE = re.compile(r"chuong trinh dao tao nganh (.+)$")
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+# Chỉ tìm năm ở phần đầu tài liệu (thông tin chung / năm ban hành)
+_YEAR_SCAN_CHARS = 3000
+
+
+def _fold_table() -> Dict[int, Optional[str]]:
+    # Ký tự Latin có dấu (gồm tiếng Việt, U+00C0..U+1EFF) -> ký tự không dấu; dấu rời (NFD) -> bỏ
+    table: Dict[int, Optional[str]] = {ord("đ"): "d"}
+    for code in range(0x00C0, 0x1F00):
+        char = chr(code)
+        if unicodedata.category(char) == "Mn":
+            table[code] = None
+            continue
+        folded = "".join(c for c in unicodedata.normalize("NFD", char) if unicodedata.category(c) != "Mn")
+        if folded != char:
+            table[code] = folded
+    return table
+
+
+_FOLD_TABLE = _fold_table()
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics and collapse whitespace/punctuation."""
+    text = text.lower()
+    folded = text.translate(_FOLD_TABLE)
+    if not folded.isascii():
+        # Ký tự ngoài bảng (hiếm): bỏ dấu theo NFD như cũ
+        folded = unicodedata.normalize("NFD", text.replace("đ", "d"))
+        folded = "".join(c for c in folded if unicodedata.category(c) != "Mn")
+    return " ".join(_NON_WORD_RE.sub(" ", folded).split())
+
+
+def _title(file_path: str) -> str:
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def extract_metadata(file_path: str, documents: List[Document]) -> Dict[str, Optional[str]]:
+    """File-level metadata: major (display name), document type and year."""
+    title = _title(file_path)
+    normalized = normalize_text(title)
+    program = _PROGRAM_RE.search(normalized)
+    if program:
+        # Giữ nguyên cách viết trong tên file cho tên ngành hiển thị
+        major = re.sub(r"^.*?ngành\s+", "", title, flags=re.IGNORECASE).strip()
+        doc_type = DOC_TYPE_PROGRAM
+    else:
+        major = None
+        doc_type = DOC_TYPE_HANDBOOK if normalized.startswith("so tay") else DOC_TYPE_OTHER
+    year = _YEAR_RE.search(title)
+    if year is None and documents:
+        year = _YEAR_RE.search(documents[0].page_content[:_YEAR_SCAN_CHARS])
+    return {"major": major, "doc_type": doc_type, "year": int(year.group(1)) if year else None}
+
+
+def annotate_documents(file_path: str, documents: List[Document]) -> List[Document]:
+    """Attach file-level metadata to every document; PDF loaders already set ``page``."""
+    metadata = {key: value for key, value in extract_metadata(file_path, documents).items() if value is not None}
+    for doc in documents:
+        doc.metadata.update(metadata)
+    return documents
@@ -1,33 +1,115 @@
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
 from core.embeding.base import BaseEmbedding
+from core.embeding.query_cache import CachedQueryEmbeddings
+from core.embeding.bulk_embed import BulkEmbedder
+from core.embeding.lazy_model import LazyHuggingFaceEmbeddings
+from core.embeding.sqlite_docstore import DOCSTORE_FILE, SQLiteDocstore
+from core.retreival.bm25 import BM25Index
+from core.retreival.index_factory import build_index, set_search_params, supports_removal
+from core.retreival.metadata_filter import MetadataIndex
 from config.config import *
+from typing import Dict, List
+import copy
+import faiss
 import logging
+import numpy as np
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
 
 class HuggingEmbed(BaseEmbedding):
-    def __init__(self, name: str = MODEL_NAME_EMBEDDING):
-        self.embeddings = HuggingFaceEmbeddings(model_name=name)
+    def __init__(self, name: str = MODEL_NAME_EMBEDDING, query_cache_bytes: int = 32 * 1024 * 1024,
+                 query_cache_path: str = None, embed_batch_size: int = 64, embed_multi_process: bool = False,
+                 index_type: str = "flat", index_params: Dict = None, nprobe: int = None, ef_search: int = None,
+                 mmap: bool = False):
+        # Model chỉ được load khi dùng lần đầu (hoặc khi warm-up gọi self.model.load())
+        model = self.model = LazyHuggingFaceEmbeddings(model_name=name)
+        # Câu hỏi lặp lại (kể cả khác khoảng trắng/hoa thường) không phải chạy lại model
+        self.embeddings = CachedQueryEmbeddings(
+            model,
+            max_bytes=query_cache_bytes,
+            persist_path=query_cache_path
+        )
+        self.bulk_embedder = BulkEmbedder(model, batch_size=embed_batch_size, multi_process=embed_multi_process)
+        # Loại index FAISS (flat / hnsw / ivfpq) và tham số tìm kiếm áp dụng sau khi build/load
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.nprobe = nprobe
+        self.ef_search = ef_search
         self.vector_db = None
+        # mmap: index.faiss được memory-map và docstore đọc từ SQLite, các worker dùng chung page cache của OS
+        self.mmap = mmap
+        self._loaded_signature = None
+        self._checked_at = 0.0
+        # Index BM25 song song với FAISS, dùng chung docstore id
+        self.bm25 = None
+        self._metadata_index = None
+
+    def _embed_documents(self, documents: List[Document]):
+        texts = [doc.page_content for doc in documents]
+        vectors = self.bulk_embedder.embed_texts(texts)
+        return list(zip(texts, vectors.tolist())), [doc.metadata for doc in documents]
 
-    def create_vector_store(self, documents: Document) -> FAISS:
+    def create_vector_store(self, documents: Document, ids: List[str] = None) -> FAISS:
         """Create vector store from documents."""
-        self.vector_db = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+        text_embeddings, metadatas = self._embed_documents(documents)
+        vectors = np.array([vector for _, vector in text_embeddings], dtype=np.float32)
+        index = build_index(vectors, self.index_type, self.index_params)
+        set_search_params(index, self.nprobe, self.ef_search)
+        self.vector_db = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
         )
+        self.vector_db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self.bm25 = BM25Index()
+        self.bm25.add(self.vector_db.index_to_docstore_id.values(), (text for text, _ in text_embeddings))
         return self.vector_db
 
+    def fork(self, empty: bool = False) -> "HuggingEmbed":
+        """Return a staging copy that shares the model but owns a copy of the vector store."""
+        staging = copy.copy(self)
+        if empty or self.vector_db is None:
+            staging.vector_db = None
+            staging.bm25 = None
+        else:
+            staging.bm25 = self.bm25.copy() if self.bm25 is not None else None
+            staging.vector_db = FAISS(
+                embedding_function=self.embeddings,
+                index=self._owned_copy(self.vector_db.index),
+                docstore=InMemoryDocstore(self._docstore_dict(self.vector_db.docstore)),
+                index_to_docstore_id=dict(self.vector_db.index_to_docstore_id),
+            )
+        return staging
+
+    def _owned_copy(self, index: faiss.Index) -> faiss.Index:
+        # clone_index của index memory-map vẫn chỉ là view (không thêm vector được): sao chép qua serialize
+        if self.mmap:
+            return faiss.deserialize_index(faiss.serialize_index(index))
+        return faiss.clone_index(index)
+
+    @staticmethod
+    def _docstore_dict(docstore) -> Dict[str, Document]:
+        if isinstance(docstore, SQLiteDocstore):
+            return docstore.to_dict()
+        return dict(docstore._dict)
+
     def save_vector_store(self, path: str = "vectordb") -> None:
         """Save vector store to specified path."""
         if self.vector_db is not None:
             if not os.path.exists(path):
                 os.makedirs(path, exist_ok=True)
             self.vector_db.save_local(path)
+            if self.mmap:
+                SQLiteDocstore.write(os.path.join(path, DOCSTORE_FILE), self.vector_db.docstore,
+                                     self.vector_db.index_to_docstore_id)
+            if self.bm25 is not None:
+                self.bm25.save(path)
             logger.info(f"Vector store saved successfully to {path}")
         else:
             logger.warning("No vector store to save.")
@@ -36,13 +118,70 @@ class HuggingEmbed(BaseEmbedding):
         """Load vector store from specified path."""
         if not os.path.exists(path):
             raise FileNotFoundError(f"Vector store not found at {path}")
-        self.vector_db = FAISS.load_local(
-            path,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+        signature = self._index_signature(path)
+        if self.mmap:
+            self.vector_db = self.open_mapped(path)
+        else:
+            self.vector_db = FAISS.load_local(
+                path,
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+        self._loaded_signature = signature
+        set_search_params(self.vector_db.index, self.nprobe, self.ef_search)
+        try:
+            self.bm25 = BM25Index.load(path)
+        except (OSError, ValueError) as e:
+            # Index cũ chưa có BM25: build lại từ docstore (chỉ cần tách từ, không embed)
+            logger.info(f"BM25 index not usable ({e}). Rebuilding from docstore.")
+            self.bm25 = BM25Index()
+            self.bm25.add(
+                self.vector_db.index_to_docstore_id.values(),
+                (self.vector_db.docstore.search(i).page_content for i in self.vector_db.index_to_docstore_id.values())
+            )
+            self.bm25.save(path)
         logger.info("Vector store loaded successfully.")
 
+    def open_mapped(self, path: str) -> FAISS:
+        """Open a saved store without copying it into the heap: FAISS vectors via mmap, documents from SQLite.
+
+        Only flat vector storage (flat, HNSW) can be mapped; IVF-PQ lists
+        are still read into memory. The mapped index is read-only, so
+        updates go through :meth:`fork`. An index saved without the SQLite
+        docstore is converted once (read from ``index.pkl``).
+        """
+        docstore_path = os.path.join(path, DOCSTORE_FILE)
+        if not os.path.exists(docstore_path):
+            logger.info(f"No SQLite docstore in {path}. Converting index.pkl once.")
+            vector_db = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+            SQLiteDocstore.write(docstore_path, vector_db.docstore, vector_db.index_to_docstore_id)
+            del vector_db
+        docstore = SQLiteDocstore(docstore_path)
+        index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=docstore.index_to_docstore_id(),
+        )
+
+    @staticmethod
+    def _index_signature(path: str):
+        try:
+            stat = os.stat(os.path.join(path, "index.faiss"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def changed_on_disk(self, path: str = "vectordb", interval: float = 0.0) -> bool:
+        """True if ``index.faiss`` was replaced since it was loaded (e.g. by another worker); checked at most every ``interval`` s."""
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return False
+        self._checked_at = now
+        signature = self._index_signature(path)
+        return signature is not None and signature != self._loaded_signature
+
     def add_documents_to_store(self, documents: Document, path: str = "vectordb") -> None:
         """Add new documents to an existing vector store."""
         if not os.path.exists(path):
@@ -51,7 +190,42 @@ class HuggingEmbed(BaseEmbedding):
         else:
             self.load_vector_store(path)
             logger.info(f"Adding {len(documents)} new chunks to the existing vector store.")
-            self.vector_db.add_documents(documents)
+            self.add_documents(documents)
 
         self.save_vector_store(path)
-        logger.info("New documents successfully added and vector store saved.")
\ No newline at end of file
+        logger.info("New documents successfully added and vector store saved.")
+
+    def add_documents(self, documents: List[Document], ids: List[str] = None) -> None:
+        """Embed documents and add them to the in-memory vector store."""
+        if not documents:
+            return
+        if self.vector_db is None:
+            self.create_vector_store(documents, ids=ids)
+        else:
+            text_embeddings, metadatas = self._embed_documents(documents)
+            ids = self.vector_db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            if self.bm25 is not None:
+                self.bm25.add(ids, (text for text, _ in text_embeddings))
+
+    def metadata_index(self, vector_db: FAISS = None) -> MetadataIndex:
+        """Pre-filter index for ``vector_db`` (default: current store), rebuilt when the store is replaced."""
+        vector_db = vector_db or self.vector_db
+        cached = self._metadata_index
+        if cached is None or cached.vector_db is not vector_db:
+            cached = self._metadata_index = MetadataIndex(vector_db)
+        return cached
+
+    def supports_delete(self) -> bool:
+        """HNSW/IVF indexes cannot drop vectors in place; callers rebuild instead."""
+        return self.vector_db is None or supports_removal(self.vector_db.index)
+
+    def delete_documents(self, ids: List[str]) -> None:
+        """Remove documents from the in-memory vector store by docstore id."""
+        if self.vector_db is None or not ids:
+            return
+        existing = set(self.vector_db.index_to_docstore_id.values())
+        ids = [i for i in ids if i in existing]
+        if ids:
+            self.vector_db.delete(ids)
+            if self.bm25 is not None:
+                self.bm25.remove(ids)
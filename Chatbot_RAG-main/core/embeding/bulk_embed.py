@@ -0,0 +1,90 @@
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BulkEmbedder:
+    """Embeds large lists of chunks for index builds.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length (and, in multi-process mode, each worker receives chunks
+    of homogeneous length); vectors are returned in the original order.
+    Texts get the same preprocessing as ``HuggingFaceEmbeddings.embed_documents``
+    so the vectors match an index built through it.
+    """
+
+    def __init__(self, embeddings, batch_size: int = 64, multi_process: bool = False,
+                 log_every: int = 2048):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.multi_process = multi_process
+        self.log_every = log_every
+        self.last_stats: Dict[str, Any] = {}
+
+    def _sentence_transformer(self):
+        # HuggingFaceEmbeddings giữ model SentenceTransformer ở `_client` (bản cũ: `client`)
+        return getattr(self.embeddings, "_client", None) or getattr(self.embeddings, "client", None)
+
+    @staticmethod
+    def _prepare(text: str) -> str:
+        # Giống HuggingFaceEmbeddings.embed_documents / embed_query: thay xuống dòng bằng khoảng trắng
+        return text.replace("\n", " ")
+
+    def _encode_kwargs(self) -> Dict[str, Any]:
+        kwargs = dict(getattr(self.embeddings, "encode_kwargs", None) or {})
+        kwargs.pop("batch_size", None)
+        return kwargs
+
+    def _encode_single(self, model, texts: List[str]) -> np.ndarray:
+        if model is None:
+            return np.asarray(self.embeddings.embed_documents(texts), dtype="float32")
+        return model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                            show_progress_bar=False, **self._encode_kwargs()).astype("float32")
+
+    def _encode_multi_process(self, model, texts: List[str]) -> np.ndarray:
+        pool = model.start_multi_process_pool()
+        try:
+            normalize = self._encode_kwargs().get("normalize_embeddings", False)
+            vectors = model.encode_multi_process(texts, pool, batch_size=self.batch_size,
+                                                 normalize_embeddings=normalize)
+        finally:
+            model.stop_multi_process_pool(pool)
+        return np.asarray(vectors, dtype="float32")
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts and return a float32 matrix aligned with the input order."""
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        start = time.perf_counter()
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_texts = [self._prepare(texts[i]) for i in order]
+        model = self._sentence_transformer()
+
+        if self.multi_process and model is not None:
+            sorted_vectors = self._encode_multi_process(model, sorted_texts)
+        else:
+            parts = []
+            for offset in range(0, len(sorted_texts), self.log_every):
+                parts.append(self._encode_single(model, sorted_texts[offset:offset + self.log_every]))
+                done = min(offset + self.log_every, len(sorted_texts))
+                logger.info(f"Embedded {done}/{len(sorted_texts)} chunks "
+                            f"({done / (time.perf_counter() - start):.1f} chunks/sec)")
+            sorted_vectors = np.vstack(parts)
+
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "chunks": len(texts),
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(len(texts) / elapsed, 1) if elapsed else None,
+            "batch_size": self.batch_size,
+            "multi_process": bool(self.multi_process and model is not None),
+        }
+        logger.info(f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+                    f"({self.last_stats['chunks_per_sec']} chunks/sec)")
+        return vectors
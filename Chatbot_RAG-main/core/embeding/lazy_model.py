@@ -0,0 +1,51 @@
+import logging
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class LazyHuggingFaceEmbeddings(Embeddings):
+    """HuggingFaceEmbeddings that is only imported and loaded on first use.
+
+    Importing sentence-transformers (torch) and loading the weights takes
+    seconds; deferring it lets the web server start serving first and warm
+    the model up in the background (``load()``). Attributes of the real
+    model (``_client``, ``encode_kwargs``...) are forwarded once loaded.
+    """
+
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+        self._kwargs = kwargs
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    self._model = HuggingFaceEmbeddings(model_name=self.model_name, **self._kwargs)
+                    self.load_seconds = time.perf_counter() - start
+                    logger.info(f"Loaded embedding model {self.model_name} in {self.load_seconds:.1f}s")
+        return self._model
+
+    def embed_documents(self, texts):
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.load().embed_query(text)
+
+    def __getattr__(self, name):
+        # Chỉ gọi khi thuộc tính không có trên wrapper
+        if name.startswith("__") or name in ("_model", "_kwargs", "_lock"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
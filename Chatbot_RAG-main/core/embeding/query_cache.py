@@ -0,0 +1,134 @@
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Chi phí ước lượng cho key + entry của OrderedDict ngoài phần vector
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query so whitespace/case variants share one cache entry."""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embedding model with a bounded LRU cache of query text -> vector.
+
+    Only ``embed_query`` is cached; document embedding is delegated untouched.
+    Entries are keyed by the normalized query, but a miss embeds the query
+    as given, so the vectors are the model's own. Memory use is capped in
+    bytes, and the cache can be persisted to an ``.npz`` file so it survives
+    restarts.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_bytes: int = 32 * 1024 * 1024,
+                 persist_path: str = None, persist_every: int = 100):
+        self.embeddings = embeddings
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+        self.persist_every = persist_every
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self.load()
+
+    @staticmethod
+    def _entry_bytes(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+
+    def _put(self, key: str, vector: np.ndarray) -> None:
+        if key in self._cache:
+            return
+        self._cache[key] = vector
+        self._bytes += self._entry_bytes(key, vector)
+        while self._bytes > self.max_bytes and self._cache:
+            old_key, old_vector = self._cache.popitem(last=False)
+            self._bytes -= self._entry_bytes(old_key, old_vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector.tolist()
+            self.misses += 1
+        vector = np.asarray(self.embeddings.embed_query(text), dtype="float32")
+        with self._lock:
+            self._put(key, vector)
+            self._unsaved += 1
+            should_save = self.persist_path and self._unsaved >= self.persist_every
+        if should_save:
+            self.save()
+        return vector.tolist()
+
+    def save(self) -> None:
+        """Write the cache to ``persist_path`` atomically."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            keys = list(self._cache.keys())
+            vectors = np.stack(list(self._cache.values())) if keys else np.zeros((0, 0), dtype="float32")
+            self._unsaved = 0
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        tmp_path = self.persist_path + ".tmp.npz"
+        # Key là mảng chuỗi thường (không phải object) để đọc lại được với allow_pickle=False
+        np.savez(tmp_path, keys=np.array(keys, dtype=str), vectors=vectors,
+                 model=np.array(self._model_name()))
+        os.replace(tmp_path, self.persist_path)
+        logger.info(f"Saved {len(keys)} cached query embeddings to {self.persist_path}")
+
+    def load(self) -> None:
+        """Load a persisted cache, ignoring it if it was built by another model."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            data = np.load(self.persist_path, allow_pickle=False)
+            if str(data["model"]) != self._model_name():
+                logger.info("Query embedding cache was built with another model. Ignoring it.")
+                return
+            try:
+                keys = data["keys"]
+            except ValueError:
+                # Bản cũ lưu key dạng object (cần pickle) và vector của câu hỏi đã viết thường: bỏ qua
+                logger.info("Query embedding cache uses an older format. Ignoring it.")
+                return
+            with self._lock:
+                for key, vector in zip(keys, data["vectors"]):
+                    self._put(str(key), np.asarray(vector, dtype="float32"))
+            logger.info(f"Loaded {len(self._cache)} cached query embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Could not load query embedding cache {self.persist_path}: {e}")
+
+    def _model_name(self) -> str:
+        return str(getattr(self.embeddings, "model_name", type(self.embeddings).__name__))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Union
+
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_FILE = "docstore.sqlite3"
+
+SCHEMA = """
+CREATE TABLE documents (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+"""
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only docstore in an SQLite file next to ``index.faiss``.
+
+    Chunk text and metadata stay on disk and are read through SQLite's
+    memory-mapped I/O, so several uvicorn workers serving the same index
+    share those pages through the OS page cache instead of each holding an
+    unpickled copy. Each thread gets its own read-only connection.
+    The store cannot be modified (it is not an ``AddableMixin``, so FAISS
+    refuses to add texts to it); modifications go through a forked
+    (in-memory) copy, see ``HuggingEmbed.fork``.
+    """
+
+    def __init__(self, path: str, mmap_bytes: int = 1 << 30):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Docstore not found at {path}")
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _document(doc_id: str, page_content: str, metadata: str) -> Document:
+        return Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._connection().execute(
+            "SELECT id, page_content, metadata FROM documents WHERE id = ?", (search,)
+        ).fetchone()
+        # Cùng quy ước với InMemoryDocstore: không có thì trả về chuỗi
+        return self._document(*row) if row else f"ID {search} not found."
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def to_dict(self) -> Dict[str, Document]:
+        """All documents, e.g. to seed an ``InMemoryDocstore`` copy."""
+        rows = self._connection().execute("SELECT id, page_content, metadata FROM documents")
+        return {row[0]: self._document(*row) for row in rows}
+
+    def index_to_docstore_id(self) -> Dict[int, str]:
+        return dict(self._connection().execute("SELECT position, id FROM documents ORDER BY position"))
+
+    @staticmethod
+    def write(path: str, docstore: Docstore, index_to_docstore_id: Dict[int, str]) -> None:
+        """Write the documents of a FAISS store to ``path`` (via a temp file and rename)."""
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                rows = ((position, doc_id, document.page_content,
+                         json.dumps(document.metadata, ensure_ascii=False, default=str))
+                        for position, doc_id in index_to_docstore_id.items()
+                        for document in (docstore.search(doc_id),))
+                conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
@@ -0,0 +1,124 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class RetrainJob:
+    """One background index build, with progress reporting."""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Đang chờ trong hàng đợi"
+        self.error: Optional[str] = None
+        # {file: lý do} của các file không load được; chúng không vào manifest nên lần train sau sẽ thử lại
+        self.failed_files: Dict[str, str] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job has finished (successfully or not)."""
+        return self._done.wait(timeout)
+
+    def update(self, progress: float, message: str) -> None:
+        """Progress callback handed to the build functions."""
+        self.progress = round(progress, 3)
+        self.message = message
+        logger.info(f"Retrain job {self.id}: {progress:.0%} {message}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "failed_files": self.failed_files,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class RetrainJobQueue:
+    """Runs index builds one at a time on a background thread.
+
+    Submitting a job whose parameters match one that is still queued returns
+    the queued job instead of adding another, so a burst of uploads causes a
+    single rebuild.
+    """
+
+    def __init__(self, runner: Callable[[RetrainJob], Any], max_history: int = 50, autostart: bool = True):
+        self.runner = runner
+        self.max_history = max_history
+        self._jobs: "OrderedDict[str, RetrainJob]" = OrderedDict()
+        self._queue: "queue.Queue[RetrainJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="retrain-worker", daemon=True)
+        if autostart:
+            self.start()
+
+    def start(self) -> None:
+        """Start the worker; jobs submitted before are kept queued until then."""
+        with self._lock:
+            if self._worker.ident is None:
+                self._worker.start()
+
+    def submit(self, **params) -> RetrainJob:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED and job.params == params:
+                    return job
+            job = RetrainJob(params)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status in (QUEUED, RUNNING):
+                    break
+                del self._jobs[oldest_id]
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[RetrainJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[RetrainJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.update(0.0, "Đang train lại vector store")
+            try:
+                self.runner(job)
+                job.status = SUCCEEDED
+                message = "Hoàn tất. Vector store đã được cập nhật."
+                if job.failed_files:
+                    message += (f" Không load được {len(job.failed_files)} file, sẽ thử lại ở lần train sau: "
+                                f"{', '.join(sorted(job.failed_files))}.")
+                job.update(1.0, message)
+            except Exception as e:
+                logger.exception(f"Retrain job {job.id} failed")
+                job.status = FAILED
+                job.error = str(e)
+                job.message = f"Train lại thất bại: {e}"
+            finally:
+                job.finished_at = time.time()
+                job._done.set()
+                self._queue.task_done()
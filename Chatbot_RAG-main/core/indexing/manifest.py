@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Collection, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """Tracks the content hash and the vector ids of every indexed file.
+
+    The manifest lives next to ``index.faiss`` so that an index directory is
+    always self-describing: which file produced which chunks, and from which
+    version of that file.
+    """
+
+    def __init__(self, files: Dict[str, Dict] = None, params: Dict = None):
+        # {filename: {"hash": str, "ids": [docstore ids]}}
+        self.files: Dict[str, Dict] = files or {}
+        # Tham số build index (vd. chunk_size); đổi tham số thì phải build lại toàn bộ
+        self.params: Dict = params or {}
+
+    @classmethod
+    def load(cls, index_path: str) -> "IndexManifest":
+        """Load the manifest of an index directory, empty if missing or unreadable."""
+        manifest_path = os.path.join(index_path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return cls()
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data.get("files", {}), data.get("params", {}))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read index manifest {manifest_path}: {e}")
+            return cls()
+
+    def save(self, index_path: str) -> None:
+        """Write the manifest atomically into the index directory."""
+        os.makedirs(index_path, exist_ok=True)
+        manifest_path = os.path.join(index_path, MANIFEST_FILE)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"params": self.params, "files": self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def is_empty(self) -> bool:
+        return not self.files
+
+    def set_file(self, filename: str, file_hash: str, ids: List[str]) -> None:
+        self.files[filename] = {"hash": file_hash, "ids": list(ids)}
+
+    def remove_file(self, filename: str) -> List[str]:
+        """Forget a file and return the vector ids that belonged to it."""
+        entry = self.files.pop(filename, None)
+        return entry["ids"] if entry else []
+
+    def diff(self, current_hashes: Dict[str, str],
+             scope: Optional[Collection[str]] = None) -> Tuple[List[str], List[str]]:
+        """Compare the manifest with the files currently on disk.
+
+        With ``scope``, only those file names are considered (e.g. the files
+        a directory watcher saw change); ``current_hashes`` then only needs
+        the ones that still exist.
+
+        Returns:
+            (changed, removed): files that are new or whose content changed,
+            and files that are in the manifest but no longer on disk.
+        """
+        changed = sorted(
+            name for name, file_hash in current_hashes.items()
+            if self.files.get(name, {}).get("hash") != file_hash
+        )
+        removed = sorted(
+            name for name in self.files
+            if name not in current_hashes and (scope is None or name in scope)
+        )
+        return changed, removed
+
+    @staticmethod
+    def chunk_ids(filename: str, file_hash: str, count: int) -> List[str]:
+        """Deterministic docstore ids for the chunks of one file version."""
+        prefix = hashlib.sha1(f"{filename}:{file_hash}".encode("utf-8")).hexdigest()[:16]
+        return [f"{prefix}-{i}" for i in range(count)]
@@ -0,0 +1,32 @@
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+
+def replace_directory(new_path: str, target_path: str) -> None:
+    """Swap a fully written directory into place.
+
+    The old directory is renamed aside before the new one is renamed into
+    place, so ``target_path`` always refers to a complete index; if the
+    process dies in between, :func:`recover_directory` restores the old one.
+    """
+    backup_path = target_path + ".old"
+    if os.path.exists(backup_path):
+        shutil.rmtree(backup_path, ignore_errors=True)
+    if os.path.exists(target_path):
+        os.replace(target_path, backup_path)
+    os.replace(new_path, target_path)
+    shutil.rmtree(backup_path, ignore_errors=True)
+
+
+def recover_directory(target_path: str) -> None:
+    """Undo a swap interrupted between its two renames."""
+    backup_path = target_path + ".old"
+    if not os.path.exists(target_path) and os.path.exists(backup_path):
+        logger.warning(f"Restoring {target_path} from interrupted index swap.")
+        os.replace(backup_path, target_path)
+    tmp_path = target_path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path, ignore_errors=True)
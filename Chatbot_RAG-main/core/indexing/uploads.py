@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from core.indexing.manifest import file_sha256
+
+CHUNK_SIZE = 1 << 20
+# File tạm nằm cùng thư mục đích (để os.replace là nguyên tử); đuôi .part không được index
+TEMP_PREFIX = ".upload-"
+TEMP_SUFFIX = ".part"
+
+STORED = "stored"
+UNCHANGED = "unchanged"
+DUPLICATE = "duplicate"
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    filename: str
+    sha256: str
+    size: int
+    # stored: đã ghi vào thư mục dữ liệu; unchanged: cùng tên, cùng nội dung; duplicate: trùng nội dung file khác
+    status: str
+    duplicate_of: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """Base name of an uploaded file name; rejects names that would escape the data directory."""
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name or name.startswith("."):
+        raise ValueError(f"Invalid file name: {filename!r}")
+    return name
+
+
+def _write_block(f, digest, block: bytes) -> None:
+    digest.update(block)
+    f.write(block)
+
+
+async def save_upload(source, directory: str, filename: str, max_bytes: int,
+                      known_hashes: Dict[str, str], chunk_size: int = CHUNK_SIZE) -> StoredUpload:
+    """Stream an upload into ``directory/filename`` without blocking the event loop.
+
+    ``source`` only needs an ``async read(size)`` (e.g. ``UploadFile``).
+    Blocks are hashed and written to a temp file in a worker thread; the
+    temp file is renamed into place only when the whole upload is within
+    ``max_bytes`` and its content is not already on disk, either under the
+    same name or under the file ``known_hashes`` ({hash: filename}) maps
+    its SHA-256 to. Candidates are confirmed by size and hash, since the
+    mapping may be stale. ``known_hashes`` is updated with stored files so
+    duplicates inside one batch are caught as well.
+    """
+    loop = asyncio.get_running_loop()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                block = await source.read(chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(filename)
+                await loop.run_in_executor(None, _write_block, f, digest, block)
+        file_hash = digest.hexdigest()
+        for existing in dict.fromkeys(name for name in (filename, known_hashes.get(file_hash)) if name):
+            path = os.path.join(directory, existing)
+            if (os.path.isfile(path) and os.path.getsize(path) == size
+                    and await loop.run_in_executor(None, file_sha256, path) == file_hash):
+                os.remove(tmp_path)
+                if existing == filename:
+                    return StoredUpload(filename, file_hash, size, UNCHANGED)
+                return StoredUpload(filename, file_hash, size, DUPLICATE, duplicate_of=existing)
+        os.replace(tmp_path, os.path.join(directory, filename))
+        known_hashes[file_hash] = filename
+        return StoredUpload(filename, file_hash, size, STORED)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def cleanup_partial_uploads(directory: str) -> int:
+    """Remove temp files left behind by uploads interrupted by a crash."""
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith(TEMP_PREFIX) and name.endswith(TEMP_SUFFIX):
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware answering 413 before the body is read when Content-Length is over a path's limit.
+
+    Chunked requests without Content-Length are still bounded per file by
+    :func:`save_upload`.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], detail: str = "Upload too large."):
+        self.app = app
+        self.limits = limits
+        self.detail = detail
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.limits:
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.limits[scope["path"]]:
+                response = JSONResponse({"detail": self.detail}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryWatcher:
+    """Watches a data directory and reports the files changed by each burst of events.
+
+    Runs ``watchfiles`` in a daemon thread. Events are collected until the
+    directory has been quiet for ``quiet_seconds`` (a large copy emits many
+    events), then ``on_change`` is called once with the sorted names of the
+    files that were added, modified or deleted. Only top-level files with
+    one of ``extensions`` count; dotfiles (e.g. in-progress uploads) are
+    ignored.
+    """
+
+    def __init__(self, directory: str, on_change: Callable[[List[str]], Any], extensions: Sequence[str],
+                 quiet_seconds: float = 2.0):
+        self.directory = os.path.abspath(directory)
+        self.on_change = on_change
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.quiet_seconds = quiet_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self.last_event_at: Optional[float] = None
+        self.last_flush_at: Optional[float] = None
+        self.last_files: List[str] = []
+        self.last_result: Any = None
+        self.flushes = 0
+        self.error: Optional[str] = None
+
+    def _accepts(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return (os.path.dirname(os.path.abspath(path)) == self.directory and not name.startswith(".")
+                and name.lower().endswith(self.extensions))
+
+    def start(self) -> bool:
+        """Start watching; False if ``watchfiles`` is not installed or the watcher already runs."""
+        try:
+            import watchfiles  # noqa: F401
+        except ImportError:
+            self.error = "watchfiles is not installed"
+            logger.warning("watchfiles is not installed; data directory watcher disabled.")
+            return False
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+            self._thread.start()
+        logger.info(f"Watching {self.directory} for document changes.")
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        from watchfiles import watch
+
+        try:
+            # Hết rust_timeout mà không có sự kiện thì watch() trả về tập rỗng: dùng để kiểm tra khoảng lặng
+            for changes in watch(self.directory, watch_filter=lambda change, path: self._accepts(path),
+                                 stop_event=self._stop, recursive=False, yield_on_timeout=True,
+                                 rust_timeout=int(self.quiet_seconds * 1000) or 1):
+                now = time.monotonic()
+                with self._lock:
+                    if changes:
+                        self._pending.update(os.path.basename(path) for _, path in changes)
+                        self.last_event_at = now
+                    due = self._pending and now - self.last_event_at >= self.quiet_seconds
+                if due:
+                    self.flush()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Data directory watcher stopped: {e}")
+
+    def flush(self) -> Optional[List[str]]:
+        """Hand the pending changed files to ``on_change`` now."""
+        with self._lock:
+            files = sorted(self._pending)
+            self._pending.clear()
+        if not files:
+            return None
+        logger.info(f"Detected {len(files)} changed document(s) in {self.directory}: {files}")
+        try:
+            result = self.on_change(files)
+            self.error = None
+        except Exception as e:
+            result = None
+            self.error = str(e)
+            logger.error(f"Could not handle document changes {files}: {e}")
+        with self._lock:
+            self.flushes += 1
+            self.last_flush_at = time.time()
+            self.last_files = files
+            self.last_result = result
+        return files
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "directory": self.directory,
+                "quiet_seconds": self.quiet_seconds,
+                "pending": sorted(self._pending),
+                "seconds_since_last_event": round(time.monotonic() - self.last_event_at, 1)
+                if self.last_event_at is not None else None,
+                "flushes": self.flushes,
+                "last_flush_at": self.last_flush_at,
+                "last_files": self.last_files,
+                "last_result": self.last_result,
+                "error": self.error,
+            }
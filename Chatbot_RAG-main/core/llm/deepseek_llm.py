@@ -9,18 +9,49 @@ api_key = os.getenv("Deepseek_api_key")
 
 
 class DeepSeekLLM:
-    def __init__(self, model_name: str = "deepseek-chat", api_key: str = None):
+    def __init__(self, model_name: str = "deepseek-chat", api_key: str = None, timeout: float = None,
+                 max_retries: int = 2):
         self.model_name = model_name
         self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._llm = None
 
     def get_llm(self):
-        return ChatDeepSeek(model_name=self.model_name, api_key=self.api_key)
+        # Tạo ChatDeepSeek một lần: client HTTP bên trong giữ kết nối keep-alive giữa các request
+        if self._llm is None:
+            self._llm = ChatDeepSeek(model_name=self.model_name, api_key=self.api_key,
+                                     timeout=self.timeout, max_retries=self.max_retries)
+        return self._llm
 
-    def post_request(self, prompt: str) -> List[str]:
+    @staticmethod
+    def _messages(prompt):
+        # Prefix tĩnh đi trong system message: DeepSeek tự cache phần đầu giống nhau giữa các request
+        if isinstance(prompt, str):
+            return prompt
+        return [("system", prompt.system), ("human", prompt.user)]
+
+    def post_request(self, prompt) -> List[str]:
+        llm = self.get_llm()
+        response = llm.invoke(self._messages(prompt))
+        return response.content
+
+    async def apost_request(self, prompt) -> List[str]:
         llm = self.get_llm()
-        response = llm.invoke(prompt)
+        response = await llm.ainvoke(self._messages(prompt))
         return response.content
 
+    def stream_request(self, prompt):
+        """Yield the completion text chunk by chunk."""
+        for chunk in self.get_llm().stream(self._messages(prompt)):
+            if chunk.content:
+                yield chunk.content
+
+    async def astream_request(self, prompt):
+        async for chunk in self.get_llm().astream(self._messages(prompt)):
+            if chunk.content:
+                yield chunk.content
+
 
 if __name__ == "__main__":
     deepseek_llm = DeepSeekLLM(api_key=api_key)
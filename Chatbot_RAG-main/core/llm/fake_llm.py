@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from core.rag.tokens import estimate_tokens
+
+
+class FakeLLM:
+    """Offline stand-in for LLM/DeepSeekLLM with a fixed latency, used by benchmarks.
+
+    Counts (estimated) input tokens per call. With ``prefix_cache`` a
+    prompt's static ``system`` prefix is only billed the first time it is
+    seen, like a provider-side cached prefix.
+    """
+
+    def __init__(self, model_name: str = "fake-llm", api_key: str = None, latency: float = 0.5,
+                 answer: str = "<p>Câu trả lời mẫu.</p>", prefix_cache: bool = False):
+        self.model_name = model_name
+        self.latency = latency
+        self.answer = answer
+        self.prefix_cache = prefix_cache
+        self.prompts = []
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def _record(self, prompt) -> None:
+        with self._lock:
+            self.prompts.append(prompt)
+            self.calls += 1
+            if isinstance(prompt, str):
+                self.input_tokens += estimate_tokens(prompt)
+                return
+            self.input_tokens += estimate_tokens(prompt.user)
+            prefix_tokens = estimate_tokens(prompt.system)
+            if self.prefix_cache and prompt.system in self._prefixes:
+                self.cached_tokens += prefix_tokens
+            else:
+                self.input_tokens += prefix_tokens
+                self._prefixes.add(prompt.system)
+
+    def usage(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "input_tokens_per_call": round(self.input_tokens / self.calls, 1) if self.calls else 0.0,
+            }
+
+    def post_request(self, prompt) -> str:
+        self._record(prompt)
+        time.sleep(self.latency)
+        return self.answer
+
+    async def apost_request(self, prompt) -> str:
+        self._record(prompt)
+        await asyncio.sleep(self.latency)
+        return self.answer
+
+    def _pieces(self):
+        words = self.answer.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def stream_request(self, prompt):
+        """Yield the canned answer word by word, spreading the latency over the words."""
+        self._record(prompt)
+        pieces = self._pieces()
+        for piece in pieces:
+            time.sleep(self.latency / len(pieces))
+            yield piece
+
+    async def astream_request(self, prompt):
+        self._record(prompt)
+        pieces = self._pieces()
+        for piece in pieces:
+            await asyncio.sleep(self.latency / len(pieces))
+            yield piece
@@ -1,17 +1,106 @@
+import datetime
+import logging
+import threading
+import time
+
 import google.generativeai as genai
 from config.config import *
 
+logger = logging.getLogger(__name__)
+
+
+def chunk_text(chunk) -> str:
+    """Text of a streamed response chunk; empty for chunks without text parts.
+
+    ``chunk.text`` raises ``ValueError`` on chunks that carry no text, e.g.
+    a safety-blocked candidate or a final chunk with only the finish reason.
+    """
+    candidates = getattr(chunk, "candidates", None)
+    if not candidates or not getattr(candidates[0].content, "parts", None):
+        feedback = getattr(chunk, "prompt_feedback", None)
+        if getattr(feedback, "block_reason", None):
+            logger.warning(f"Gemini blocked the prompt: {feedback.block_reason}")
+        elif candidates and getattr(candidates[0], "finish_reason", None) not in (None, 0, 1):
+            # 0 = không xác định, 1 = STOP; còn lại (SAFETY, RECITATION...) là câu trả lời bị cắt
+            logger.warning(f"Gemini stopped the answer early: finish_reason={candidates[0].finish_reason}")
+        return ""
+    try:
+        return chunk.text
+    except ValueError:
+        # Part không phải text (vd. function call)
+        return ""
+
 
 class LLM:
-    def __init__(self, model_name=MODEL_NAME_LLM, api_key: str = None):
-        genai.configure(api_key=api_key)
+    def __init__(self, model_name=MODEL_NAME_LLM, api_key: str = None, timeout: float = None,
+                 configure: bool = True, cache_prefix: bool = False, cache_ttl: float = 3600):
+        # genai.configure là cấu hình toàn cục của process: registry chỉ gọi một lần
+        if configure:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
         self.llm = genai.GenerativeModel(model_name=model_name)
+        self.request_options = {"timeout": timeout} if timeout else None
         self.template = None
+        # Model theo từng prefix (system instruction) của template: {system: (model, hết hạn)}
+        self.cache_prefix = cache_prefix
+        self.cache_ttl = cache_ttl
+        self._prefixed = {}
+        self._lock = threading.Lock()
 
     def get_query_prompt(self, question: str):
         self.template = {question}
         return self.template
 
-    def post_request(self, prompt: str):
-        response = self.llm.generate_content(prompt)
-        return response.text
\ No newline at end of file
+    def _create_prefixed_model(self, system: str):
+        if self.cache_prefix:
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=self.model_name, system_instruction=system,
+                    ttl=datetime.timedelta(seconds=self.cache_ttl),
+                )
+                # Làm mới trước khi cache hết hạn phía server
+                return genai.GenerativeModel.from_cached_content(cached), time.monotonic() + 0.9 * self.cache_ttl
+            except Exception as e:
+                # Model / prefix không hỗ trợ cached content (vd. prefix dưới số token tối thiểu)
+                logger.warning(f"Gemini cached content unavailable ({e}); using system_instruction.")
+                self.cache_prefix = False
+        return genai.GenerativeModel(model_name=self.model_name, system_instruction=system), float("inf")
+
+    def _model_for(self, prompt):
+        """(model, contents): a prompt with a static prefix goes through that prefix's model."""
+        if isinstance(prompt, str):
+            return self.llm, prompt
+        entry = self._prefixed.get(prompt.system)
+        if entry is None or entry[1] <= time.monotonic():
+            with self._lock:
+                entry = self._prefixed.get(prompt.system)
+                if entry is None or entry[1] <= time.monotonic():
+                    entry = self._create_prefixed_model(prompt.system)
+                    self._prefixed[prompt.system] = entry
+        return entry[0], prompt.user
+
+    def post_request(self, prompt):
+        model, contents = self._model_for(prompt)
+        response = model.generate_content(contents, request_options=self.request_options)
+        return response.text
+
+    async def apost_request(self, prompt):
+        model, contents = self._model_for(prompt)
+        response = await model.generate_content_async(contents, request_options=self.request_options)
+        return response.text
+
+    def stream_request(self, prompt):
+        """Yield the completion text chunk by chunk as Gemini produces it."""
+        model, contents = self._model_for(prompt)
+        for chunk in model.generate_content(contents, stream=True, request_options=self.request_options):
+            text = chunk_text(chunk)
+            if text:
+                yield text
+
+    async def astream_request(self, prompt):
+        model, contents = self._model_for(prompt)
+        response = await model.generate_content_async(contents, stream=True, request_options=self.request_options)
+        async for chunk in response:
+            text = chunk_text(chunk)
+            if text:
+                yield text
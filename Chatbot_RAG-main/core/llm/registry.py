@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+# Lỗi tạm thời (quá tải, rate limit, timeout, mất kết nối) của Gemini (google.api_core) và DeepSeek (openai)
+TRANSIENT_ERROR_NAMES = {
+    "ServiceUnavailable", "TooManyRequests", "ResourceExhausted", "DeadlineExceeded", "InternalServerError",
+    "APIConnectionError", "APITimeoutError", "RateLimitError",
+}
+
+
+def is_transient_error(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class LatencyMetrics:
+    """Thread-safe latency counters over a sliding window of recent requests."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.fallbacks = 0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.count += 1
+            if not ok:
+                self.errors += 1
+            self._samples.append(seconds)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            stats = {"count": self.count, "errors": self.errors, "retries": self.retries,
+                     "fallbacks": self.fallbacks}
+        if samples:
+            stats.update({
+                "avg_ms": round(1000 * sum(samples) / len(samples), 1),
+                "p50_ms": round(1000 * samples[len(samples) // 2], 1),
+                "p95_ms": round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+                "max_ms": round(1000 * samples[-1], 1),
+            })
+        return stats
+
+
+class LLMClient:
+    """Shared LLM backend with retry/backoff on transient errors and per-request latency metrics."""
+
+    def __init__(self, backend: str, llm, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX):
+        self.backend = backend
+        self.llm = llm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = LatencyMetrics()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.max_retries or not is_transient_error(error):
+            return False
+        self.metrics.record_retry()
+        logger.warning(f"Transient {self.backend} error (attempt {attempt + 1}): {error}. Retrying...")
+        return True
+
+    def post_request(self, prompt: str) -> str:
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                answer = self.llm.post_request(prompt)
+                self.metrics.record(time.perf_counter() - start)
+                return answer
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    raise
+                time.sleep(self._backoff(attempt))
+
+    async def apost_request(self, prompt: str) -> str:
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                answer = await self.llm.apost_request(prompt)
+                self.metrics.record(time.perf_counter() - start)
+                return answer
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    def _should_fall_back(self, error: Exception, started: bool) -> bool:
+        # Stream lỗi tạm thời trước chunk đầu tiên và đã hết lượt retry: thử một request không stream
+        if started or not is_transient_error(error):
+            return False
+        self.metrics.record_fallback()
+        logger.warning(f"Streaming from {self.backend} kept failing ({error}). Falling back to a single request.")
+        return True
+
+    def stream_request(self, prompt: str):
+        """Stream the completion; retries are only possible before the first chunk is yielded.
+
+        When every streaming attempt fails with a transient error before
+        producing text, the answer is requested once without streaming and
+        yielded as a single chunk.
+        """
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                for text in self.llm.stream_request(prompt):
+                    started = True
+                    yield text
+                self.metrics.record(time.perf_counter() - start)
+                return
+            except Exception as e:
+                if not started and self._should_retry(e, attempt):
+                    time.sleep(self._backoff(attempt))
+                    continue
+                if not self._should_fall_back(e, started):
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    raise
+                error = e
+                break
+        try:
+            answer = self.llm.post_request(prompt)
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, ok=False)
+            raise error
+        self.metrics.record(time.perf_counter() - start)
+        yield answer
+
+    async def astream_request(self, prompt: str):
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async for text in self.llm.astream_request(prompt):
+                    started = True
+                    yield text
+                self.metrics.record(time.perf_counter() - start)
+                return
+            except Exception as e:
+                if not started and self._should_retry(e, attempt):
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                if not self._should_fall_back(e, started):
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    raise
+                error = e
+                break
+        try:
+            answer = await self.llm.apost_request(prompt)
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, ok=False)
+            raise error
+        self.metrics.record(time.perf_counter() - start)
+        yield answer
+
+
+_clients: Dict[str, LLMClient] = {}
+_lock = threading.Lock()
+
+
+def _create_backend(backend: str):
+    if backend == "gemini":
+        import google.generativeai as genai
+        from core.llm.gemini_llm import LLM
+
+        genai.configure(api_key=os.getenv("Gemini_api_key"), transport=os.getenv("GEMINI_TRANSPORT") or None)
+        # GEMINI_CACHE_PREFIX=1: prefix tĩnh của prompt qua cached content (nếu model hỗ trợ), thay vì system instruction
+        return LLM(timeout=LLM_TIMEOUT, configure=False,
+                   cache_prefix=os.getenv("GEMINI_CACHE_PREFIX", "0") == "1",
+                   cache_ttl=float(os.getenv("GEMINI_CACHE_TTL", "3600")))
+    if backend == "deepseek":
+        from core.llm.deepseek_llm import DeepSeekLLM
+
+        # Retry do LLMClient đảm nhiệm để có backoff và metrics thống nhất giữa các backend
+        return DeepSeekLLM(api_key=os.getenv("Deepseek_api_key"), timeout=LLM_TIMEOUT, max_retries=0)
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+def get_llm(backend: str = None) -> LLMClient:
+    """Return the process-wide client of a backend, creating it on first use."""
+    backend = backend or LLM_BACKEND
+    client = _clients.get(backend)
+    if client is None:
+        with _lock:
+            client = _clients.get(backend)
+            if client is None:
+                logger.info(f"Creating shared LLM client for backend '{backend}'.")
+                client = LLMClient(backend, _create_backend(backend))
+                _clients[backend] = client
+    return client
+
+
+def register_llm(backend: str, llm) -> LLMClient:
+    """Install a custom backend object (e.g. FakeLLM in benchmarks) under a backend name."""
+    with _lock:
+        client = LLMClient(backend, llm)
+        _clients[backend] = client
+    return client
+
+
+def llm_metrics() -> Dict[str, Dict[str, Any]]:
+    return {backend: client.metrics.snapshot() for backend, client in _clients.items()}
@@ -0,0 +1,35 @@
+import os
+from typing import Dict, Optional
+
+# Trường trong /proc/self/status và /proc/self/smaps_rollup (đơn vị kB)
+_STATUS_FIELDS = {"VmRSS": "rss_mb", "RssAnon": "rss_anon_mb", "RssFile": "rss_file_mb", "RssShmem": "rss_shmem_mb"}
+_ROLLUP_FIELDS = {"Pss": "pss_mb", "Shared_Clean": "shared_clean_mb"}
+
+
+def _read_kb_fields(path: str, fields: Dict[str, str]) -> Dict[str, float]:
+    values = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    values[fields[key]] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """Resident memory of a process (Linux /proc), split into private (anon) and file-backed pages.
+
+    ``pss_mb`` charges shared pages (memory-mapped index, SQLite docstore,
+    page cache) proportionally to every process mapping them, so summing it
+    over uvicorn workers gives their real combined footprint. Empty on
+    platforms without /proc.
+    """
+    proc = f"/proc/{pid or 'self'}"
+    return {
+        "pid": pid or os.getpid(),
+        **_read_kb_fields(f"{proc}/status", _STATUS_FIELDS),
+        **_read_kb_fields(f"{proc}/smaps_rollup", _ROLLUP_FIELDS),
+    }
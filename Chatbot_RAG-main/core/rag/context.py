@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from core.rag.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Khoảng trống tối đa (ký tự) giữa hai chunk liền nhau vẫn được ghép (khoảng trắng bị splitter bỏ đi)
+ADJACENT_GAP = 2
+# Đoạn chồng lấn ngắn nhất được coi là overlap khi không có start_index
+MIN_TEXT_OVERLAP = 20
+
+
+@dataclass
+class _Block:
+    source: str
+    page: Optional[int]
+    rank: int
+    text: str
+    start: Optional[int] = None
+    chunks: int = 1
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    chunks: int
+    blocks: int
+    tokens_before: int
+    tokens_after: int
+    dropped_duplicates: int = 0
+    truncated: bool = False
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _text_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right), max_overlap), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _shingles(text: str, size: int) -> Set[Tuple[str, ...]]:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextAssembler:
+    """Builds the prompt context from retrieved chunks.
+
+    Chunks of the same source/page that overlap or touch are merged back into
+    one passage, passages whose word shingles are mostly contained in an
+    already kept passage are dropped, and the result is cut to
+    ``max_tokens`` keeping the best-ranked passages first.
+    """
+
+    def __init__(self, max_tokens: int = 1500, dedup_threshold: float = 0.8, shingle_size: int = 3,
+                 max_overlap: int = 200, min_block_tokens: int = 50):
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+        self.max_overlap = max_overlap
+        self.min_block_tokens = min_block_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def _merge(self, documents: List[Document]) -> List[_Block]:
+        groups: Dict[Tuple[str, Optional[int]], List[_Block]] = {}
+        for rank, doc in enumerate(documents):
+            text = doc.page_content.lstrip()
+            start = doc.metadata.get("start_index")
+            block = _Block(
+                source=doc.metadata.get("source", ""),
+                page=doc.metadata.get("page"),
+                rank=rank,
+                text=text.rstrip(),
+                # Khoảng trắng đầu chunk bị bỏ: dời vị trí bắt đầu tương ứng
+                start=None if start is None else start + len(doc.page_content) - len(text),
+            )
+            groups.setdefault((block.source, block.page), []).append(block)
+
+        merged: List[_Block] = []
+        for blocks in groups.values():
+            # Ghép theo vị trí chỉ khi mọi chunk của nhóm có start_index (đã sắp theo vị trí);
+            # thiếu ở một chunk thì cả nhóm ghép theo đoạn văn bản chồng lấn
+            by_offset = all(block.start is not None for block in blocks)
+            if by_offset:
+                blocks.sort(key=lambda block: block.start)
+            current = blocks[0]
+            for block in blocks[1:]:
+                if by_offset:
+                    if block.start > current.end + ADJACENT_GAP:
+                        merged.append(current)
+                        current = block
+                        continue
+                    overlap = max(0, current.end - block.start)
+                    if overlap >= len(block.text):
+                        addition = ""
+                    else:
+                        addition = block.text[overlap:] if overlap else " " + block.text
+                    current.text += addition
+                else:
+                    overlap = _text_overlap(current.text, block.text, self.max_overlap)
+                    if not overlap:
+                        merged.append(current)
+                        current = block
+                        continue
+                    current.text += block.text[overlap:]
+                current.rank = min(current.rank, block.rank)
+                current.chunks += block.chunks
+            merged.append(current)
+        merged.sort(key=lambda block: block.rank)
+        return merged
+
+    def _deduplicate(self, blocks: List[_Block]) -> List[_Block]:
+        kept: List[Tuple[_Block, Set]] = []
+        for block in blocks:
+            shingles = _shingles(block.text, self.shingle_size)
+            duplicate = any(
+                shingles and len(shingles & other) / len(shingles) >= self.dedup_threshold
+                for _, other in kept
+            )
+            if not duplicate:
+                kept.append((block, shingles))
+        return [block for block, _ in kept]
+
+    def assemble(self, documents: List[Document]) -> AssembledContext:
+        tokens_before = estimate_tokens("\n".join(doc.page_content for doc in documents))
+        if not documents:
+            return AssembledContext("", 0, 0, 0, 0)
+        merged = self._merge(documents)
+        blocks = self._deduplicate(merged)
+
+        parts, used, truncated = [], 0, False
+        for block in blocks:
+            cost = estimate_tokens(block.text)
+            if used + cost > self.max_tokens:
+                remaining = self.max_tokens - used
+                truncated = True
+                if remaining >= self.min_block_tokens:
+                    parts.append((block, truncate_to_tokens(block.text, remaining)))
+                break
+            parts.append((block, block.text))
+            used += cost
+        text = "\n".join(part for _, part in parts)
+
+        result = AssembledContext(
+            text=text,
+            chunks=len(documents),
+            blocks=len(parts),
+            tokens_before=tokens_before,
+            tokens_after=estimate_tokens(text),
+            dropped_duplicates=len(merged) - len(blocks),
+            truncated=truncated,
+            sources=[os.path.basename(block.source) for block, _ in parts],
+        )
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += result.tokens_before
+            self.tokens_after += result.tokens_after
+        logger.info(
+            f"Context: {result.chunks} chunks -> {result.blocks} passages "
+            f"({result.dropped_duplicates} duplicates dropped{', truncated' if truncated else ''}), "
+            f"{result.tokens_before} -> {result.tokens_after} tokens (saved {result.tokens_saved})"
+        )
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "max_tokens": self.max_tokens,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+            }
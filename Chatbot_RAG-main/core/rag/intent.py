@@ -0,0 +1,219 @@
+import json
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.chunking.metadata import normalize_text
+
+GENERAL = "general"
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+# Bảng định tuyến mặc định: intent -> từ khóa (trọng số) và câu ví dụ (cho bộ phân loại embedding).
+# Từ khóa giống classify_intent() cũ trong serve.py; từ khóa được so khớp sau khi bỏ dấu, riêng
+# "accented_keywords" chỉ khớp đúng dạng có dấu (bỏ dấu thì trùng từ khác: "khối" / "khỏi").
+# Có thể thay bằng file JSON cùng cấu trúc (INTENT_ROUTES_PATH).
+DEFAULT_ROUTES: Dict[str, Dict] = {
+    "student": {
+        "keywords": {
+            "điểm": 1.0, "sinh viên": 1.0, "lớp": 1.0, "thời khóa biểu": 2.0, "mã số sinh viên": 2.0, "học kỳ": 1.0,
+        },
+        "examples": [
+            "Điểm trung bình học kỳ được tính như thế nào?",
+            "Tra cứu kết quả học tập của sinh viên",
+            "Thời khóa biểu lớp của tôi",
+            "Điểm rèn luyện của sinh viên",
+        ],
+    },
+    "admission": {
+        "keywords": {
+            "tuyển sinh": 2.0, "ngành": 1.0, "điểm chuẩn": 2.0, "xét tuyển": 2.0, "học phí": 2.0,
+        },
+        "accented_keywords": {"khối": 1.0},
+        "examples": [
+            "Học phí ngành Kỹ thuật máy tính là bao nhiêu?",
+            "Điểm chuẩn xét tuyển năm nay",
+            "Trường tuyển sinh những ngành nào?",
+            "Chỉ tiêu tuyển sinh ngành Kỹ thuật điện",
+        ],
+    },
+}
+
+
+def question_words(question: str) -> Tuple[List[str], List[str]]:
+    """Word lists of ``question`` (lowercased NFC, and diacritic-folded), aligned position by position."""
+    words = _NON_WORD_RE.sub(" ", unicodedata.normalize("NFC", question.lower())).split()
+    folded = normalize_text(" ".join(words)).split()
+    if len(folded) != len(words):
+        folded = [normalize_text(word) or word for word in words]
+    return words, folded
+
+
+@dataclass
+class IntentResult:
+    intent: str
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    matches: List[str] = field(default_factory=list)
+    method: str = "keywords"
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over word sequences.
+
+    Transitions are on whole words of the diacritic-normalized text, so a
+    keyword only matches complete words ("lop" does not fire inside "clop")
+    and a question is scanned once whatever the number of keywords.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = [tuple(keyword.split()) for keyword in keywords]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, words in enumerate(self.keywords):
+            state = 0
+            for word in words:
+                nxt = self._goto[state].get(word)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][word] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        # Các trạng thái ở độ sâu 1 có fail = 0; duyệt BFS cho phần còn lại
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(word, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, words: Sequence[str]) -> List[Tuple[int, int, int]]:
+        """(start, end, keyword index) word spans of every match in ``words``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for position, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for index in out[state]:
+                matches.append((position + 1 - len(self.keywords[index]), position + 1, index))
+        return matches
+
+
+class IntentClassifier:
+    """Keyword intent router with confidence, plus an optional embedding fallback.
+
+    Scores are the summed weights of matched keywords per intent; a keyword
+    inside a longer matched keyword ("điểm" in "điểm chuẩn") is not counted.
+    The confidence grows with evidence and shrinks when intents compete.
+    Questions without keywords route to ``general``. With ``exclusive``
+    (the default, and the rule of the previous ``classify_intent``), so do
+    questions matching keywords of more than one intent; otherwise the
+    highest score wins and only ties route to ``general``. A result below
+    ``min_keyword_confidence`` routes to ``general`` too, unless the
+    embedding fallback finds a close enough intent. Keywords match on
+    diacritic-folded words; ``accented_keywords`` of a route only match
+    their accented form.
+    """
+
+    def __init__(self, routes: Dict[str, Dict] = None, prior: float = 1.0, embeddings=None,
+                 min_keyword_confidence: float = 0.5, min_embedding_similarity: float = 0.5,
+                 exclusive: bool = True):
+        self.routes = routes or DEFAULT_ROUTES
+        self.prior = prior
+        self.exclusive = exclusive
+        self.min_keyword_confidence = min_keyword_confidence
+        self.min_embedding_similarity = min_embedding_similarity
+        entries: Dict[str, Tuple[str, float]] = {}
+        accented: Dict[str, Tuple[str, float]] = {}
+        for intent, route in self.routes.items():
+            for keyword, weight in route.get("keywords", {}).items():
+                entries[normalize_text(keyword)] = (intent, float(weight))
+            for keyword, weight in route.get("accented_keywords", {}).items():
+                accented[" ".join(question_words(keyword)[0])] = (intent, float(weight))
+        # Từ khóa bỏ dấu trước, từ khóa có dấu sau: chỉ số trong _keywords / _entries dùng chung
+        self._keywords = list(entries) + list(accented)
+        self._entries = list(entries.values()) + list(accented.values())
+        self._automaton = KeywordAutomaton(list(entries))
+        self._accented_automaton = KeywordAutomaton(list(accented))
+        self._accented_offset = len(entries)
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_intents: List[str] = []
+        if embeddings is not None:
+            self.fit_embeddings(embeddings)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "IntentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def fit_embeddings(self, embeddings) -> None:
+        """Embed each route's example questions once and keep the normalized centroids."""
+        intents, centroids = [], []
+        for intent, route in self.routes.items():
+            examples = route.get("examples")
+            if not examples:
+                continue
+            vectors = np.asarray(embeddings.embed_documents(examples), dtype=np.float32)
+            centroid = vectors.mean(axis=0)
+            intents.append(intent)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        if centroids:
+            self._centroid_intents = intents
+            self._centroids = np.stack(centroids)
+
+    def _classify_keywords(self, question: str) -> IntentResult:
+        words, folded = question_words(question)
+        matches = self._automaton.find(folded)
+        matches += [(start, end, self._accented_offset + index)
+                    for start, end, index in self._accented_automaton.find(words)]
+        # Bỏ từ khóa nằm trong một từ khóa dài hơn đã khớp
+        spans = [(start, end) for start, end, _ in matches]
+        scores: Dict[str, float] = {}
+        matched = []
+        for start, end, index in matches:
+            if any(s <= start and end <= e and (s, e) != (start, end) for s, e in spans):
+                continue
+            intent, weight = self._entries[index]
+            scores[intent] = scores.get(intent, 0.0) + weight
+            matched.append(self._keywords[index])
+        if not scores or (self.exclusive and len(scores) > 1):
+            return IntentResult(GENERAL, 0.0, scores, matched)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_intent, top_score = ranked[0]
+        if len(ranked) > 1 and ranked[1][1] == top_score:
+            return IntentResult(GENERAL, 0.0, scores, matched)
+        confidence = top_score / (sum(scores.values()) + self.prior)
+        return IntentResult(top_intent, round(confidence, 3), scores, matched)
+
+    def classify(self, question: str, query_embedding: Optional[Sequence[float]] = None) -> IntentResult:
+        result = self._classify_keywords(question)
+        if result.confidence >= self.min_keyword_confidence:
+            return result
+        # Từ khóa không đủ chắc chắn: intent chung, trừ khi embedding của câu hỏi (đã tính cho truy xuất)
+        # gần hẳn một intent
+        general = IntentResult(GENERAL, result.confidence, result.scores, result.matches)
+        if self._centroids is None or query_embedding is None:
+            return general
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        similarities = self._centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        best = int(np.argmax(similarities))
+        confidence = float(similarities[best])
+        if confidence < self.min_embedding_similarity or confidence <= result.confidence:
+            return general
+        return IntentResult(self._centroid_intents[best], round(confidence, 3), result.scores, result.matches,
+                            method="embedding")
@@ -0,0 +1,215 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from core.rag.tokens import estimate_tokens, strip_html, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_upto INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+"""
+
+# Câu hỏi tiếp nối thường ngắn, hoặc mở đầu bằng từ nhắc lại câu trước ("còn ...", "thế còn ...", "nó ...").
+# Chỉ xét đầu câu: "còn", "đó", "này" xuất hiện trong rất nhiều câu hỏi độc lập.
+_FOLLOW_UP_RE = re.compile(r"^\W*(?:này|đó|ấy|kia|nó|còn|thế còn|như thế)\b", re.IGNORECASE)
+FOLLOW_UP_MAX_WORDS = 5
+
+
+@dataclass
+class Conversation:
+    """Prompt-ready view of a session: compacted summary plus the recent turns that fit the budget."""
+    session_id: str
+    summary: str = ""
+    recent: List[Tuple[str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.recent
+
+    def format(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Tóm tắt các lượt trước:\n{self.summary}")
+        if self.recent:
+            parts.append("Các lượt gần đây:\n" + "\n".join(
+                f"Người dùng: {question}\nTrợ lý: {answer}" for question, answer in self.recent))
+        return "\n".join(parts)
+
+
+class ChatMemory:
+    """Conversation sessions stored in SQLite, compacted to a token budget.
+
+    Recent turns are kept (answers as plain text, capped per turn) while they
+    fit ``history_tokens``; older turns are folded once into a running
+    summary of question / short-answer lines capped at ``summary_tokens``.
+    Sessions idle for longer than ``ttl_seconds`` expire and are deleted,
+    at most once per ``purge_interval`` seconds, when new sessions are created.
+    """
+
+    def __init__(self, db_path: str = ".cache/chat_sessions.sqlite3", history_tokens: int = 800,
+                 summary_tokens: int = 300, turn_answer_tokens: int = 250, summary_answer_tokens: int = 40,
+                 ttl_seconds: float = 7 * 86400, purge_interval: float = 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.turn_answer_tokens = turn_answer_tokens
+        self.summary_answer_tokens = summary_answer_tokens
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def create_session(self) -> str:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        if now - self._purged_at >= self.purge_interval:
+            self.purge_expired(now)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO sessions (id, created_at, updated_at) VALUES (?, ?, ?)",
+                               (session_id, now, now))
+        return session_id
+
+    def purge_expired(self, now: float = None) -> int:
+        """Delete sessions (and their turns) idle for longer than ``ttl_seconds``."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._purged_at = now
+            cursor = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+        if cursor.rowcount:
+            logger.info(f"Deleted {cursor.rowcount} expired chat sessions.")
+        return cursor.rowcount
+
+    def exists(self, session_id: str) -> bool:
+        """True for a session that has not expired (it may not have been purged yet)."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM sessions WHERE id = ? AND updated_at >= ?",
+                                     (session_id, time.time() - self.ttl_seconds)).fetchone()
+        return row is not None
+
+    def add_turn(self, session_id: str, question: str, answer: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO turns (session_id, question, answer, created_at) VALUES (?, ?, ?, ?)",
+                               (session_id, question, answer, now))
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+
+    def turns(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, answer, created_at FROM turns WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def _summary_line(self, question: str, answer: str) -> str:
+        answer = truncate_to_tokens(strip_html(answer), self.summary_answer_tokens)
+        return f"- Hỏi: {truncate_to_tokens(question, self.summary_answer_tokens)} | Đáp: {answer}"
+
+    def conversation(self, session_id: str, attempts: int = 3) -> Conversation:
+        """Budgeted history for the next prompt; folds turns that no longer fit into the summary.
+
+        The summary is written with a versioned UPDATE (on ``summarized_upto``):
+        if another request, possibly in another worker, folded turns in
+        between, the history is read again instead of overwriting its summary.
+        """
+        for _ in range(attempts):
+            conversation, update = self._compact(session_id)
+            if update is None:
+                return conversation
+            summary, summarized_upto, expected_upto = update
+            with self._lock, self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET summary = ?, summarized_upto = ? WHERE id = ? AND summarized_upto = ?",
+                    (summary, summarized_upto, session_id, expected_upto))
+            if cursor.rowcount:
+                return conversation
+        # Vẫn bị ghi đè sau nhiều lần thử: dùng bản vừa tính cho lượt này, không lưu tóm tắt
+        return conversation
+
+    def _compact(self, session_id: str) -> Tuple[Conversation, Optional[Tuple[str, int, int]]]:
+        """The conversation plus, when turns overflowed, the (summary, summarized_upto, previous upto) to store."""
+        with self._lock:
+            session = self._conn.execute(
+                "SELECT summary, summarized_upto FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if session is None:
+                return Conversation(session_id), None
+            rows = self._conn.execute(
+                "SELECT id, question, answer FROM turns WHERE session_id = ? AND id > ? ORDER BY id DESC",
+                (session_id, session["summarized_upto"]),
+            ).fetchall()
+
+        recent, used = [], 0
+        for index, row in enumerate(rows):
+            answer = truncate_to_tokens(strip_html(row["answer"]), self.turn_answer_tokens)
+            cost = estimate_tokens(row["question"]) + estimate_tokens(answer)
+            if used + cost > self.history_tokens:
+                break
+            recent.append((row["question"], answer))
+            used += cost
+        overflow = rows[len(recent):]
+        summary = session["summary"]
+        update = None
+        if overflow:
+            lines = (summary.split("\n") if summary else []) + [
+                self._summary_line(row["question"], row["answer"]) for row in reversed(overflow)
+            ]
+            # Giữ các dòng mới nhất trong ngân sách tóm tắt
+            kept, used = [], 0
+            for line in reversed(lines):
+                used += estimate_tokens(line)
+                if used > self.summary_tokens:
+                    break
+                kept.append(line)
+            summary = "\n".join(reversed(kept))
+            update = (summary, overflow[0]["id"], session["summarized_upto"])
+        return Conversation(session_id, summary, list(reversed(recent))), update
+
+
+def rewrite_question(question: str, conversation: Optional[Conversation]) -> str:
+    """Standalone question for retrieval.
+
+    A short follow-up, or one that opens by referring back ("còn học phí
+    thì sao?", "thế còn ngành Cơ khí?"), is prefixed with the previous
+    question so retrieval sees its subject; the LLM still gets the original
+    question plus the history.
+    """
+    if conversation is None or not conversation.recent:
+        return question
+    if len(question.split()) > FOLLOW_UP_MAX_WORDS and not _FOLLOW_UP_RE.match(question):
+        return question
+    previous_question = conversation.recent[-1][0]
+    return f"{previous_question} {question}"
@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from typing import Dict
+
+from core.rag.tokens import estimate_tokens
+
+HTML_INSTRUCTION = (
+    "QUAN TRỌNG: Câu trả lời phải được định dạng bằng **HTML hợp lệ** (sử dụng các thẻ <h3>, <table>, <b>, <br>, <p>) để hiển thị chuyên nghiệp trên giao diện web. "
+    "Sử dụng thẻ <table> cho dữ liệu có cấu trúc (như danh sách, bảng). Tuyệt đối không sử dụng định dạng Markdown (như ##, *, -). "
+    "Hãy **TỔNG HỢP** thông tin từ tất cả các đoạn trích liên quan để đưa ra câu trả lời đầy đủ nhất."
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A rendered prompt: static ``system`` prefix plus the per-request ``user`` part."""
+    template: str
+    system: str
+    user: str
+
+    @property
+    def text(self) -> str:
+        """Single-string form for backends without a system/prefix channel."""
+        return f"{self.system}\n{self.user}"
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    system: str
+    user: str
+
+    def render(self, context: str, history: str, question: str) -> Prompt:
+        return Prompt(self.name, self.system, self.user.format(context=context, history=history, question=question))
+
+
+class PromptRegistry:
+    """Prompt templates by intent, built once.
+
+    Everything that does not depend on the request (role, HTML rules, answer
+    rules) lives in ``system`` so it is byte-identical across calls and can
+    be sent as a system instruction / cached prefix; only context, history
+    and question are formatted per request.
+    """
+
+    def __init__(self, default: str = "general"):
+        self.default = default
+        self.templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, system: str, user: str) -> PromptTemplate:
+        template = PromptTemplate(name, system, user)
+        self.templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self.templates.get(name) or self.templates[self.default]
+
+    def render(self, name: str, context: str, history: str, question: str) -> Prompt:
+        return self.get(name).render(context, history, question)
+
+    def prefix_tokens(self) -> Dict[str, int]:
+        return {name: estimate_tokens(template.system) for name, template in self.templates.items()}
+
+
+prompt_registry = PromptRegistry()
+
+prompt_registry.register(
+    "student",
+    system=(
+        f"Bạn là trợ lý thông tin sinh viên của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. {HTML_INSTRUCTION}"
+        "Ưu tiên trả lời câu hỏi dựa trên các thông tin từ bảng nếu có. Dựa trên các thông tin sau, hãy trả lời câu hỏi của người dùng một cách chính xác và ngắn gọn. Nếu thông tin không liên quan hoặc không đủ để trả lời, hãy trả lời bằng một thẻ <p> rằng 'Tôi không tìm thấy thông tin phù hợp về sinh viên này'."
+    ),
+    user="Nội dung được cung cấp:\n{context}{history}\nCâu hỏi của sinh viên: {question}",
+)
+
+prompt_registry.register(
+    "admission",
+    system=(
+        f"Bạn là trợ lý tư vấn tuyển sinh của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. {HTML_INSTRUCTION}"
+        "Dựa trên nội dung sau, hãy trả lời câu hỏi của người dùng một cách đầy đủ và chính xác. Nếu không có thông tin phù hợp, hãy trả lời bằng một thẻ <p> rằng 'Tôi không tìm thấy thông tin phù hợp về tuyển sinh'."
+        "Sử dụng thẻ <table> cho thông tin học phí, điểm chuẩn hoặc các danh sách liên quan. "
+    ),
+    user="Nội dung được cung cấp:\n{context}{history}\nCâu hỏi về tuyển sinh: {question}",
+)
+
+prompt_registry.register(
+    "general",
+    system=(
+        f"Bạn là Trợ lý Thông tin chính thức của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên (TNUT). {HTML_INSTRUCTION}"
+        "Dựa vào **DUY NHẤT** các thông tin được cung cấp, hãy trả lời câu hỏi của người dùng. "
+        "Sử dụng các tiêu đề <h3> và thẻ <table> cho dữ liệu cấu trúc phức tạp. "
+        "\n\nQUY TẮC PHẢN HỒI:\n1. **Chỉ sử dụng** thông tin trong phần 'Nội dung được cung cấp' để trả lời.\n2. Nếu thông tin được cung cấp **không đủ** hoặc **không liên quan** để trả lời câu hỏi, hãy trả lời bằng một thẻ <p> rằng: 'Tôi xin lỗi, tôi không tìm thấy thông tin chính thức phù hợp trong cơ sở dữ liệu của Nhà trường để trả lời câu hỏi này.' Tuyệt đối **không được tự ý bịa đặt hoặc suy đoán**."
+    ),
+    user=(
+        "--- BẮT ĐẦU NỘI DUNG CUNG CẤP ---\n{context}\n--- KẾT THÚC NỘI DUNG CUNG CẤP ---\n{history}\n"
+        "Câu hỏi của người dùng: {question}"
+    ),
+)
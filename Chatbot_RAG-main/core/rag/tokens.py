@@ -0,0 +1,26 @@
+import re
+
+# Ước lượng thô cho tiếng Việt với tokenizer của Gemini/DeepSeek (~3 ký tự / token);
+# đủ để giới hạn độ dài prompt mà không phải gọi API đếm token.
+CHARS_PER_TOKEN = 3
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to about ``max_tokens`` tokens, on a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut + " …"
+
+
+def strip_html(text: str) -> str:
+    """Plain text of an HTML answer, whitespace collapsed."""
+    return " ".join(_TAG_RE.sub(" ", text).split())
@@ -0,0 +1,133 @@
+import heapq
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import msgpack
+import zstandard
+from pyvi.ViTokenizer import tokenize as vi_tokenize
+
+logger = logging.getLogger(__name__)
+
+BM25_FILE = "bm25.msgpack.zst"
+# Tăng khi cách tách từ thay đổi để index cũ được build lại
+BM25_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split Vietnamese text into BM25 terms.
+
+    pyvi joins compound words with ``_`` ("kỹ_thuật"); both the compound and
+    its syllables are kept so partial matches still score. Codes such as
+    ``IT3011`` or student ids survive as single terms.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(vi_tokenize(text).lower()):
+        terms.append(token)
+        if "_" in token:
+            terms.extend(part for part in token.split("_") if part)
+    return terms
+
+
+class BM25Index:
+    """In-memory inverted index scored with Okapi BM25.
+
+    Documents are keyed by the same docstore ids as the FAISS index, so
+    chunks can be added and removed together with their vectors.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # {doc_id: {term: tf}}; không sửa tại chỗ nên có thể dùng chung giữa các bản sao
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        # {term: {doc_id: tf}}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+        # {doc_id: k1 * (1 - b + b * len / avg_len)}, tính lại sau mỗi lần thêm/xóa
+        self._norms: Dict[str, float] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def _index(self, doc_id: str, term_freqs: Dict[str, int]) -> None:
+        self._norms = None
+        self.doc_terms[doc_id] = term_freqs
+        length = sum(term_freqs.values())
+        self.doc_len[doc_id] = length
+        self.total_len += length
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def add(self, doc_ids: Iterable[str], texts: Iterable[str]) -> None:
+        for doc_id, text in zip(doc_ids, texts):
+            if doc_id in self.doc_terms:
+                self.remove([doc_id])
+            self._index(doc_id, dict(Counter(tokenize(text))))
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            term_freqs = self.doc_terms.pop(doc_id, None)
+            if term_freqs is None:
+                continue
+            self._norms = None
+            self.total_len -= self.doc_len.pop(doc_id)
+            for term in term_freqs:
+                postings = self.postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int = 20, allowed_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to ``k`` (doc_id, score) pairs, best first, optionally only among ``allowed_ids``."""
+        n_docs = len(self.doc_terms)
+        if not n_docs:
+            return []
+        norms = self._norms
+        if norms is None:
+            avg_len = self.total_len / n_docs
+            norms = self._norms = {
+                doc_id: self.k1 * (1 - self.b + self.b * length / avg_len)
+                for doc_id, length in self.doc_len.items()
+            }
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = (self.k1 + 1) * math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            if allowed_ids is not None:
+                postings = {doc_id: tf for doc_id, tf in postings.items() if doc_id in allowed_ids}
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def copy(self) -> "BM25Index":
+        clone = BM25Index(self.k1, self.b)
+        for doc_id, term_freqs in self.doc_terms.items():
+            clone._index(doc_id, term_freqs)
+        return clone
+
+    def save(self, index_path: str) -> None:
+        os.makedirs(index_path, exist_ok=True)
+        payload = msgpack.packb({"version": BM25_VERSION, "k1": self.k1, "b": self.b, "docs": self.doc_terms})
+        with open(os.path.join(index_path, BM25_FILE), "wb") as f:
+            f.write(zstandard.ZstdCompressor(level=3).compress(payload))
+
+    @classmethod
+    def load(cls, index_path: str) -> "BM25Index":
+        """Load a saved index; raises FileNotFoundError/ValueError if missing or outdated."""
+        with open(os.path.join(index_path, BM25_FILE), "rb") as f:
+            data = msgpack.unpackb(zstandard.ZstdDecompressor().decompress(f.read()))
+        if data.get("version") != BM25_VERSION:
+            raise ValueError(f"BM25 index version {data.get('version')} is outdated")
+        index = cls(data["k1"], data["b"])
+        for doc_id, term_freqs in data["docs"].items():
+            index._index(doc_id, term_freqs)
+        return index
@@ -0,0 +1,53 @@
+from typing import Dict, List, Optional, Sequence, Set
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from core.retreival.bm25 import BM25Index
+from core.retreival.index_factory import search_parameters
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """Merge ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def dense_search_ids(vector_db: FAISS, query_embedding: List[float], k: int,
+                     positions: Optional[np.ndarray] = None) -> List[str]:
+    """Top-k docstore ids from the FAISS index, nearest first, optionally only among ``positions``."""
+    vector = np.array([query_embedding], dtype=np.float32)
+    if vector_db._normalize_L2:
+        faiss.normalize_L2(vector)
+    params = search_parameters(vector_db.index, positions) if positions is not None else None
+    _, indices = vector_db.index.search(vector, k, params=params)
+    return [vector_db.index_to_docstore_id[i] for i in indices[0] if i != -1]
+
+
+def hybrid_search(vector_db: FAISS, bm25: Optional[BM25Index], question: str,
+                  query_embedding: List[float], k: int = 7, fetch_k: int = 20,
+                  positions: Optional[np.ndarray] = None, allowed_ids: Optional[Set[str]] = None) -> List[Document]:
+    """Dense + BM25 retrieval merged by reciprocal-rank fusion.
+
+    Each retriever contributes its top ``fetch_k``; the fused top ``k``
+    documents are returned. Without a BM25 index this is plain dense search.
+    ``positions`` / ``allowed_ids`` restrict both retrievers to a metadata subset.
+    """
+    rankings = [dense_search_ids(vector_db, query_embedding, fetch_k, positions)]
+    if bm25 is not None and len(bm25):
+        rankings.append([doc_id for doc_id, _ in bm25.search(question, fetch_k, allowed_ids)])
+    documents = []
+    for doc_id in reciprocal_rank_fusion(rankings):
+        doc = vector_db.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            documents.append(doc)
+            if len(documents) == k:
+                break
+    return documents
@@ -0,0 +1,106 @@
+import logging
+import math
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+DEFAULT_INDEX_PARAMS = {
+    "hnsw_m": 32,
+    "nlist": 0,        # 0 = tự chọn theo số vector (~4 * sqrt(n))
+    "pq_m": 48,        # số sub-quantizer, được hạ xuống ước số gần nhất của số chiều
+    "pq_nbits": 8,
+}
+
+
+def _pq_subquantizers(dim: int, pq_m: int) -> int:
+    """Largest divisor of ``dim`` that is <= ``pq_m`` (PQ needs dim % m == 0)."""
+    for m in range(min(pq_m, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", params: Optional[Dict] = None) -> faiss.Index:
+    """Create and, when needed, train an empty L2 index for ``vectors``.
+
+    IVF-PQ falls back to a flat index when there are too few vectors to
+    train its codebooks; HNSW needs no training.
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    n, dim = vectors.shape
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+    if index_type != "ivfpq":
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    nbits = params["pq_nbits"]
+    nlist = params["nlist"] or max(1, int(4 * math.sqrt(n)))
+    # k-means cần khoảng 39 điểm cho mỗi centroid; PQ cần ít nhất 2^nbits điểm
+    nlist = min(nlist, n // 39)
+    if nlist < 1 or n < (1 << nbits) * 4:
+        logger.warning(f"Only {n} vectors: too few to train IVF-PQ, using a flat index instead.")
+        return faiss.IndexFlatL2(dim)
+    pq_m = _pq_subquantizers(dim, params["pq_m"])
+    index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_m, nbits)
+    logger.info(f"Training IVF{nlist},PQ{pq_m}x{nbits} on {n} vectors...")
+    index.train(vectors)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply query-time recall/speed knobs; ignored for index types they do not apply to."""
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+    if ef_search and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def search_parameters(index: faiss.Index, positions: np.ndarray) -> faiss.SearchParameters:
+    """Search parameters restricting ``index.search`` to the given vector positions.
+
+    The selector is applied inside the index scan, before distances are
+    computed; the IVF/HNSW variants carry the index's current nprobe/efSearch.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(positions, dtype=np.int64))
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    except RuntimeError:
+        if isinstance(index, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+    # Giữ selector sống cùng params (SWIG không giữ tham chiếu)
+    params.selector_ref = selector
+    return params
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Whether langchain's FAISS.delete works on this index.
+
+    HNSW cannot remove vectors at all, and IVF keeps ids instead of
+    compacting them, which breaks langchain's position-based id mapping.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+
+def describe_index(index: faiss.Index) -> Dict:
+    info = {"type": type(index).__name__, "ntotal": index.ntotal, "dim": index.d}
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        info.update(nlist=ivf.nlist, nprobe=ivf.nprobe)
+    except RuntimeError:
+        pass
+    if isinstance(index, faiss.IndexHNSW):
+        info.update(ef_search=index.hnsw.efSearch)
+    return info
@@ -0,0 +1,112 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from core.chunking.metadata import normalize_text
+
+FILTER_FIELDS = ("major", "doc_type", "year")
+
+
+def _key(value) -> object:
+    # So khớp tên ngành không phân biệt hoa thường / dấu
+    return normalize_text(value) if isinstance(value, str) else value
+
+
+class MetadataIndex:
+    """Maps metadata values to the chunks that carry them, for pre-filtered search.
+
+    Built from the docstore of one FAISS store and tied to it: FAISS
+    positions shift when vectors are deleted, so a new store needs a new
+    index (see ``HuggingEmbed.metadata_index``).
+    """
+
+    def __init__(self, vector_db: FAISS):
+        self.vector_db = vector_db
+        positions: Dict[str, Dict[object, List[int]]] = {field: defaultdict(list) for field in FILTER_FIELDS}
+        self.labels: Dict[str, Dict[object, object]] = {field: {} for field in FILTER_FIELDS}
+        for position, doc_id in vector_db.index_to_docstore_id.items():
+            metadata = getattr(vector_db.docstore.search(doc_id), "metadata", {})
+            for field in FILTER_FIELDS:
+                value = metadata.get(field)
+                if value is not None:
+                    positions[field][_key(value)].append(position)
+                    self.labels[field].setdefault(_key(value), value)
+        self.positions: Dict[str, Dict[object, np.ndarray]] = {
+            field: {key: np.array(ids, dtype=np.int64) for key, ids in values.items()}
+            for field, values in positions.items()
+        }
+        self.major_matcher = MajorMatcher(self.values("major"))
+
+    def values(self, field: str) -> List[object]:
+        """Display values of a field (e.g. major names as written in the file names)."""
+        return list(self.labels[field].values())
+
+    def select(self, filters: Dict[str, Iterable]) -> Optional[np.ndarray]:
+        """FAISS positions matching every field (any of the values per field).
+
+        Returns None when no filter applies, or when the filters match no
+        chunk at all (better to search everything than to answer from nothing).
+        """
+        selected = None
+        for field, values in filters.items():
+            arrays = [self.positions.get(field, {}).get(_key(value)) for value in values]
+            arrays = [array for array in arrays if array is not None]
+            if not arrays:
+                continue
+            matched = np.unique(np.concatenate(arrays))
+            selected = matched if selected is None else np.intersect1d(selected, matched, assume_unique=True)
+        if selected is None or not len(selected):
+            return None
+        return selected
+
+    def doc_ids(self, positions: np.ndarray) -> Set[str]:
+        mapping = self.vector_db.index_to_docstore_id
+        return {mapping[int(position)] for position in positions}
+
+
+class MajorMatcher:
+    """Finds the major named in a question, accent- and case-insensitive.
+
+    The longest matching name wins, so "kỹ thuật điện tử viễn thông" is not
+    mistaken for "kỹ thuật điện".
+    """
+
+    def __init__(self, majors: Iterable[str]):
+        self.majors = sorted(
+            ((normalize_text(major), major) for major in majors if major),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def match(self, question: str) -> Optional[str]:
+        padded = f" {normalize_text(question)} "
+        for key, major in self.majors:
+            if f" {key} " in padded:
+                return major
+        return None
+
+
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+
+
+def build_filters(question: str, intent: str, index: MetadataIndex,
+                  intent_doc_types: Dict[str, List[str]]) -> Dict[str, List]:
+    """Metadata filters inferred from the question.
+
+    A named major restricts search to that major's documents; otherwise the
+    intent may restrict the document type. A year is only used if some
+    document carries it.
+    """
+    filters: Dict[str, List] = {}
+    major = index.major_matcher.match(question)
+    if major:
+        filters["major"] = [major]
+    elif intent in intent_doc_types:
+        filters["doc_type"] = intent_doc_types[intent]
+    years = [int(year) for year in _YEAR_RE.findall(question) if int(year) in index.positions["year"]]
+    if years:
+        filters["year"] = years
+    return filters
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved chunks with a cross-encoder under a time budget.
+
+    Pairs are scored in batches; if the next batch would overrun
+    ``time_budget`` seconds, reranking is abandoned and the first ``top_n``
+    candidates are returned in their original (retrieval) order.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, top_n: int = 4, batch_size: int = 16,
+                 time_budget: float = 0.3, max_length: int = 256):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.max_length = max_length
+        self._model = None
+        self._load_lock = threading.Lock()
+        # Thời gian ước lượng của một batch, học từ các lần gọi trước
+        self._batch_estimate = 0.0
+        self.calls = 0
+        self.fallbacks = 0
+        self.total_seconds = 0.0
+
+    @property
+    def model(self):
+        # Load model khi cần lần đầu, không tính vào ngân sách thời gian của request
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length)
+        return self._model
+
+    def rerank(self, question: str, documents: List[Document]) -> List[Document]:
+        if len(documents) <= 1:
+            return documents[:self.top_n]
+        model = self.model
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        scores: List[float] = []
+        for offset in range(0, len(documents), self.batch_size):
+            now = time.perf_counter()
+            # Không bắt đầu batch nếu dự đoán sẽ vượt ngân sách
+            if now + self._batch_estimate > deadline:
+                if not scores:
+                    # Ước lượng có thể đến từ một lần chạy chậm bất thường: giảm dần để thử lại
+                    self._batch_estimate /= 2
+                self._record(start, fallback=True)
+                logger.info(f"Rerank exceeded {self.time_budget * 1000:.0f}ms budget, keeping retrieval order.")
+                return documents[:self.top_n]
+            batch = documents[offset:offset + self.batch_size]
+            scores.extend(float(s) for s in model.predict([(question, doc.page_content) for doc in batch]))
+            elapsed = time.perf_counter() - now
+            self._batch_estimate = elapsed if offset == 0 else max(self._batch_estimate, elapsed)
+        self._record(start, fallback=False)
+        ranked = sorted(zip(scores, range(len(documents))), key=lambda item: item[0], reverse=True)
+        return [documents[i] for _, i in ranked[:self.top_n]]
+
+    def _record(self, start: float, fallback: bool) -> None:
+        self.calls += 1
+        self.fallbacks += fallback
+        self.total_seconds += time.perf_counter() - start
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "calls": self.calls,
+            "fallbacks": self.fallbacks,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "time_budget_ms": self.time_budget * 1000,
+        }
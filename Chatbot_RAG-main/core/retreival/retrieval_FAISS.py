@@ -1,8 +1,31 @@
 import faiss
+import numpy as np
+
+from core.retreival.index_factory import build_index, set_search_params
+
 
 class QueryFAISS:
+    """Searches a FAISS index built once from ``doc_vector`` and reused across queries."""
+
+    def __init__(self, index_type: str = "flat", index_params: dict = None, nprobe: int = None, ef_search: int = None):
+        self.index_type = index_type
+        self.index_params = index_params
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.index = None
+        self._doc_vector = None
+
+    def build(self, doc_vector: np.ndarray) -> faiss.Index:
+        vectors = np.ascontiguousarray(doc_vector, dtype=np.float32)
+        self.index = build_index(vectors, self.index_type, self.index_params)
+        self.index.add(vectors)
+        set_search_params(self.index, self.nprobe, self.ef_search)
+        self._doc_vector = doc_vector
+        return self.index
+
     def query_with_faiss(self, doc_vector, query_vector, k=3):
-        index = faiss.IndexFlatL2(doc_vector.shape[1])
-        index.add(doc_vector)
-        distances, indices = index.search(query_vector, k)
-        return indices, distances
\ No newline at end of file
+        # Chỉ build lại khi được truyền một ma trận tài liệu khác (None = dùng index đã build)
+        if self.index is None or (doc_vector is not None and doc_vector is not self._doc_vector):
+            self.build(doc_vector)
+        distances, indices = self.index.search(np.ascontiguousarray(query_vector, dtype=np.float32), k)
+        return indices, distances
@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+class Warmup:
+    """Runs the slow startup steps (index load, model loading) on a background thread.
+
+    The web server starts answering immediately; ``/readyz`` reports the
+    status and per-step timings, and endpoints that need the models check
+    ``ready`` first.
+    """
+
+    def __init__(self):
+        self.status = PENDING
+        self.steps: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def start(self, steps: List[Tuple[str, Callable[[], Any]]]) -> bool:
+        """Start the steps in order on a daemon thread; False if already started."""
+        with self._lock:
+            if self.status != PENDING:
+                return False
+            self.status = RUNNING
+            self.started_at = time.time()
+        threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True).start()
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self, steps: List[Tuple[str, Callable[[], Any]]]) -> None:
+        try:
+            for name, step in steps:
+                start = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    logger.exception(f"Warm-up step '{name}' failed")
+                    self.steps.append({"step": name, "seconds": round(time.perf_counter() - start, 3), "ok": False})
+                    self.error = f"{name}: {e}"
+                    self.status = FAILED
+                    return
+                seconds = time.perf_counter() - start
+                self.steps.append({"step": name, "seconds": round(seconds, 3), "ok": True})
+                logger.info(f"Warm-up step '{name}' done in {seconds:.2f}s")
+            self.status = READY
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed_until = self.finished_at or time.time()
+        return {
+            "status": self.status,
+            "steps": list(self.steps),
+            "error": self.error,
+            "seconds": round(elapsed_until - self.started_at, 3) if self.started_at else None,
+        }
@@ -7,11 +7,23 @@ import yaml
 from yaml.loader import SafeLoader
 from streamlit_option_menu import option_menu
 import bcrypt
-import pandas as pd
 import re
+import time
 
 BASE_URL = "http://localhost:8000"
 
+
+def wait_for_retrain_job(job, placeholder):
+    """Hỏi trạng thái job train lại (chạy nền trên server) cho tới khi xong hoặc lỗi."""
+    progress_bar = placeholder.progress(0.0, text=job["message"])
+    while job["status"] in ("queued", "running"):
+        time.sleep(2)
+        job = requests.get(f"{BASE_URL}/api/retrain/jobs/{job['job_id']}").json()
+        progress_bar.progress(min(job["progress"], 1.0), text=job["message"])
+    placeholder.empty()
+    return job
+
+
 # --- TẠO DANH SÁCH NGƯỜI DÙNG VÀ CẤU HÌNH ĐĂNG NHẬP ---
 # Mật khẩu đơn giản cho admin và sinh viên
 plain_passwords = ['admin', 'sv001']
@@ -65,28 +77,31 @@ if 'username' not in st.session_state:
     st.session_state.username = None
 
 if st.session_state.authentication_status is False or st.session_state.authentication_status is None:
-    st.warning('Vui lòng nhập tên người dùng và mật khẩu của bạn')
+    st.warning('Vui lòng nhập email và mật khẩu tài khoản của bạn')
     col1, col2 = st.columns([1, 1])
     with col1:
-        username_input = st.text_input("Tên đăng nhập", key="username_input")
+        username_input = st.text_input("Email", key="username_input")
     with col2:
         password_input = st.text_input("Mật khẩu", type="password", key="password_input")
     if st.button('Đăng nhập'):
-        if username_input == 'admin' and password_input == 'admin':
+        # Đăng nhập qua backend (/api/login): token dùng cho các API cần xác thực (kiểm tra tín chỉ)
+        try:
+            response = requests.post(f"{BASE_URL}/api/login",
+                                     json={"email": username_input, "password": password_input})
+        except requests.exceptions.ConnectionError:
+            response = None
+            st.error("Lỗi kết nối: Không thể kết nối đến backend. Vui lòng đảm bảo server đang chạy.")
+        if response is not None and response.ok:
+            user = response.json()
             st.session_state.authentication_status = True
-            st.session_state.username = 'admin'
-            st.session_state.name = 'Quản trị viên'
-            st.session_state['role'] = 'admin'
+            st.session_state.username = username_input
+            st.session_state.name = user['fullname']
+            st.session_state['role'] = {'student': 'sinhvien'}.get(user['role'], user['role'])
+            st.session_state.auth_token = user['token']
             st.rerun()
-        elif username_input == 'sinhvien' and password_input == 'sv001':
-            st.session_state.authentication_status = True
-            st.session_state.username = 'sinhvien'
-            st.session_state.name = 'Sinh viên'
-            st.session_state['role'] = 'sinhvien'
-            st.rerun()
-        else:
+        elif response is not None:
             st.session_state.authentication_status = False
-            st.rerun()
+            st.error(response.json().get("detail", "Đăng nhập thất bại."))
 
 if st.session_state.authentication_status:
     # --- Header của ứng dụng ---
@@ -141,23 +156,37 @@ if st.session_state.authentication_status:
     if st.sidebar.button("Đăng xuất"):
         st.session_state.authentication_status = False
         st.session_state.username = None
+        st.session_state.auth_token = None
+        st.session_state.chat_session_id = None
         st.rerun()
 
     if 'role' in st.session_state and st.session_state['role'] == 'admin':
         st.sidebar.subheader("Quản lý dữ liệu")
-        uploaded_file = st.sidebar.file_uploader(
+        uploaded_files = st.sidebar.file_uploader(
             "Tải file PDF, DOCX, TXT, CSV, XLSX",
             type=["pdf", "docx", "txt", "csv", "xlsx", "xls"],
-            accept_multiple_files=False
+            accept_multiple_files=True
         )
 
-        if uploaded_file is not None:
-            with st.spinner(f"Đang tải lên '{uploaded_file.name}' và cập nhật hệ thống..."):
+        if uploaded_files:
+            names = ", ".join(f"'{uploaded_file.name}'" for uploaded_file in uploaded_files)
+            with st.spinner(f"Đang tải lên {names} và cập nhật hệ thống..."):
                 try:
-                    files = {'file': (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-                    response = requests.post(f"{BASE_URL}/uploadfile/", files=files)
+                    # Gửi thẳng đối tượng file (không sao chép bằng getvalue()); cả lô chỉ tạo một job index
+                    files = [('files', (uploaded_file.name, uploaded_file, uploaded_file.type))
+                             for uploaded_file in uploaded_files]
+                    response = requests.post(f"{BASE_URL}/api/uploads", files=files)
                     if response.status_code == 200:
-                        st.sidebar.success(f"File '{uploaded_file.name}' tải lên và hệ thống được cập nhật thành công!")
+                        data = response.json()
+                        if data["job"] is None:
+                            # Nội dung đã có trong index (vd. Streamlit gửi lại file sau mỗi lần rerun)
+                            st.sidebar.info("Các file đã có trong hệ thống, không cần cập nhật lại.")
+                        else:
+                            job = wait_for_retrain_job(data["job"], st.sidebar.empty())
+                            if job["status"] == "succeeded":
+                                st.sidebar.success(f"Đã tải lên {names} và hệ thống được cập nhật thành công!")
+                            else:
+                                st.sidebar.error(job["message"])
                     else:
                         st.sidebar.error(f"Lỗi khi tải lên file: {response.json().get('detail', 'Lỗi không xác định.')}")
                 except Exception as e:
@@ -167,9 +196,13 @@ if st.session_state.authentication_status:
         if st.sidebar.button("Train lại toàn bộ dữ liệu"):
             with st.spinner('Đang train lại toàn bộ dữ liệu...'):
                 try:
-                    response = requests.post(f"{BASE_URL}/retrain")
+                    response = requests.post(f"{BASE_URL}/retrain", params={"full": "true"})
                     if response.status_code == 200:
-                        st.sidebar.success("Train dữ liệu thành công! Hệ thống đã được cập nhật.")
+                        job = wait_for_retrain_job(response.json()["job"], st.sidebar.empty())
+                        if job["status"] == "succeeded":
+                            st.sidebar.success("Train dữ liệu thành công! Hệ thống đã được cập nhật.")
+                        else:
+                            st.sidebar.error(job["message"])
                     else:
                         st.sidebar.error(f"Lỗi khi train: {response.json().get('detail', 'Lỗi không xác định.')}")
                 except Exception as e:
@@ -199,34 +232,34 @@ if st.session_state.authentication_status:
         if 'role' in st.session_state and st.session_state['role'] == 'sinhvien' and student_id_match:
             student_id = student_id_match.group(1)
             try:
-                df_diem = pd.read_csv('250701 Sổ tay Điện tử.xlsx - Dữ liệu điểm.csv')
-                df_ctdt = pd.read_csv('250701 Sổ tay Điện tử.xlsx - Mô tả CTĐT.csv')
-
-                student_courses = df_diem[df_diem['Mã sinh viên'].str.strip() == student_id.strip()]
-
-                if student_courses.empty:
+                # Kiểm tra tín chỉ / gợi ý môn học do backend tính (/api/students/{id}/audit)
+                response = requests.get(f"{BASE_URL}/api/students/{student_id}/audit", headers={
+                    "Authorization": f"Bearer {st.session_state.get('auth_token') or ''}"})
+                if response.status_code == 401:
+                    st.session_state.authentication_status = False
+                    st.session_state.chat_history.append(("assistant", "Phiên đăng nhập đã hết hạn. Vui lòng đăng nhập lại."))
+                    st.rerun()
+                if response.status_code == 403:
+                    st.session_state.chat_history.append(("assistant", "Bạn chỉ được xem kết quả học tập của chính mình (mã sinh viên đã đăng ký với tài khoản)."))
+                    st.rerun()
+                if response.status_code == 404:
                     st.session_state.chat_history.append(("assistant", "Không tìm thấy thông tin của sinh viên này. Vui lòng kiểm tra lại mã sinh viên."))
                     st.rerun()
-
-                merged_data = pd.merge(student_courses, df_ctdt, left_on='Mã MH', right_on='Mã HP', how='left')
-                total_credits_earned = merged_data[merged_data['Điểm'] >= 4.0]['Số TC'].sum()
-                total_credits_required = 141
-                credits_remaining = total_credits_required - total_credits_earned
-
-                all_courses = df_ctdt[['Mã HP', 'Tên HP', 'Số TC']]
-                taken_courses = set(student_courses['Mã MH'])
-                untaken_courses = all_courses[~all_courses['Mã HP'].isin(taken_courses)]
-                suggestions = untaken_courses.sort_values(by='Số TC', ascending=False)
+                if response.status_code == 503:
+                    raise FileNotFoundError(response.json().get("detail"))
+                response.raise_for_status()
+                audit = response.json()
 
                 result = f"""
-                **Tổng số tín chỉ đã học:** {total_credits_earned} / {total_credits_required}
-                **Số tín chỉ còn thiếu:** {credits_remaining}
+                **Tổng số tín chỉ đã học:** {audit['credits_earned']:g} / {audit['credits_required']:g}
+                **Số tín chỉ còn thiếu:** {audit['credits_remaining']:g}
 
-                **Gợi ý cho kỳ học tiếp theo:**
-                Dưới đây là một số môn bạn nên cân nhắc học:
+                **Gợi ý cho kỳ học tiếp theo ({audit['recommended_credits']:g} tín chỉ):**
+                Dưới đây là các môn bạn đã đủ điều kiện tiên quyết và nên cân nhắc học:
                 """
-                for index, row in suggestions.head(5).iterrows():
-                    result += f"\n- **{row['Tên HP']}** ({row['Mã HP']}): {row['Số TC']} tín chỉ"
+                for course in audit['recommendations']:
+                    retake = " — học lại" if course['retake'] else ""
+                    result += f"\n- **{course['name']}** ({course['course_id']}): {course['credits']:g} tín chỉ{retake}"
 
                 result += f"""
                 \n**Lời khuyên:**
@@ -248,13 +281,15 @@ if st.session_state.authentication_status:
         else:
             with st.spinner("Đang tìm kiếm và tạo câu trả lời..."):
                 try:
-                    chat_history_for_api = [
-                        {"role": role, "content": message}
-                        for role, message in st.session_state.chat_history
-                    ]
-                    response = requests.post(f"{BASE_URL}/ask", json={"question": user_input, "chat_history": chat_history_for_api})
+                    # Lịch sử hội thoại lưu phía server: chỉ gửi session_id thay vì toàn bộ chat_history
+                    response = requests.post(f"{BASE_URL}/ask", json={
+                        "question": user_input,
+                        "session_id": st.session_state.get("chat_session_id"),
+                    })
                     if response.status_code == 200:
-                        answer = response.json().get("answer", "Xin lỗi, tôi không thể tìm thấy câu trả lời cho câu hỏi này.")
+                        data = response.json()
+                        st.session_state.chat_session_id = data.get("session_id")
+                        answer = data.get("answer", "Xin lỗi, tôi không thể tìm thấy câu trả lời cho câu hỏi này.")
                     else:
                         answer = f"Lỗi: Không thể lấy phản hồi từ máy chủ. (Mã lỗi: {response.status_code})"
                 except requests.exceptions.ConnectionError:
@@ -1,12 +1,18 @@
 import os
+import re
+import json
 import shutil
+import asyncio
 import logging
-from typing import Dict, Any, List, TypedDict, Literal
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple, TypedDict, Literal
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import Depends, FastAPI, Header, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain_core.documents import Document
@@ -16,12 +22,33 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 # Đảm bảo 2 file này tồn tại trong thư mục 'core/'
 # Cần có các file: core/embeding/HuggingEmbed.py và core/llm/gemini_llm.py
 from core.embeding.HuggingEmbed import HuggingEmbed
-from core.llm.gemini_llm import LLM
-
-# Import Loaders
-from langchain_community.document_loaders import (
-    PyPDFLoader, TextLoader, Docx2txtLoader, CSVLoader, UnstructuredExcelLoader
+from core.llm.registry import get_llm, llm_metrics
+from core.indexing.manifest import IndexManifest, file_sha256
+from core.retreival.hybrid import hybrid_search
+from core.retreival.metadata_filter import build_filters
+from core.rag.memory import ChatMemory, rewrite_question
+from core.rag.context import ContextAssembler
+from core.rag.intent import IntentClassifier
+from core.rag.prompts import prompt_registry
+from core.retreival.reranker import CrossEncoderReranker, DEFAULT_RERANK_MODEL
+from core.indexing.jobs import RetrainJob, RetrainJobQueue
+from core.auth.users import DuplicateEmailError, UserRepository
+from core.auth.tokens import TokenSigner
+from core.academic.records import AcademicRecords
+from core.academic.audit import CreditAuditor, PREREQUISITE_COLUMN
+from core.indexing.storage import recover_directory, replace_directory
+from core.indexing.watcher import DirectoryWatcher
+from core.indexing.uploads import (
+    STORED, UploadSizeLimitMiddleware, UploadTooLargeError, cleanup_partial_uploads, safe_filename, save_upload,
 )
+from core.warmup import Warmup
+from core.memory import process_memory
+from core.cache.semantic_cache import SemanticAnswerCache
+
+# Loaders (PDF/TXT/DOCX; CSV/Excel có sẵn qua include_tabular=True)
+from core.chunking.document_loader import TEXT_EXTENSIONS, load_files_parallel
+from core.chunking.doc_cache import ParsedDocumentCache
+from core.chunking.metadata import DOC_TYPE_HANDBOOK, DOC_TYPE_OTHER, METADATA_VERSION
 
 # ----------------------------------------------------------------------
 # KHỞI TẠO VÀ CẤU HÌNH CƠ BẢN
@@ -31,33 +58,92 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-# Đảm bảo có file .env với biến Gemini_api_key
-api_key = os.getenv("Gemini_api_key")
+# Đảm bảo có file .env với biến Gemini_api_key (hoặc Deepseek_api_key khi LLM_BACKEND=deepseek).
+# Client LLM được tạo một lần và dùng chung trong process qua core.llm.registry.get_llm()
 
 DOCUMENT_DIR = "data"
 VECTOR_DB_PATH = "vectordb"
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS
 os.makedirs(DOCUMENT_DIR, exist_ok=True)
 
+# Upload tài liệu: ghi theo từng khối vào file tạm (băm SHA-256 trong lúc ghi) rồi đổi tên nguyên tử.
+# File trùng nội dung với file đã index thì bỏ qua; mỗi file tối đa UPLOAD_MAX_MB.
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "50"))
+UPLOAD_MAX_BYTES = int(UPLOAD_MAX_MB * 1024 * 1024)
+UPLOAD_MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "20"))
+cleanup_partial_uploads(DOCUMENT_DIR)
+# {SHA-256: tên file} của các file đã upload trong process (có thể chưa được index xong)
+uploaded_hashes: Dict[str, str] = {}
+
+# Load tài liệu song song bằng process pool, mỗi file có timeout riêng
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", str(os.cpu_count() or 1)))
+LOADER_TIMEOUT = float(os.getenv("LOADER_TIMEOUT", "300"))
+
+# Giới hạn tài nguyên cho pipeline /ask (không chặn event loop của uvicorn)
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Truy xuất lai: dense (FAISS) + BM25, gộp bằng reciprocal-rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "7"))
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+
+# Rerank bằng cross-encoder (tùy chọn): lấy dư RERANK_FETCH_K đoạn, giữ RERANK_TOP_N đoạn tốt nhất.
+# Quá ngân sách thời gian thì giữ nguyên thứ tự truy xuất.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "30"))
+reranker = CrossEncoderReranker(
+    model_name=os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL),
+    top_n=int(os.getenv("RERANK_TOP_N", "4")),
+    batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+    time_budget=float(os.getenv("RERANK_TIME_BUDGET_MS", "300")) / 1000,
+) if RERANK_ENABLED else None
+
 # Khởi tạo context băm mật khẩu (Bắt buộc cho bảo mật)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt tốn CPU (~0.1-0.3s): băm / kiểm tra mật khẩu chạy trong pool riêng, không chặn event loop
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", "4"))
+auth_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+
+# Người dùng lưu trong SQLite (index theo email và trạng thái phê duyệt)
+user_repo = UserRepository(db_path=os.getenv("USER_DB_PATH", ".cache/users.sqlite3"),
+                           pool_size=int(os.getenv("USER_DB_POOL_SIZE", "4")))
 
 # --- Khởi tạo Admin CỐ ĐỊNH ---
 ADMIN_EMAIL = "admin@tnut.edu.vn"
 ADMIN_PASSWORD_PLAIN = "admin123"
 
-ADMIN_HASHED_PASSWORD = pwd_context.hash(ADMIN_PASSWORD_PLAIN)
-
-# Giả lập Database (Lưu trữ người dùng trong bộ nhớ)
-fake_db: List[Dict[str, Any]] = [
-    {
-        "id": 1,
-        "fullname": "Super Admin",
-        "email": ADMIN_EMAIL,
-        "role": "admin",
-        "hashed_password": ADMIN_HASHED_PASSWORD,
-        "is_approved": True,  # Luôn được phê duyệt
-    }
-]
+# Chỉ băm mật khẩu admin ở lần chạy đầu tiên (khi tài khoản chưa có trong DB)
+user_repo.ensure_user("Super Admin", ADMIN_EMAIL, "admin", lambda: pwd_context.hash(ADMIN_PASSWORD_PLAIN))
+
+# Token đăng nhập ký HMAC: các trang kiểm tra token thay vì đăng nhập / bcrypt lại.
+# Không đặt AUTH_SECRET thì dùng khóa ngẫu nhiên sinh một lần và lưu trong DB người dùng,
+# để mọi worker uvicorn và các lần khởi động lại cùng ký / kiểm tra token bằng một khóa.
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+if not AUTH_SECRET:
+    logger.info("AUTH_SECRET is not set; using the token secret stored in the user database.")
+token_signer = TokenSigner(secret=AUTH_SECRET.encode("utf-8") if AUTH_SECRET else user_repo.secret("auth_token"),
+                           ttl_seconds=float(os.getenv("AUTH_TOKEN_TTL", str(8 * 3600))))
+
+# Dữ liệu điểm / CTĐT cho API kiểm tra tín chỉ (cùng file với trợ lý học tập trên Streamlit).
+# Đọc khi có request đầu tiên, tự đọc lại khi file thay đổi; kết quả theo sinh viên được cache tới lúc đó.
+academic_records = AcademicRecords(
+    os.getenv("ACADEMIC_GRADES_CSV", "250701 Sổ tay Điện tử.xlsx - Dữ liệu điểm.csv"),
+    os.getenv("ACADEMIC_CURRICULUM_CSV", "250701 Sổ tay Điện tử.xlsx - Mô tả CTĐT.csv"),
+)
+# Vai trò xem được kết quả học tập của mọi sinh viên (cố vấn học tập là giảng viên)
+AUDIT_ROLES = ("teacher", "admin")
+# Mã sinh viên: 2 chữ cái + 10-11 chữ số, cùng dạng với mã được nhận ra trong khung chat (user.html, frontend/app.py)
+STUDENT_ID_RE = re.compile(r"[A-Z]{2}\d{10,11}")
+credit_auditor = CreditAuditor(
+    academic_records,
+    prerequisite_column=os.getenv("ACADEMIC_PREREQUISITE_COLUMN", PREREQUISITE_COLUMN),
+    max_term_credits=float(os.getenv("ACADEMIC_MAX_TERM_CREDITS", "20")),
+    cache_size=int(os.getenv("AUDIT_CACHE_SIZE", "4096")),
+)
+academic_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="academic")
 
 
 # --- Class RAG ---
@@ -67,7 +153,9 @@ class ProcessData:
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            # Vị trí chunk trong tài liệu: dùng để ghép lại các chunk chồng lấn khi dựng context
+            add_start_index=True
         )
 
     def split_text(self, documents: List[Document]) -> List[Document]:
@@ -76,8 +164,100 @@ class ProcessData:
         return chunks
 
 
-vector_Hugging = HuggingEmbed()
-processor = ProcessData(chunk_size=500, chunk_overlap=100)
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "32"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", ".cache/query_embeddings.npz") or None
+
+# Embed khi build index: batch sắp theo độ dài, tùy chọn chạy nhiều process trên mọi core CPU
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MULTI_PROCESS = os.getenv("EMBED_MULTI_PROCESS", "0") == "1"
+
+# Loại index FAISS: flat (chính xác), hnsw hoặc ivfpq (xấp xỉ, cho kho dữ liệu lớn)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_INDEX_PARAMS = {
+    "hnsw_m": int(os.getenv("FAISS_HNSW_M", "32")),
+    "nlist": int(os.getenv("FAISS_NLIST", "0")),
+    "pq_m": int(os.getenv("FAISS_PQ_M", "48")),
+    "pq_nbits": int(os.getenv("FAISS_PQ_NBITS", "8")),
+}
+# Tham số lúc truy vấn (đổi không cần build lại): tăng để recall cao hơn, đổi lại chậm hơn
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# Chạy uvicorn nhiều worker: memory-map index.faiss và đọc docstore từ SQLite để các worker dùng chung
+# page cache thay vì mỗi worker một bản trong heap. Worker khác thay index trên đĩa thì mở lại
+# (kiểm tra tối đa mỗi VECTOR_STORE_CHECK_INTERVAL giây).
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "0") == "1"
+VECTOR_STORE_CHECK_INTERVAL = float(os.getenv("VECTOR_STORE_CHECK_INTERVAL", "5"))
+
+vector_Hugging = HuggingEmbed(query_cache_bytes=int(QUERY_CACHE_MAX_MB * 1024 * 1024),
+                              query_cache_path=QUERY_CACHE_PATH,
+                              embed_batch_size=EMBED_BATCH_SIZE,
+                              embed_multi_process=EMBED_MULTI_PROCESS,
+                              index_type=FAISS_INDEX_TYPE,
+                              index_params=FAISS_INDEX_PARAMS,
+                              nprobe=FAISS_NPROBE,
+                              ef_search=FAISS_EF_SEARCH,
+                              mmap=VECTOR_STORE_MMAP)
+# Lock khi thay thế index đang phục vụ (vector_Hugging.vector_db + thư mục vectordb/)
+index_lock = threading.Lock()
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+processor = ProcessData(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+INDEX_PARAMS = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "metadata_version": METADATA_VERSION,
+                "index_type": FAISS_INDEX_TYPE, **FAISS_INDEX_PARAMS}
+
+# Lọc trước theo metadata (ngành, loại tài liệu, năm) khi câu hỏi nêu rõ ngành / intent
+METADATA_FILTER = os.getenv("METADATA_FILTER", "1") == "1"
+# Câu hỏi chỉ về sinh viên (điểm, lớp, học kỳ...) tìm trong sổ tay / tài liệu khác, không trong CTĐT
+INTENT_DOC_TYPES = {"student": [DOC_TYPE_HANDBOOK, DOC_TYPE_OTHER]}
+
+# Phân loại intent: automaton từ khóa (bỏ dấu) dựng một lần lúc khởi động; bảng định tuyến đọc từ
+# INTENT_ROUTES_PATH (JSON) nếu có. INTENT_EMBEDDING=1 bật phân loại theo embedding (dùng lại embedding
+# câu hỏi) cho câu hỏi mà từ khóa không đủ chắc chắn.
+INTENT_ROUTES_PATH = os.getenv("INTENT_ROUTES_PATH", "")
+INTENT_OPTIONS = {
+    "min_keyword_confidence": float(os.getenv("INTENT_MIN_CONFIDENCE", "0.5")),
+    "min_embedding_similarity": float(os.getenv("INTENT_EMBEDDING_MIN_SIMILARITY", "0.5")),
+    # Câu hỏi có từ khóa của cả sinh viên và tuyển sinh: 1 = intent chung (như trước), 0 = intent điểm cao hơn
+    "exclusive": os.getenv("INTENT_EXCLUSIVE", "1") == "1",
+}
+if INTENT_ROUTES_PATH:
+    intent_classifier = IntentClassifier.from_file(INTENT_ROUTES_PATH, **INTENT_OPTIONS)
+else:
+    intent_classifier = IntentClassifier(**INTENT_OPTIONS)
+# Centroid của câu ví dụ được embed trong warm-up (cần model embedding)
+INTENT_EMBEDDING = os.getenv("INTENT_EMBEDDING", "0") == "1"
+
+# Gửi phần chỉ thị tĩnh của prompt riêng (system instruction của Gemini / system message của DeepSeek);
+# PROMPT_SYSTEM_PREFIX=0 gửi một chuỗi prompt duy nhất như trước
+PROMPT_SYSTEM_PREFIX = os.getenv("PROMPT_SYSTEM_PREFIX", "1") == "1"
+
+# Cache kết quả parse PDF/DOCX trên đĩa: đổi tham số chunking không phải parse lại tài liệu
+PARSED_CACHE_DIR = os.getenv("PARSED_CACHE_DIR", ".cache/parsed")
+parsed_cache = ParsedDocumentCache(PARSED_CACHE_DIR) if PARSED_CACHE_DIR else None
+
+# Cache câu trả lời theo embedding câu hỏi; tự động xóa mỗi khi vector store thay đổi
+# Lịch sử hội thoại lưu trong SQLite; prompt chỉ nhận phần lịch sử vừa ngân sách token
+chat_memory = ChatMemory(
+    db_path=os.getenv("CHAT_DB_PATH", ".cache/chat_sessions.sqlite3"),
+    history_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "800")),
+    summary_tokens=int(os.getenv("CHAT_SUMMARY_TOKENS", "300")),
+    # Phiên không hoạt động quá CHAT_SESSION_TTL giây bị xóa (mặc định 7 ngày)
+    ttl_seconds=float(os.getenv("CHAT_SESSION_TTL", str(7 * 86400))),
+)
+
+# Dựng context cho prompt: ghép chunk chồng lấn, bỏ đoạn trùng lặp, giới hạn số token
+context_assembler = ContextAssembler(
+    max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "1500")),
+    dedup_threshold=float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8")),
+)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+)
 
 
 # ==================== ĐỊNH NGHĨA CẤU TRÚC DỮ LIỆU (Pydantic Models) ====================
@@ -88,162 +268,544 @@ class UserRegister(BaseModel):
     email: str
     role: Literal["student", "teacher", "admin"]
     password: str
+    # Bắt buộc với sinh viên: chỉ xem được kết quả học tập của mã này (quản trị viên kiểm tra khi phê duyệt)
+    student_id: Optional[str] = None
+
+
+class CohortAuditRequest(BaseModel):
+    """Danh sách mã sinh viên, hoặc tiền tố mã (vd. khoá tuyển sinh) để kiểm tra cả khoá."""
+    student_ids: Optional[List[str]] = None
+    cohort: Optional[str] = None
 
 
 class QuestionRequest(BaseModel):
     question: str
+    # Phiên hội thoại phía server; bỏ trống để bắt đầu phiên mới (id được trả về trong response)
+    session_id: Optional[str] = None
 
 
-class State(TypedDict):
+class State(TypedDict, total=False):
     question: str
     context: List[Document]
     answer: str
+    query_embedding: List[float]
+    session_id: str
+    history: str
+    search_query: str
+    intent: str
+    intent_confidence: float
+    filters: Dict[str, List]
 
 
 # ==================== Logic RAG ====================
 
+def list_document_files(directory: str) -> List[str]:
+    """Danh sách tên file (đã sắp xếp) có loader hỗ trợ trong thư mục dữ liệu."""
+    if not os.path.exists(directory): return []
+    return sorted(
+        filename for filename in os.listdir(directory)
+        if not os.path.isdir(os.path.join(directory, filename))
+        and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+
+
+def load_documents_by_file(directory: str, filenames: List[str]) -> Tuple[Dict[str, List[Document]], Dict[str, str]]:
+    """
+    Load các file, giữ nguyên thứ tự của `filenames`. File chưa đổi lấy từ cache tài liệu đã parse;
+    các file còn lại được parse song song (process pool, timeout từng file) rồi ghi vào cache.
+    Trả về (tài liệu theo tên file, {tên file: lý do} của các file load lỗi / quá thời gian);
+    file lỗi không có trong dict tài liệu.
+    """
+    documents_by_file = {}
+    to_parse = []
+    for filename in filenames:
+        file_path = os.path.join(directory, filename)
+        documents_by_file[filename] = parsed_cache.get(file_path) if parsed_cache else None
+        if documents_by_file[filename] is None:
+            to_parse.append(file_path)
+    if filenames:
+        logger.info(f"Parsed-document cache: {len(filenames) - len(to_parse)} hit(s), {len(to_parse)} file(s) to parse.")
+
+    loaded, failed = load_files_parallel(to_parse, max_workers=LOADER_WORKERS, timeout=LOADER_TIMEOUT)
+    for file_path, documents in loaded:
+        documents_by_file[os.path.basename(file_path)] = documents
+        if parsed_cache:
+            parsed_cache.put(file_path, documents)
+    # File lỗi/timeout không được cache, lần sau sẽ parse lại
+    for file_path in failed:
+        del documents_by_file[os.path.basename(file_path)]
+    return documents_by_file, {os.path.basename(file_path): reason for file_path, reason in failed.items()}
+
+
 def load_documents_from_dir(directory: str) -> List[Document]:
     all_documents = []
-    if not os.path.exists(directory): return all_documents
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if os.path.isdir(file_path): continue
-        loader = None
-        if filename.lower().endswith(".pdf"):
-            loader = PyPDFLoader(file_path)
-        elif filename.lower().endswith(".txt"):
-            loader = TextLoader(file_path)
-        elif filename.lower().endswith((".docx", ".doc")):
-            loader = Docx2txtLoader(file_path)
-        # Bổ sung các loại file khác nếu cần:
-        # elif filename.lower().endswith(".csv"):
-        #     loader = CSVLoader(file_path)
-        # elif filename.lower().endswith((".xls", ".xlsx")):
-        #     loader = UnstructuredExcelLoader(file_path)
-
-        if loader:
-            try:
-                all_documents.extend(loader.load())
-            except Exception as e:
-                logger.error(f"Error loading {filename}: {e}")
+    documents_by_file, _ = load_documents_by_file(directory, list_document_files(directory))
+    for documents in documents_by_file.values():
+        all_documents.extend(documents)
     return all_documents
 
 
-def retrain_vector_store_full():
-    logger.info("Starting FULL vector store retraining process...")
-    all_documents = load_documents_from_dir(DOCUMENT_DIR)
-    if not all_documents:
-        logger.warning("No documents found to train the vector store. Skipping retraining.")
+def _chunk_file(filename: str, file_hash: str, documents: List[Document]):
+    """Split tài liệu của một file, trả về (chunks, ids) với id ổn định theo nội dung file."""
+    chunks = processor.split_text(documents)
+    return chunks, IndexManifest.chunk_ids(filename, file_hash, len(chunks))
+
+
+def _no_progress(progress: float, message: str) -> None:
+    pass
+
+
+def _clear_vector_store():
+    with index_lock:
         vector_Hugging.vector_db = None
+        vector_Hugging.bm25 = None
         if os.path.exists(VECTOR_DB_PATH): shutil.rmtree(VECTOR_DB_PATH, ignore_errors=True)
-        return
-    chunks = processor.split_text(all_documents)
-    if not chunks:
+        answer_cache.clear()
+
+
+def _publish_vector_store(staging: HuggingEmbed, manifest: IndexManifest) -> None:
+    """
+    Ghi index mới vào thư mục tạm, sau đó thay thế thư mục cũ và index trong bộ nhớ dưới lock.
+    /ask vẫn dùng index cũ cho tới thời điểm thay thế.
+    """
+    tmp_path = f"{VECTOR_DB_PATH}.tmp"
+    if os.path.exists(tmp_path): shutil.rmtree(tmp_path)
+    staging.save_vector_store(tmp_path)
+    manifest.save(tmp_path)
+    with index_lock:
+        replace_directory(tmp_path, VECTOR_DB_PATH)
+        if vector_Hugging.mmap:
+            # Mở lại bản vừa ghi bằng mmap, bản trong heap của staging được giải phóng
+            vector_Hugging.load_vector_store(VECTOR_DB_PATH)
+        else:
+            vector_Hugging.vector_db = staging.vector_db
+            vector_Hugging.bm25 = staging.bm25
+        answer_cache.clear()
+    # Dựng sẵn index metadata cho store mới, không để request đầu tiên phải chờ
+    vector_Hugging.metadata_index()
+
+
+def retrain_vector_store_full(progress: Callable[[float, str], None] = _no_progress,
+                              failed_files: Optional[Dict[str, str]] = None):
+    """
+    Build lại toàn bộ vector store từ thư mục dữ liệu.
+    File load lỗi / quá thời gian không được ghi vào manifest (lần train incremental sau sẽ thử lại)
+    và được ghi vào `failed_files` nếu có.
+    """
+    logger.info("Starting FULL vector store retraining process...")
+    manifest = IndexManifest(params=INDEX_PARAMS)
+    all_chunks, all_ids = [], []
+    filenames = list_document_files(DOCUMENT_DIR)
+    progress(0.05, f"Đang load {len(filenames)} tài liệu")
+    documents_by_file, failed = load_documents_by_file(DOCUMENT_DIR, filenames)
+    if failed_files is not None:
+        failed_files.update(failed)
+    if parsed_cache:
+        parsed_cache.prune([os.path.join(DOCUMENT_DIR, filename) for filename in filenames])
+    for filename, documents in documents_by_file.items():
+        file_hash = file_sha256(os.path.join(DOCUMENT_DIR, filename))
+        chunks, ids = _chunk_file(filename, file_hash, documents)
+        manifest.set_file(filename, file_hash, ids)
+        all_chunks.extend(chunks)
+        all_ids.extend(ids)
+    if not all_chunks and failed and vector_Hugging.vector_db is not None:
+        # Không xóa index đang có chỉ vì mọi file đều load lỗi
+        raise RuntimeError(f"Không load được tài liệu nào: {', '.join(sorted(failed))}")
+    if not all_chunks:
         logger.warning("No chunks created from documents. Skipping vector store creation.")
-        vector_Hugging.vector_db = None
-        if os.path.exists(VECTOR_DB_PATH): shutil.rmtree(VECTOR_DB_PATH, ignore_errors=True)
+        _clear_vector_store()
         return
-    if os.path.exists(VECTOR_DB_PATH):
-        try:
-            shutil.rmtree(VECTOR_DB_PATH)
-        except OSError as e:
-            logger.error(f"Error deleting old vector store {e.filename}: {e.strerror}.")
-    new_vector_store = vector_Hugging.create_vector_store(chunks)
-    vector_Hugging.save_vector_store(VECTOR_DB_PATH)
+    progress(0.4, f"Đang embed {len(all_chunks)} đoạn văn bản")
+    staging = vector_Hugging.fork(empty=True)
+    new_vector_store = staging.create_vector_store(all_chunks, ids=all_ids)
+    progress(0.9, "Đang lưu và thay thế vector store")
+    _publish_vector_store(staging, manifest)
     logger.info("New vector store created and saved successfully")
     return new_vector_store
 
 
-# Khởi tạo vector store khi ứng dụng khởi động
-try:
-    vector_Hugging.load_vector_store(VECTOR_DB_PATH)
-    logger.info("Vector store loaded successfully on startup.")
-except (FileNotFoundError, RuntimeError) as e:
-    if "not found" in str(e) or "could not open" in str(e):
-        logger.info("Vector store index.faiss not found on startup. Checking for documents...")
-        retrain_vector_store_full()
+def retrain_vector_store_incremental(progress: Callable[[float, str], None] = _no_progress,
+                                     files: Optional[List[str]] = None,
+                                     failed_files: Optional[Dict[str, str]] = None):
+    """
+    Chỉ load, chia nhỏ và embed lại các file mới/đã thay đổi (so sánh hash với manifest),
+    đồng thời xóa vector của các file đã bị xóa khỏi thư mục dữ liệu.
+    `files`: chỉ xét các file này (vd. do watcher báo thay đổi), không băm lại cả thư mục.
+    Nếu chưa có index hoặc manifest (index cũ), chuyển sang train lại toàn bộ.
+    File load lỗi / quá thời gian không có trong manifest (lần sau sẽ thử lại) và được ghi vào `failed_files`.
+    """
+    manifest = IndexManifest.load(VECTOR_DB_PATH)
+    if vector_Hugging.vector_db is None or manifest.is_empty():
+        logger.info("No existing index/manifest found. Falling back to FULL retraining.")
+        return retrain_vector_store_full(progress, failed_files)
+    if manifest.params != INDEX_PARAMS:
+        logger.info(f"Index parameters changed ({manifest.params} -> {INDEX_PARAMS}). Falling back to FULL retraining.")
+        return retrain_vector_store_full(progress, failed_files)
+
+    progress(0.05, "Đang so sánh tài liệu với manifest")
+    document_files = list_document_files(DOCUMENT_DIR)
+    scope = set(files) if files is not None else None
+    current_hashes = {
+        filename: file_sha256(os.path.join(DOCUMENT_DIR, filename))
+        for filename in document_files if scope is None or filename in scope
+    }
+    changed, removed = manifest.diff(current_hashes, scope)
+    if not changed and not removed:
+        logger.info("Vector store is up to date. Nothing to re-index.")
+        return vector_Hugging.vector_db
+    if not document_files:
+        logger.warning("No documents left in data directory. Removing vector store.")
+        _clear_vector_store()
+        return
+
+    logger.info(f"Incremental re-index: {len(changed)} new/changed file(s), {len(removed)} removed file(s).")
+    stale_ids = []
+    for filename in removed + changed:
+        stale_ids.extend(manifest.remove_file(filename))
+    if stale_ids and not vector_Hugging.supports_delete():
+        logger.info(f"FAISS index type '{FAISS_INDEX_TYPE}' cannot delete vectors. Falling back to FULL retraining.")
+        return retrain_vector_store_full(progress, failed_files)
+    # Cập nhật trên bản sao của index; index đang phục vụ /ask chỉ bị thay khi bản mới đã lưu xong
+    staging = vector_Hugging.fork()
+    staging.delete_documents(stale_ids)
+
+    progress(0.2, f"Đang load {len(changed)} tài liệu mới/thay đổi")
+    documents_by_file, failed = load_documents_by_file(DOCUMENT_DIR, changed)
+    if failed_files is not None:
+        failed_files.update(failed)
+    for i, filename in enumerate(changed):
+        if filename in failed:
+            # Vector của bản cũ đã bị xóa; file vắng mặt trong manifest nên lần train sau sẽ load lại
+            logger.warning(f"Skipping '{filename}': {failed[filename]}")
+            continue
+        progress(0.3 + 0.6 * i / len(changed), f"Đang embed '{filename}'")
+        chunks, ids = _chunk_file(filename, current_hashes[filename], documents_by_file[filename])
+        staging.add_documents(chunks, ids=ids)
+        manifest.set_file(filename, current_hashes[filename], ids)
+        logger.info(f"Indexed {len(chunks)} chunks from '{filename}'.")
+
+    progress(0.9, "Đang lưu và thay thế vector store")
+    _publish_vector_store(staging, manifest)
+    logger.info("Vector store updated incrementally and saved successfully")
+    return staging.vector_db
+
+
+def run_retrain_job(job: RetrainJob) -> None:
+    if job.params.get("full"):
+        retrain_vector_store_full(job.update, failed_files=job.failed_files)
     else:
-        raise
-except Exception as e:
-    logger.error(f"An unexpected error occurred during vector store loading: {e}")
-    retrain_vector_store_full()
+        retrain_vector_store_incremental(job.update, files=job.params.get("files"), failed_files=job.failed_files)
+
+
+# Train lại chạy nền, lần lượt từng job trên một thread riêng. Worker chỉ bắt đầu khi warm-up đã load
+# index; job gửi lên sớm hơn (vd. upload ngay lúc khởi động) được giữ trong hàng đợi.
+retrain_jobs = RetrainJobQueue(run_retrain_job, autostart=False)
+
+
+def index_changed_files(filenames: List[str]) -> Dict[str, Any]:
+    """Đưa các file watcher báo thay đổi vào một job index incremental."""
+    return retrain_jobs.submit(full=False, files=filenames).to_dict()
+
+
+# Theo dõi thư mục data/ (tùy chọn): file do cán bộ chép thẳng vào được index tự động, chỉ các file thay đổi.
+# Gom các sự kiện tới khi thư mục yên lặng WATCH_QUIET_SECONDS giây rồi mới tạo job.
+WATCH_DATA_DIR = os.getenv("WATCH_DATA_DIR", "0") == "1"
+data_watcher = DirectoryWatcher(
+    DOCUMENT_DIR, index_changed_files, extensions=SUPPORTED_EXTENSIONS,
+    quiet_seconds=float(os.getenv("WATCH_QUIET_SECONDS", "2")),
+) if WATCH_DATA_DIR else None
+
+
+def _build_index_on_startup() -> None:
+    job = retrain_jobs.submit(full=True)
+    retrain_jobs.start()
+    job.wait()
+    if job.error:
+        raise RuntimeError(job.error)
+
+
+def load_index_on_startup() -> None:
+    """Load vector store đã lưu; chưa có (hoặc không đọc được) thì build lại toàn bộ và chờ build xong."""
+    recover_directory(VECTOR_DB_PATH)
+    try:
+        vector_Hugging.load_vector_store(VECTOR_DB_PATH)
+        vector_Hugging.metadata_index()
+        logger.info("Vector store loaded successfully on startup.")
+    except (FileNotFoundError, RuntimeError) as e:
+        if "not found" in str(e) or "could not open" in str(e):
+            logger.info("Vector store index.faiss not found on startup. Checking for documents...")
+            _build_index_on_startup()
+        else:
+            raise
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during vector store loading: {e}")
+        _build_index_on_startup()
+
+    retrain_jobs.start()
+    if vector_Hugging.vector_db is not None and IndexManifest.load(VECTOR_DB_PATH).params != INDEX_PARAMS:
+        # Index được build với tham số/metadata cũ: vẫn phục vụ trong lúc build lại ở nền
+        logger.info("Index parameters changed since the last build. Queuing a FULL retrain.")
+        retrain_jobs.submit(full=True)
+
+
+# Các bước khởi động chậm (load index, model) chạy nền sau khi server đã nhận request:
+# trang tĩnh và API người dùng phục vụ ngay, /readyz báo khi nào chatbot sẵn sàng.
+warmup = Warmup()
+WARMUP_STEPS = [
+    ("index", load_index_on_startup),
+    ("embedding_model", vector_Hugging.model.load),
+    ("llm_client", get_llm),
+]
+if INTENT_EMBEDDING:
+    WARMUP_STEPS.append(("intent_embeddings", lambda: intent_classifier.fit_embeddings(vector_Hugging.embeddings)))
+if reranker:
+    WARMUP_STEPS.append(("reranker", lambda: reranker.model))
+
+
+def start_warmup() -> bool:
+    """Bắt đầu warm-up (chỉ lần gọi đầu tiên có tác dụng). Script/benchmark gọi rồi warmup.wait()."""
+    return warmup.start(WARMUP_STEPS)
+
+
+def search_query(state: State) -> str:
+    """Câu hỏi dùng để truy xuất: câu đã viết lại (câu hỏi tiếp nối) nếu có."""
+    return state.get("search_query") or state["question"]
+
+
+def load_conversation(state: State) -> State:
+    """Gắn lịch sử hội thoại (đã giới hạn token) và câu hỏi viết lại cho truy xuất vào state."""
+    session_id = state.get("session_id")
+    if not session_id or not chat_memory.exists(session_id):
+        return {**state, "session_id": chat_memory.create_session(), "history": ""}
+    conversation = chat_memory.conversation(session_id)
+    return {**state, "history": conversation.format(), "search_query": rewrite_question(state["question"], conversation)}
+
+
+def save_turn(state: State) -> None:
+    chat_memory.add_turn(state["session_id"], state["question"], state["answer"])
+
+
+def embed_question(state: State) -> State:
+    """Embed câu hỏi một lần, dùng chung cho cache câu trả lời, phân loại intent và truy xuất FAISS.
+    Bộ lọc metadata cũng được xác định ở đây: cache câu trả lời được chia theo intent + bộ lọc."""
+    query_embedding = vector_Hugging.embeddings.embed_query(search_query(state))
+    intent = intent_classifier.classify(search_query(state), query_embedding)
+    return {**state, "query_embedding": query_embedding, "intent": intent.intent,
+            "intent_confidence": intent.confidence,
+            "filters": question_filters(search_query(state), intent.intent, vector_Hugging.vector_db)}
+
+
+def question_filters(question: str, intent: str, vector_db) -> Dict[str, List]:
+    """Bộ lọc metadata (ngành, loại tài liệu, năm) suy ra từ câu hỏi; rỗng khi chưa có vector store."""
+    if vector_db is None:
+        return {}
+    return build_filters(question, intent, vector_Hugging.metadata_index(vector_db), INTENT_DOC_TYPES)
+
+
+def reload_shared_index() -> None:
+    """Chế độ mmap: mở lại index khi một worker khác đã thay thư mục vectordb/ trên đĩa."""
+    if not vector_Hugging.mmap or vector_Hugging.vector_db is None:
+        return
+    if not vector_Hugging.changed_on_disk(VECTOR_DB_PATH, VECTOR_STORE_CHECK_INTERVAL):
+        return
+    with index_lock:
+        if vector_Hugging.changed_on_disk(VECTOR_DB_PATH):
+            logger.info("Vector store was replaced on disk by another worker. Reloading.")
+            try:
+                vector_Hugging.load_vector_store(VECTOR_DB_PATH)
+            except Exception as e:
+                # Đang giữa lúc thay thư mục: tiếp tục dùng index cũ, lần kiểm tra sau thử lại
+                logger.warning(f"Could not reload vector store ({e}); keeping the current one.")
+                return
+            answer_cache.clear()
 
 
 def retrivel(state: State) -> State:
     """
     Hàm truy xuất dữ liệu.
-    k=7 được giữ lại để đảm bảo lấy đủ Context cho LLM, vì các đoạn đã được tối ưu hóa.
+    k=7 (RETRIEVAL_K) được giữ lại để đảm bảo lấy đủ Context cho LLM, vì các đoạn đã được tối ưu hóa.
+    BM25 bắt được mã HP, mã sinh viên, tên ngành mà embedding dễ bỏ sót; kết quả gộp với FAISS bằng RRF.
     """
-    if vector_Hugging.vector_db is None: return {**state, "context": []}
-    # Tăng k lên 7-10 để lấy được nhiều context hơn theo yêu cầu
-    similarity_search = vector_Hugging.vector_db.similarity_search(query=state['question'], k=7)
-    return {**state, "context": similarity_search}
-
+    reload_shared_index()
+    # Giữ tham chiếu tới index hiện tại: job train lại có thể thay thế vector_db bất cứ lúc nào
+    vector_db, bm25 = vector_Hugging.vector_db, vector_Hugging.bm25
+    if vector_db is None: return {**state, "context": []}
+    question = search_query(state)
+    query_embedding = state.get("query_embedding") or vector_Hugging.embeddings.embed_query(question)
+    k = RERANK_FETCH_K if reranker else RETRIEVAL_K
+    positions = allowed_ids = None
+    if METADATA_FILTER:
+        metadata_index = vector_Hugging.metadata_index(vector_db)
+        filters = state.get("filters")
+        if filters is None:
+            filters = question_filters(question, question_intent(state), vector_db)
+        positions = metadata_index.select(filters)
+        if positions is not None:
+            logger.info(f"Metadata filter {filters}: searching {len(positions)}/{vector_db.index.ntotal} chunks")
+            allowed_ids = metadata_index.doc_ids(positions) if HYBRID_SEARCH else None
+    context = hybrid_search(vector_db, bm25 if HYBRID_SEARCH else None, question, query_embedding,
+                            k=k, fetch_k=max(k, RETRIEVAL_FETCH_K), positions=positions, allowed_ids=allowed_ids)
+    if reranker:
+        context = reranker.rerank(question, context)
+    return {**state, "context": context}
+
+
+def lookup_cached_answer(state: State) -> Optional[State]:
+    """Trả về state với câu trả lời đã cache cho câu hỏi tương tự (nếu có)."""
+    # Câu hỏi tiếp nối phụ thuộc lịch sử hội thoại, không dùng câu trả lời của người khác
+    if not ANSWER_CACHE_ENABLED or search_query(state) != state["question"]:
+        return None
+    cached = answer_cache.lookup(state["query_embedding"], answer_scope(state))
+    if cached is None:
+        return None
+    return {**state, "context": cached["context"], "answer": cached["answer"]}
+
+
+def remember_answer(state: State) -> None:
+    # Chỉ cache câu trả lời thực sự có context (câu trả lời "không tìm thấy" vốn đã rẻ)
+    if ANSWER_CACHE_ENABLED and state["context"] and state["answer"] and search_query(state) == state["question"]:
+        answer_cache.store(state["query_embedding"], state["question"], state["answer"], state["context"],
+                           answer_scope(state))
+
+
+def answer_scope(state: State) -> tuple:
+    """Phạm vi cache của câu hỏi: câu hỏi chỉ khác tên ngành (embedding gần như trùng nhau)
+    có bộ lọc khác nhau nên không dùng chung câu trả lời."""
+    filters = state.get("filters") or {}
+    return question_intent(state), tuple(sorted((field, tuple(values)) for field, values in filters.items()))
+
+
+def public_state(state: State) -> Dict[str, Any]:
+    # Không gửi lại embedding và lịch sử hội thoại: client chỉ cần giữ session_id
+    return {key: value for key, value in state.items() if key not in ("query_embedding", "history")}
+
+
+def question_intent(state: State) -> str:
+    """Intent đã phân loại trong embed_question; phân loại lại (chỉ từ khóa) nếu state chưa có."""
+    if "intent" in state:
+        return state["intent"]
+    return intent_classifier.classify(search_query(state)).intent
+
+
+NO_CONTEXT_ANSWER = "<p>Tôi xin lỗi, tôi không tìm thấy bất kỳ thông tin liên quan nào trong cơ sở dữ liệu của Nhà trường. Vui lòng thử câu hỏi khác.</p>"
+
+
+def build_prompt(state: State):
+    """Dựng prompt theo intent của câu hỏi từ template dựng sẵn. Trả về None nếu không có context."""
+    context_text = context_assembler.assemble(state['context']).text
+    if not context_text:
+        return None
 
-def classify_intent(question: str) -> Dict[str, bool]:
-    lower_q = question.lower()
-    is_student_query = (
-            "điểm" in lower_q or "sinh viên" in lower_q or "lớp" in lower_q or "thời khóa biểu" in lower_q or "mã số sinh viên" in lower_q or "học kỳ" in lower_q)
-    is_admission_query = (
-            "tuyển sinh" in lower_q or "ngành" in lower_q or "điểm chuẩn" in lower_q or "xét tuyển" in lower_q or "khối" in lower_q or "học phí" in lower_q)
-    return {"is_student_query": is_student_query, "is_admission_query": is_admission_query}
+    # Lịch sử hội thoại (đã tóm tắt/cắt theo ngân sách token) để hiểu câu hỏi tiếp nối
+    history_text = f"\nLịch sử hội thoại:\n{state['history']}\n" if state.get("history") else ""
+    # Phần chỉ thị tĩnh (prompt.system) giống hệt nhau giữa các request: gửi qua system instruction / cache
+    prompt = prompt_registry.render(question_intent(state), context_text, history_text, state['question'])
+    return prompt if PROMPT_SYSTEM_PREFIX else prompt.text
 
 
 def generate(state: State):
-    llm = LLM(api_key=api_key)
-    context_text = "\n".join([doc.page_content for doc in state['context']])
-    question = state['question']
-
-    # --- CHỈ THỊ HTML MỚI ĐÃ TỐI ƯU ---
-    html_instruction = (
-        "QUAN TRỌNG: Câu trả lời phải được định dạng bằng **HTML hợp lệ** (sử dụng các thẻ <h3>, <table>, <b>, <br>, <p>) để hiển thị chuyên nghiệp trên giao diện web. "
-        "Sử dụng thẻ <table> cho dữ liệu có cấu trúc (như danh sách, bảng). Tuyệt đối không sử dụng định dạng Markdown (như ##, *, -). "
-        "Hãy **TỔNG HỢP** thông tin từ tất cả các đoạn trích liên quan để đưa ra câu trả lời đầy đủ nhất."
-    )
-    # --- KẾT THÚC CHỈ THỊ HTML MỚI ---
-
-    if not context_text:
+    prompt = build_prompt(state)
+    if prompt is None:
         # Trả lời lỗi bằng thẻ HTML <p>
-        return {**state,
-                "answer": "<p>Tôi xin lỗi, tôi không tìm thấy bất kỳ thông tin liên quan nào trong cơ sở dữ liệu của Nhà trường. Vui lòng thử câu hỏi khác.</p>"}
-
-    intents = classify_intent(question)
-    is_student_query = intents["is_student_query"]
-    is_admission_query = intents["is_admission_query"]
-
-    # Prompt generation logic
-    if is_student_query and not is_admission_query:
-        # Sinh viên
-        prompt = (
-            f"Bạn là trợ lý thông tin sinh viên của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. {html_instruction}"
-            f"Ưu tiên trả lời câu hỏi dựa trên các thông tin từ bảng nếu có. Dựa trên các thông tin sau, hãy trả lời câu hỏi của người dùng một cách chính xác và ngắn gọn. Nếu thông tin không liên quan hoặc không đủ để trả lời, hãy trả lời bằng một thẻ <p> rằng 'Tôi không tìm thấy thông tin phù hợp về sinh viên này'."
-            f"\nNội dung được cung cấp:\n{context_text}\nCâu hỏi của sinh viên: {state['question']}")
-
-    elif is_admission_query and not is_student_query:
-        # Tuyển sinh
-        prompt = (
-            f"Bạn là trợ lý tư vấn tuyển sinh của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. {html_instruction}"
-            f"Dựa trên nội dung sau, hãy trả lời câu hỏi của người dùng một cách đầy đủ và chính xác. Nếu không có thông tin phù hợp, hãy trả lời bằng một thẻ <p> rằng 'Tôi không tìm thấy thông tin phù hợp về tuyển sinh'."
-            f"Sử dụng thẻ <table> cho thông tin học phí, điểm chuẩn hoặc các danh sách liên quan. "
-            f"\nNội dung được cung cấp:\n{context_text}\nCâu hỏi về tuyển sinh: {state['question']}")
+        return {**state, "answer": NO_CONTEXT_ANSWER}
+    llm = get_llm()
+    answer = llm.post_request(prompt)
+    return {**state, "answer": answer}
 
-    else:
-        # Prompt tổng quát/mặc định
-        prompt = (
-            f"Bạn là Trợ lý Thông tin chính thức của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên (TNUT). {html_instruction}"
-            f"Dựa vào **DUY NHẤT** các thông tin được cung cấp dưới đây, hãy trả lời câu hỏi của người dùng. "
-            f"Sử dụng các tiêu đề <h3> và thẻ <table> cho dữ liệu cấu trúc phức tạp. "
-            f"\n\n--- BẮT ĐẦU NỘI DUNG CUNG CẤP ---\n{context_text}\n--- KẾT THÚC NỘI DUNG CUNG CUNG CẤP ---\n\n"
-            f"Câu hỏi của người dùng: {state['question']}\n\n"
-            f"QUY TẮC PHẢN HỒI:\n1. **Chỉ sử dụng** thông tin trong phần 'Nội dung được cung cấp' để trả lời.\n2. Nếu thông tin được cung cấp **không đủ** hoặc **không liên quan** để trả lời câu hỏi, hãy trả lời bằng một thẻ <p> rằng: 'Tôi xin lỗi, tôi không tìm thấy thông tin chính thức phù hợp trong cơ sở dữ liệu của Nhà trường để trả lời câu hỏi này.' Tuyệt đối **không được tự ý bịa đặt hoặc suy đoán**.")
 
-    answer = llm.post_request(prompt)
+async def agenerate(state: State):
+    """Phiên bản async của generate(): gọi Gemini qua client async, giới hạn số request đồng thời."""
+    prompt = build_prompt(state)
+    if prompt is None:
+        return {**state, "answer": NO_CONTEXT_ANSWER}
+    llm = get_llm()
+    async with llm_semaphore:
+        answer = await llm.apost_request(prompt)
     return {**state, "answer": answer}
 
 
+async def astream_generate(state: State):
+    """Sinh câu trả lời dạng stream: yield từng đoạn text ngay khi LLM trả về."""
+    prompt = build_prompt(state)
+    if prompt is None:
+        yield NO_CONTEXT_ANSWER
+        return
+    llm = get_llm()
+    async with llm_semaphore:
+        async for text in llm.astream_request(prompt):
+            yield text
+
+
+def context_sources(context: List[Document]) -> List[Dict[str, Any]]:
+    """Thông tin nguồn của các đoạn context để hiển thị cho người dùng."""
+    return [
+        {
+            "source": os.path.basename(doc.metadata.get("source", "")),
+            "page": doc.metadata.get("page"),
+            "snippet": doc.page_content[:200],
+        }
+        for doc in context
+    ]
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def aload_conversation(state: State) -> State:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, load_conversation, state)
+
+
+async def asave_turn(state: State) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(retrieval_executor, save_turn, state)
+
+
+async def aembed_question(state: State) -> State:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, embed_question, state)
+
+
+async def alookup_cached_answer(state: State) -> Optional[State]:
+    """Tìm trong cache câu trả lời (tìm FAISS theo phạm vi) trong thread pool, không chặn event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, lookup_cached_answer, state)
+
+
+async def aremember_answer(state: State) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(retrieval_executor, remember_answer, state)
+
+
+async def aretrivel(state: State) -> State:
+    """Chạy retrivel() (embed câu hỏi + tìm FAISS, tốn CPU) trong thread pool giới hạn."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, retrivel, state)
+
+
 # ==================== Cấu Hình FastAPI Endpoints ====================
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_warmup()
+    if data_watcher is not None:
+        data_watcher.start()
+    yield
+    if data_watcher is not None:
+        data_watcher.stop()
+    vector_Hugging.embeddings.save()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Từ chối sớm request upload quá lớn (theo Content-Length), trước khi body được đọc / lưu tạm
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={"/uploadfile/": UPLOAD_MAX_BYTES + 64 * 1024,
+            "/api/uploads": UPLOAD_MAX_BYTES * UPLOAD_MAX_FILES + 64 * 1024},
+    detail=f"File tải lên vượt quá giới hạn {UPLOAD_MAX_MB:g} MB.",
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -255,6 +817,30 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: process đang chạy và event loop phản hồi."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: index và model đã load xong (503 trong lúc warm-up hoặc khi warm-up lỗi)."""
+    vector_db = vector_Hugging.vector_db
+    body = {
+        **warmup.to_dict(),
+        "index_loaded": vector_db is not None,
+        "chunks": vector_db.index.ntotal if vector_db is not None else 0,
+    }
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
+
+
+def require_ready() -> None:
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail="Hệ thống đang khởi động, vui lòng thử lại sau ít phút.",
+                            headers={"Retry-After": "5"})
+
+
 # ENDPOINT GỐC ĐÃ CẬP NHẬT: Ưu tiên index.html
 @app.get("/", include_in_schema=False)
 async def get_index():
@@ -324,6 +910,12 @@ async def get_quycai_page():
 
 # ==================== ENDPOINTS QUẢN LÝ NGƯỜI DÙNG (Đã sửa lỗi) ====================
 
+async def run_auth(func: Callable, *args):
+    """Chạy truy vấn DB / bcrypt trong auth_executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(auth_executor, func, *args)
+
+
 @app.post("/api/register", tags=["User Management"])
 async def register_user(user: UserRegister):
     """API xử lý việc đăng ký tài khoản mới. Tài khoản mới luôn cần phê duyệt."""
@@ -332,71 +924,134 @@ async def register_user(user: UserRegister):
         raise HTTPException(status_code=400,
                             detail="Email này đã được sử dụng cho tài khoản quản trị cố định. Vui lòng sử dụng email khác.")
 
-    if any(u['email'] == user.email for u in fake_db):
+    if await run_auth(user_repo.get_by_email, user.email) is not None:
         raise HTTPException(status_code=400, detail="Email đã được đăng ký.")
 
-    hashed_password = pwd_context.hash(user.password)
+    student_id = (user.student_id or "").strip().upper() or None
+    if user.role == "student" and student_id is None:
+        raise HTTPException(status_code=400, detail="Sinh viên cần nhập mã sinh viên.")
+    if user.role == "student" and not STUDENT_ID_RE.fullmatch(student_id):
+        raise HTTPException(status_code=400,
+                            detail="Mã sinh viên không hợp lệ: gồm 2 chữ cái và 10-11 chữ số (vd: DT2055202070).")
 
-    new_id = max([u['id'] for u in fake_db]) + 1 if fake_db else 1
+    hashed_password = await run_auth(pwd_context.hash, user.password)
 
-    new_user = {
-        "id": new_id,
-        "fullname": user.fullname,
-        "email": user.email,
-        "role": user.role,
-        "hashed_password": hashed_password,
-        "is_approved": False,
-    }
-    fake_db.append(new_user)
+    try:
+        # UNIQUE(email) chặn hai request đăng ký cùng email chạy song song
+        await run_auth(lambda: user_repo.create(user.fullname, user.email, user.role, hashed_password,
+                                                student_id=student_id if user.role == "student" else None))
+    except DuplicateEmailError:
+        raise HTTPException(status_code=400, detail="Email đã được đăng ký.")
 
     return {"message": "Đăng ký thành công. Tài khoản đang chờ quản trị viên phê duyệt."}
 
 
 @app.post("/api/login", tags=["User Management"])
 async def login(credentials: Dict[str, str]):
-    """API xử lý đăng nhập và xác thực người dùng."""
-    email = credentials.get("email")
-    password = credentials.get("password")
+    """API xử lý đăng nhập và xác thực người dùng. Trả về token để các trang không phải đăng nhập lại."""
+    email = credentials.get("email") or ""
+    password = credentials.get("password") or ""
 
-    user = next((u for u in fake_db if u['email'] == email), None)
+    user = await run_auth(user_repo.get_by_email, email)
 
     if not user:
         raise HTTPException(status_code=401, detail="Email hoặc mật khẩu không đúng.")
 
-    if not pwd_context.verify(password, user['hashed_password']):
+    if not await run_auth(pwd_context.verify, password, user['hashed_password']):
         raise HTTPException(status_code=401, detail="Email hoặc mật khẩu không đúng.")
 
     if not user['is_approved']:
         raise HTTPException(status_code=403, detail="Tài khoản chưa được quản trị viên phê duyệt.")
 
+    claims = {"id": user['id'], "role": user['role'], "fullname": user['fullname'], "student_id": user['student_id']}
+    token = token_signer.sign(claims)
     # SỬA LỖI QUAN TRỌNG: Đã đổi 'user_id' thành 'id' để khớp với frontend
-    return {"message": "Đăng nhập thành công!",
-            **{"id": user['id'], "role": user['role'], "fullname": user['fullname']}}
+    return {"message": "Đăng nhập thành công!", "token": token, **claims}
+
+
+def require_user(authorization: Optional[str] = Header(default=None)) -> Dict[str, Any]:
+    """Dependency: người dùng của token đăng nhập (header `Authorization: Bearer <token>`), không truy vấn DB / bcrypt."""
+    scheme, _, token = (authorization or "").partition(" ")
+    claims = token_signer.verify(token) if scheme.lower() == "bearer" and token else None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Phiên đăng nhập không hợp lệ hoặc đã hết hạn.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return {"id": claims["id"], "role": claims["role"], "fullname": claims["fullname"],
+            "student_id": claims.get("student_id")}
+
+
+def require_role(*roles: str) -> Callable:
+    """Dependency: như require_user nhưng chỉ cho các vai trò trong `roles`."""
+    def dependency(user: Dict[str, Any] = Depends(require_user)) -> Dict[str, Any]:
+        if user["role"] not in roles:
+            raise HTTPException(status_code=403, detail="Bạn không có quyền thực hiện thao tác này.")
+        return user
+    return dependency
+
+
+@app.get("/api/me", tags=["User Management"])
+async def current_user(user: Dict[str, Any] = Depends(require_user)):
+    """Kiểm tra token đăng nhập (header `Authorization: Bearer <token>`), không truy vấn DB / bcrypt."""
+    return user
 
 
 @app.get("/api/pending-users", tags=["Admin"])
 async def get_pending_users():
     """API lấy danh sách các tài khoản đang chờ duyệt (Dành cho Admin)."""
-    pending_users = [
-        {"id": u['id'], "fullname": u['fullname'], "email": u['email'], "role": u['role']}
-        for u in fake_db if u['is_approved'] == False
-    ]
-    return pending_users
+    return await run_auth(user_repo.list_users, False)
 
 
 @app.post("/api/approve-user/{user_id}", tags=["Admin"])
 async def approve_user(user_id: int):
     """API phê duyệt tài khoản (Dành cho Admin)."""
-    for user in fake_db:
-        if user['id'] == user_id:
-            if user['is_approved']:
-                raise HTTPException(status_code=400, detail="Tài khoản này đã được phê duyệt.")
+    approved = await run_auth(user_repo.approve, user_id)
+    if approved is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy người dùng.")
+    if not approved:
+        raise HTTPException(status_code=400, detail="Tài khoản này đã được phê duyệt.")
+    logger.info(f"User ID {user_id} approved.")
+    return {"message": f"Tài khoản ID {user_id} đã được phê duyệt thành công."}
 
-            user['is_approved'] = True
-            logger.info(f"User ID {user_id} approved.")
-            return {"message": f"Tài khoản ID {user_id} đã được phê duyệt thành công."}
 
-    raise HTTPException(status_code=404, detail="Không tìm thấy người dùng.")
+# ==================== ENDPOINTS KIỂM TRA TÍN CHỈ / GỢI Ý MÔN HỌC ====================
+
+async def run_academic(func: Callable, *args):
+    """Chạy tính toán trên dữ liệu điểm trong academic_executor; thiếu file CSV thì trả 503."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(academic_executor, func, *args)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Không tìm thấy file dữ liệu điểm / chương trình đào tạo.")
+
+
+@app.get("/api/students/{student_id}/audit", tags=["Academic"])
+async def audit_student(student_id: str, user: Dict[str, Any] = Depends(require_user)):
+    """API kiểm tra tín chỉ của một sinh viên và gợi ý các môn cho kỳ tiếp theo (đã đủ môn tiên quyết, giới hạn số tín chỉ).
+    Sinh viên chỉ xem được mã sinh viên của chính mình; giảng viên / quản trị viên xem được mọi sinh viên."""
+    if user["role"] not in AUDIT_ROLES and student_id.strip() != (user["student_id"] or "").strip():
+        raise HTTPException(status_code=403, detail="Bạn chỉ được xem kết quả học tập của chính mình.")
+    result = await run_academic(credit_auditor.audit, student_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy thông tin của sinh viên này.")
+    return result
+
+
+@app.post("/api/students/audit", tags=["Academic"])
+async def audit_cohort(request: CohortAuditRequest, user: Dict[str, Any] = Depends(require_role(*AUDIT_ROLES))):
+    """API kiểm tra tín chỉ cho nhiều sinh viên / cả khoá trong một lần gọi (Dành cho cố vấn học tập: giảng viên / quản trị viên)."""
+    if request.student_ids:
+        student_ids = request.student_ids
+    elif request.cohort:
+        student_ids = await run_academic(credit_auditor.cohort, request.cohort)
+    else:
+        raise HTTPException(status_code=400, detail="Cần student_ids hoặc cohort.")
+    results = await run_academic(credit_auditor.audit_many, student_ids)
+    students = [result for result in results.values() if result is not None]
+    return {
+        "count": len(students),
+        "missing": [student_id for student_id, result in results.items() if result is None],
+        "students": students,
+    }
 
 
 # ==================== ENDPOINTS CHATBOT VÀ ADMIN RAG ====================
@@ -405,47 +1060,185 @@ async def approve_user(user_id: int):
 async def ask_question(request: QuestionRequest) -> Dict[str, Any]:
     if not request.question:
         raise HTTPException(status_code=400, detail="Question is required")
-    state = {"question": request.question, "context": [], "answer": ""}
-    state = retrivel(state)
-    final_state = generate(state)
-    return final_state
+    require_ready()
+    state = {"question": request.question, "context": [], "answer": "", "session_id": request.session_id}
+    state = await aload_conversation(state)
+    state = await aembed_question(state)
+    final_state = await alookup_cached_answer(state)
+    if final_state is None:
+        state = await aretrivel(state)
+        final_state = await agenerate(state)
+        await aremember_answer(final_state)
+    await asave_turn(final_state)
+    return public_state(final_state)
+
+
+@app.post("/ask/stream", tags=["Chatbot"])
+async def ask_question_stream(request: QuestionRequest):
+    """
+    Trả lời dạng Server-Sent Events: event `sources` (các đoạn context) được gửi ngay sau khi truy xuất,
+    tiếp theo là các event `token` khi LLM sinh câu trả lời, kết thúc bằng `done` (hoặc `error`).
+    """
+    if not request.question:
+        raise HTTPException(status_code=400, detail="Question is required")
+    require_ready()
+    state = {"question": request.question, "context": [], "answer": "", "session_id": request.session_id}
+    state = await aload_conversation(state)
+    state = await aembed_question(state)
+    cached_state = await alookup_cached_answer(state)
+    if cached_state is None:
+        state = await aretrivel(state)
+
+    async def event_stream():
+        session_id = state["session_id"]
+        if cached_state is not None:
+            yield sse_event("sources", {"sources": context_sources(cached_state["context"]), "session_id": session_id})
+            yield sse_event("token", {"text": cached_state["answer"]})
+            await asave_turn(cached_state)
+            yield sse_event("done", {"session_id": session_id})
+            return
+        yield sse_event("sources", {"sources": context_sources(state["context"]), "session_id": session_id})
+        answer_parts = []
+        try:
+            async for text in astream_generate(state):
+                answer_parts.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            logger.error(f"Error while streaming answer: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        final_state = {**state, "answer": "".join(answer_parts)}
+        await aremember_answer(final_state)
+        await asave_turn(final_state)
+        yield sse_event("done", {"session_id": session_id})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/sessions/{session_id}", tags=["Chatbot"])
+def get_session(session_id: str):
+    """API lấy toàn bộ lịch sử của một phiên hội thoại (để hiển thị lại khi tải trang)."""
+    if not chat_memory.exists(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "turns": chat_memory.turns(session_id)}
+
+
+@app.delete("/api/sessions/{session_id}", tags=["Chatbot"])
+def delete_session(session_id: str):
+    """API xóa phiên hội thoại (bắt đầu cuộc trò chuyện mới). Hàm thường: FastAPI chạy truy vấn SQLite trong threadpool."""
+    if not chat_memory.delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session deleted"}
 
 
 @app.post("/retrain", tags=["Admin"])
-async def retrain_model_full():
-    """Endpoint để tạo lại toàn bộ Vector Store."""
-    try:
-        retrain_vector_store_full()
-        vector_Hugging.load_vector_store(VECTOR_DB_PATH)
-        return {"message": "Model retrained successfully. Vector store has been updated."}
-    except Exception as e:
-        logger.error(f"Failed to retrain model: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to retrain model: {str(e)}")
+async def retrain_model_full(full: bool = False):
+    """
+    Endpoint cập nhật Vector Store chạy nền: mặc định chỉ index các file thay đổi, `?full=true` để tạo lại toàn bộ.
+    Trả về job ngay lập tức; theo dõi tiến độ qua /api/retrain/jobs/{job_id}.
+    """
+    job = retrain_jobs.submit(full=full)
+    return {"message": "Retrain job queued. Vector store will be swapped when it finishes.", "job": job.to_dict()}
 
 
-@app.post("/uploadfile/", tags=["Admin"])
-async def create_upload_file(file: UploadFile = File(...)):
-    """Endpoint upload file và tự động retrain."""
-    file_location = os.path.join(DOCUMENT_DIR, file.filename)
+@app.get("/api/retrain/jobs", tags=["Admin"])
+async def list_retrain_jobs():
+    """API xem danh sách job train lại gần đây (mới nhất trước)."""
+    return [job.to_dict() for job in retrain_jobs.list()]
+
+
+@app.get("/api/retrain/jobs/{job_id}", tags=["Admin"])
+async def get_retrain_job(job_id: str):
+    """API xem trạng thái và tiến độ của một job train lại."""
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retrain job not found")
+    return job.to_dict()
+
+
+def _indexed_file_hashes() -> Dict[str, str]:
+    """{SHA-256: tên file} của các tài liệu đã index (theo manifest)."""
+    return {entry["hash"]: filename for filename, entry in IndexManifest.load(VECTOR_DB_PATH).files.items()}
+
+
+async def ingest_uploads(files: List[UploadFile]) -> Dict[str, Any]:
+    """Lưu các file upload (stream, có giới hạn kích thước, bỏ qua file trùng) và đưa MỘT job index incremental vào hàng đợi."""
+    if len(files) > UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Tối đa {UPLOAD_MAX_FILES} file mỗi lần tải lên.")
     try:
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        filenames = [safe_filename(file.filename) for file in files]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        logger.info(f"File '{file.filename}' uploaded successfully.")
-        retrain_vector_store_full()
-        vector_Hugging.load_vector_store(VECTOR_DB_PATH)
+    loop = asyncio.get_running_loop()
+    known_hashes = {**await loop.run_in_executor(retrieval_executor, _indexed_file_hashes), **uploaded_hashes}
+    results = []
+    try:
+        for file, filename in zip(files, filenames):
+            try:
+                results.append(await save_upload(file, DOCUMENT_DIR, filename, UPLOAD_MAX_BYTES, known_hashes))
+            except UploadTooLargeError:
+                raise HTTPException(status_code=413,
+                                    detail=f"File '{filename}' vượt quá giới hạn {UPLOAD_MAX_MB:g} MB.")
+            except OSError as e:
+                logger.error(f"Error uploading file {filename}: {e}")
+                raise HTTPException(status_code=500, detail=f"Could not upload file: {str(e)}")
+            finally:
+                await file.close()
+    finally:
+        # Các file đã lưu xong vẫn được index kể cả khi một file sau đó bị từ chối
+        stored = [result.filename for result in results if result.status == STORED]
+        uploaded_hashes.update((result.sha256, result.filename) for result in results if result.status == STORED)
+        job = retrain_jobs.submit(full=False) if stored else None
+
+    skipped = len(results) - len(stored)
+    logger.info(f"Uploaded {len(stored)} file(s) {stored}, skipped {skipped} unchanged/duplicate file(s).")
+    if job is None:
+        message = "No new content uploaded; the index is already up to date."
+    else:
+        message = f"Uploaded {len(stored)} file(s), skipped {skipped}. Indexing job queued."
+    return {"message": message, "files": [result.to_dict() for result in results],
+            "job": job.to_dict() if job else None}
 
-        return {"message": f"File '{file.filename}' uploaded and system updated successfully."}
-    except Exception as e:
-        logger.error(f"Error uploading file {file.filename}: {e}")
-        raise HTTPException(status_code=500, detail=f"Could not upload file: {str(e)}")
+
+@app.post("/uploadfile/", tags=["Admin"])
+async def create_upload_file(file: UploadFile = File(...)):
+    """Endpoint upload một file và đưa job index file mới (incremental) vào hàng đợi."""
+    return await ingest_uploads([file])
+
+
+@app.post("/api/uploads", tags=["Admin"])
+async def create_upload_files(files: List[UploadFile] = File(...)):
+    """Endpoint upload nhiều file một lần; chỉ đưa một job index incremental vào hàng đợi cho cả lô."""
+    return await ingest_uploads(files)
+
+
+@app.get("/api/watcher", tags=["Admin"])
+async def get_watcher_status():
+    """API xem trạng thái theo dõi thư mục dữ liệu (file đang chờ, lần index gần nhất)."""
+    if data_watcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **data_watcher.status()}
+
+
+@app.get("/api/metrics", tags=["Admin"])
+async def get_metrics():
+    """API xem số liệu hiệu năng (độ trễ từng request LLM, số lần retry/lỗi, tỉ lệ hit của cache câu trả lời)."""
+    return {
+        "llm": llm_metrics(),
+        "answer_cache": answer_cache.stats(),
+        "query_embedding_cache": vector_Hugging.embeddings.stats(),
+        "last_embedding_run": vector_Hugging.bulk_embedder.last_stats,
+        "reranker": reranker.stats() if reranker else None,
+        "context": context_assembler.stats(),
+        "credit_audit": credit_auditor.stats(),
+        # Mỗi worker uvicorn trả lời với số liệu của chính nó (pid)
+        "memory": {**process_memory(), "vector_store_mmap": vector_Hugging.mmap},
+    }
 
 
 @app.get("/api/users", tags=["Admin"])
 async def get_approved_users():
     """API lấy danh sách TẤT CẢ các tài khoản đã được phê duyệt (Sửa lỗi 404)."""
-    approved_users = [
-        {"id": u['id'], "fullname": u['fullname'], "email": u['email'], "role": u['role']}
-        for u in fake_db if u['is_approved'] == True
-    ]
-    return approved_users
\ No newline at end of file
+    return await run_auth(user_repo.list_users, True)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Luồng Server-Sent Events của /ask/stream với FakeLLM: thứ tự event và event lỗi."""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+
+import serve
+from core.llm import registry
+from core.cache.semantic_cache import SemanticAnswerCache
+from core.llm.fake_llm import FakeLLM
+from core.rag.memory import ChatMemory
+
+ANSWER = "<p>Học phí năm học 2025-2026 là 15 triệu đồng.</p>"
+CONTEXT = [Document(page_content="Học phí năm học 2025-2026: 15 triệu đồng.", metadata={"source": "data/hoc-phi.pdf"})]
+
+
+class FailingLLM(FakeLLM):
+    """FakeLLM báo lỗi (không tạm thời, nên không retry) sau ``tokens`` token đầu tiên."""
+
+    def __init__(self, tokens: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.tokens = tokens
+
+    async def astream_request(self, prompt):
+        self._record(prompt)
+        for piece in self._pieces()[:self.tokens]:
+            yield piece
+        raise ValueError("API key not valid")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # Không warm-up (model, index): truy xuất trả về context cố định, không cache câu trả lời
+    monkeypatch.setattr(serve, "require_ready", lambda: None)
+    monkeypatch.setattr(serve, "embed_question", lambda state: {
+        **state, "query_embedding": [1.0, 0.0, 0.0, 0.0], "intent": "admission", "filters": {}})
+    monkeypatch.setattr(serve, "retrivel", lambda state: {**state, "context": CONTEXT})
+    monkeypatch.setattr(serve, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(serve, "chat_memory", ChatMemory(db_path=str(tmp_path / "chat.sqlite3")))
+    monkeypatch.setattr(registry, "_clients", {})
+    return TestClient(serve.app)
+
+
+def use_llm(llm) -> None:
+    registry.register_llm(registry.LLM_BACKEND, llm)
+
+
+def stream_events(client: TestClient, **body):
+    response = client.post("/ask/stream", json={"question": "Học phí năm nay là bao nhiêu?", **body})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block.strip():
+            continue
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_events_in_order(client):
+    use_llm(FakeLLM(latency=0, answer=ANSWER))
+    events = stream_events(client)
+    names = [name for name, _ in events]
+    assert names[0] == "sources" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3
+    session_id = events[0][1]["session_id"]
+    assert session_id and events[-1][1]["session_id"] == session_id
+    assert events[0][1]["sources"][0]["source"] == "hoc-phi.pdf"
+    assert "".join(data["text"] for name, data in events if name == "token") == ANSWER
+    # Lượt hỏi đáp được lưu vào phiên
+    assert serve.chat_memory.turns(session_id)[-1]["answer"] == ANSWER
+
+
+def test_session_is_kept(client):
+    use_llm(FakeLLM(latency=0, answer=ANSWER))
+    session_id = stream_events(client)[0][1]["session_id"]
+    events = stream_events(client, question="Còn ngành Cơ khí?", session_id=session_id)
+    assert events[0][1]["session_id"] == session_id
+    assert len(serve.chat_memory.turns(session_id)) == 2
+
+
+@pytest.mark.parametrize("tokens", [0, 2])
+def test_llm_error_ends_stream_with_error_event(client, tokens):
+    use_llm(FailingLLM(tokens=tokens, latency=0, answer=ANSWER))
+    events = stream_events(client)
+    names = [name for name, _ in events]
+    assert names == ["sources"] + ["token"] * tokens + ["error"]
+    assert "API key not valid" in events[-1][1]["detail"]
+    assert serve.chat_memory.turns(events[0][1]["session_id"]) == []
+
+
+def test_cached_answer_is_streamed_without_llm(client, monkeypatch):
+    monkeypatch.setattr(serve, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(serve, "answer_cache", SemanticAnswerCache())
+    llm = FakeLLM(latency=0, answer=ANSWER)
+    use_llm(llm)
+    stream_events(client)
+    events = stream_events(client)
+    assert [name for name, _ in events] == ["sources", "token", "done"]
+    assert events[1][1]["text"] == ANSWER
+    assert llm.calls == 1
+    assert serve.answer_cache.stats()["hits"] == 1
@@ -0,0 +1,35 @@
+"""Ghép chunk liền nhau trong ContextAssembler (core.rag.context)."""
+from langchain_core.documents import Document
+
+from core.rag.context import ContextAssembler
+
+TEXT = "".join(f"Câu số {i} nói về quy chế đào tạo. " for i in range(40))
+
+
+def chunk(start: int, end: int, offset: bool = True) -> Document:
+    metadata = {"source": "so-tay.pdf", "page": 1}
+    if offset:
+        metadata["start_index"] = start
+    return Document(TEXT[start:end], metadata=metadata)
+
+
+def test_overlapping_chunks_merge_by_offset():
+    blocks = ContextAssembler()._merge([chunk(300, 600), chunk(0, 330), chunk(570, 900)])
+    assert len(blocks) == 1
+    assert blocks[0].chunks == 3
+    assert blocks[0].text.startswith(TEXT[:330].strip())
+    assert blocks[0].text.endswith(TEXT[570:900].strip())
+
+
+def test_group_with_missing_start_index_keeps_every_chunk():
+    # Chunk có start nhỏ hơn xếp sau chunk có start lớn hơn không được coi là "đã nằm trong" chunk trước
+    documents = [chunk(300, 600), chunk(0, 330), chunk(570, 900, offset=False)]
+    text = "\n".join(block.text for block in ContextAssembler()._merge(documents))
+    for document in documents:
+        assert document.page_content.strip() in text
+
+
+def test_group_without_start_index_merges_by_text_overlap():
+    blocks = ContextAssembler()._merge([chunk(0, 330, offset=False), chunk(300, 600, offset=False)])
+    assert len(blocks) == 1
+    assert blocks[0].text == TEXT[:600].strip()
@@ -0,0 +1,72 @@
+"""Stream Gemini qua LLMClient: bỏ qua chunk không có text, retry lỗi tạm thời rồi chuyển sang request thường."""
+import asyncio
+
+import pytest
+
+from benchmarks.bench_llm_retry import ANSWER, Chunk, ScriptedModel, ServiceUnavailable
+from core.llm.gemini_llm import LLM
+from core.llm.registry import LLMClient
+
+FULL_ANSWER = "".join(chunk.text for chunk in ANSWER)
+
+
+def gemini_client(steps, max_retries: int = 2):
+    llm = LLM(configure=False)
+    llm.llm = model = ScriptedModel(steps)
+    return LLMClient("gemini", llm, max_retries=max_retries, backoff_base=0.001), model
+
+
+async def collect_async(client: LLMClient) -> str:
+    return "".join([text async for text in client.astream_request("prompt")])
+
+
+def collect(client: LLMClient, use_async: bool) -> str:
+    return asyncio.run(collect_async(client)) if use_async else "".join(client.stream_request("prompt"))
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def use_async(request):
+    return request.param
+
+
+def test_chunks_without_text_are_skipped(use_async):
+    chunks = [Chunk("<p>Một phần</p>"), Chunk(finish_reason=3), Chunk(block_reason="SAFETY"), Chunk(finish_reason=1)]
+    client, model = gemini_client([chunks])
+    assert collect(client, use_async) == "<p>Một phần</p>"
+    assert model.calls == ["stream"]
+
+
+def test_transient_error_is_retried(use_async):
+    client, model = gemini_client([ServiceUnavailable("503"), ANSWER])
+    assert collect(client, use_async) == FULL_ANSWER
+    assert model.calls == ["stream", "stream"]
+    assert client.metrics.snapshot()["retries"] == 1
+
+
+def test_falls_back_to_single_request_after_retries(use_async):
+    client, model = gemini_client([ServiceUnavailable("503")] * 3 + ["<p>Câu trả lời đầy đủ</p>"])
+    assert collect(client, use_async) == "<p>Câu trả lời đầy đủ</p>"
+    assert model.calls == ["stream"] * 3 + ["request"]
+    metrics = client.metrics.snapshot()
+    assert (metrics["retries"], metrics["fallbacks"], metrics["errors"]) == (2, 1, 0)
+
+
+def test_failed_fallback_raises_stream_error(use_async):
+    client, model = gemini_client([ServiceUnavailable("503")] * 4)
+    with pytest.raises(ServiceUnavailable):
+        collect(client, use_async)
+    assert model.calls == ["stream"] * 3 + ["request"]
+    assert client.metrics.snapshot()["errors"] == 1
+
+
+@pytest.mark.parametrize("steps,error", [
+    ([ValueError("API key not valid")], ValueError),
+    ([[ANSWER[0], ServiceUnavailable("503")]], ServiceUnavailable),
+], ids=["not-transient", "after-first-chunk"])
+def test_no_retry(use_async, steps, error):
+    client, model = gemini_client(steps)
+    with pytest.raises(error):
+        collect(client, use_async)
+    assert model.calls == ["stream"]
+    metrics = client.metrics.snapshot()
+    assert (metrics["retries"], metrics["fallbacks"]) == (0, 0)
@@ -0,0 +1,96 @@
+"""Định tuyến intent (core.rag.intent) trên bộ câu hỏi gán nhãn, với bảng định tuyến mặc định."""
+import json
+from pathlib import Path
+
+import pytest
+
+from core.rag.intent import DEFAULT_ROUTES, GENERAL, IntentClassifier
+
+LABELS = Path(__file__).resolve().parent.parent / "benchmarks" / "intent_questions.jsonl"
+
+# (câu hỏi, intent mong đợi)
+LABELED_QUESTIONS = [
+    ("Điểm trung bình học kỳ được tính như thế nào?", "student"),
+    ("diem trung binh hoc ky tinh the nao", "student"),
+    ("Tra cứu kết quả học tập theo mã số sinh viên", "student"),
+    ("Thời khóa biểu lớp K58 học kỳ 2", "student"),
+    ("thoi khoa bieu lop k58", "student"),
+    ("Học phí ngành Kỹ thuật máy tính là bao nhiêu?", "admission"),
+    ("hoc phi nganh ky thuat may tinh bao nhieu", "admission"),
+    ("Điểm chuẩn ngành Kỹ thuật điện năm 2024", "admission"),
+    ("Trường tuyển sinh những khối nào?", "admission"),
+    ("Khối A00 gồm những môn nào?", "admission"),
+    ("Trường ở đâu?", GENERAL),
+    ("Xin chào", GENERAL),
+    # "khoa" (khoa Điện) không phải "khóa"; "mã số" không phải "mã số sinh viên"
+    ("Trưởng khoa Điện là ai?", GENERAL),
+    ("truong khoa dien la ai", GENERAL),
+    ("Mã số thuế của trường", GENERAL),
+    # "điều kiện", "đào tạo", "thời gian", "đăng ký" không thuộc intent nào
+    ("Điều kiện tốt nghiệp là gì", GENERAL),
+    ("Liên hệ phòng đào tạo", GENERAL),
+    ("Thời gian nghỉ Tết", GENERAL),
+    # "khỏi" bỏ dấu trùng "khối", nhưng "khối" chỉ khớp dạng có dấu
+    ("Làm sao để khỏi bị trừ lương?", GENERAL),
+]
+
+# (câu hỏi, intent khi exclusive=True, intent khi exclusive=False)
+MIXED_QUESTIONS = [
+    ("Học phí của sinh viên năm nhất là bao nhiêu?", GENERAL, "admission"),
+    ("hoc phi cua sinh vien nam nhat", GENERAL, "admission"),
+    ("Sinh viên ngành Điện học kỳ 2 học những gì?", GENERAL, "student"),
+    ("Lớp ngành Cơ khí có bao nhiêu sinh viên?", GENERAL, "student"),
+    ("Sinh viên ngành Điện", GENERAL, GENERAL),
+    ("Điểm chuẩn ngành Kỹ thuật điện năm 2024", "admission", "admission"),
+    ("Điểm thi học kỳ của sinh viên", "student", "student"),
+]
+
+
+class FixedEmbeddings:
+    """Embedding giả: mỗi intent một trục, để kiểm tra nhánh fallback embedding."""
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] if text in DEFAULT_ROUTES["student"]["examples"] else [0.0, 1.0] for text in texts]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier()
+
+
+@pytest.mark.parametrize("question,expected", LABELED_QUESTIONS)
+def test_labeled_routing(classifier, question, expected):
+    assert classifier.classify(question).intent == expected
+
+
+@pytest.mark.parametrize("question,exclusive_intent,argmax_intent", MIXED_QUESTIONS)
+def test_mixed_questions(question, exclusive_intent, argmax_intent):
+    assert IntentClassifier(exclusive=True).classify(question).intent == exclusive_intent
+    assert IntentClassifier(exclusive=False).classify(question).intent == argmax_intent
+
+
+def test_labeled_set_has_no_misroutes(classifier):
+    # Câu hỏi chưa nhận ra được thì dùng prompt chung; không được sang intent khác
+    with open(LABELS, "r", encoding="utf-8") as f:
+        labeled = [json.loads(line) for line in f if line.strip()]
+    predicted = [classifier.classify(item["question"]).intent for item in labeled]
+    misrouted = [item["question"] for item, intent in zip(labeled, predicted) if intent not in (item["intent"], GENERAL)]
+    assert misrouted == []
+    correct = sum(intent == item["intent"] for item, intent in zip(labeled, predicted))
+    assert correct / len(labeled) >= 0.9
+
+
+def test_low_keyword_confidence_routes_to_general():
+    routes = {"student": {"keywords": {"sinh viên": 1.0}}, "admission": {"keywords": {"đào tạo": 0.5}}}
+    result = IntentClassifier(routes).classify("Liên hệ phòng đào tạo")
+    assert result.intent == GENERAL
+    assert result.matches == ["dao tao"]
+
+
+def test_embedding_fallback_needs_similarity():
+    routes = {intent: {"examples": route["examples"]} for intent, route in DEFAULT_ROUTES.items()}
+    classifier = IntentClassifier(routes, embeddings=FixedEmbeddings())
+    assert classifier.classify("Câu hỏi bất kỳ", [1.0, 0.0]).intent == "student"
+    assert classifier.classify("Câu hỏi bất kỳ", [0.0, 1.0]).intent == "admission"
+    assert classifier.classify("Câu hỏi bất kỳ", [-1.0, -1.0]).intent == GENERAL
+    assert classifier.classify("Câu hỏi bất kỳ").intent == GENERAL
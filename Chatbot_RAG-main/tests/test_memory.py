@@ -0,0 +1,41 @@
+"""Viết lại câu hỏi tiếp nối cho truy xuất (core.rag.memory.rewrite_question)."""
+import pytest
+
+from core.rag.memory import Conversation, rewrite_question
+
+PREVIOUS = "Học phí ngành Cơ khí là bao nhiêu?"
+
+FOLLOW_UPS = [
+    "Còn ngành Điện?",
+    "Nó học mấy năm?",
+    "Còn học phí thì sao, có thay đổi theo từng năm học không?",
+    "Thế còn ngành Kỹ thuật máy tính học mấy năm?",
+]
+
+# Câu hỏi dài có "còn", "vậy", "trên", "đó" ở giữa câu vẫn là câu hỏi độc lập
+STANDALONE = [
+    "Điều kiện để được xét học bổng khuyến khích học tập là gì vậy?",
+    "Sinh viên còn nợ học phần thì có được xét tốt nghiệp không?",
+    "Quy định về điểm rèn luyện nêu trên áp dụng cho khóa nào?",
+    "Trong học kỳ đó sinh viên được đăng ký tối đa bao nhiêu tín chỉ?",
+]
+
+
+@pytest.fixture
+def conversation():
+    return Conversation("session", recent=[(PREVIOUS, "<p>...</p>")])
+
+
+@pytest.mark.parametrize("question", FOLLOW_UPS)
+def test_follow_up_is_prefixed_with_previous_question(conversation, question):
+    assert rewrite_question(question, conversation) == f"{PREVIOUS} {question}"
+
+
+@pytest.mark.parametrize("question", STANDALONE)
+def test_standalone_question_is_unchanged(conversation, question):
+    assert rewrite_question(question, conversation) == question
+
+
+def test_without_history_question_is_unchanged():
+    assert rewrite_question("Còn ngành Điện?", None) == "Còn ngành Điện?"
+    assert rewrite_question("Còn ngành Điện?", Conversation("session")) == "Còn ngành Điện?"
@@ -7,8 +7,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader, CSVLoader, \
-    UnstructuredExcelLoader
 from pathlib import Path
 import logging
 
@@ -16,6 +14,8 @@ import logging
 from core.embeding.HuggingEmbed import HuggingEmbed
 from core.chunking.fixsize_chunks import ProcessData
 from core.llm.gemini_llm import LLM
+from core.chunking.document_loader import TEXT_EXTENSIONS, TABULAR_EXTENSIONS, load_files_parallel
+from core.rag.intent import IntentClassifier
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,6 +27,7 @@ api_key = os.getenv("Gemini_api_key")
 
 DOCUMENT_DIR = "data"
 VECTOR_DB_PATH = "vectordb"
+LOADER_TIMEOUT = float(os.getenv("LOADER_TIMEOUT", "300"))
 
 # Tạo thư mục data nếu chưa tồn tại
 os.makedirs(DOCUMENT_DIR, exist_ok=True)
@@ -48,33 +49,21 @@ def load_documents_from_dir(directory: str) -> List[Document]:
         logger.warning(f"Directory {directory} does not exist. Please create it and add your documents.")
         return all_documents
 
-    for filename in os.listdir(directory):
+    file_paths = []
+    for filename in sorted(os.listdir(directory)):
         file_path = os.path.join(directory, filename)
 
         if os.path.isdir(file_path):
             continue
 
-        logger.info(f"Loading file: {filename}")
-
-        loader = None
-        if filename.lower().endswith(".csv"):
-            loader = CSVLoader(file_path)
-        elif filename.lower().endswith((".xlsx", ".xls")):
-            loader = UnstructuredExcelLoader(file_path, mode="elements")
-        elif filename.lower().endswith(".pdf"):
-            loader = PyPDFLoader(file_path)
-        elif filename.lower().endswith(".txt"):
-            loader = TextLoader(file_path)
-        elif filename.lower().endswith((".docx", ".doc")):
-            loader = Docx2txtLoader(file_path)
-        else:
+        if not filename.lower().endswith(TEXT_EXTENSIONS + TABULAR_EXTENSIONS):
             logger.info(f"Skipping unsupported file type: {filename}")
             continue
+        file_paths.append(file_path)
 
-        try:
-            all_documents.extend(loader.load())
-        except Exception as e:
-            logger.error(f"Error loading {filename}: {e}")
+    # Load song song bằng process pool; file lỗi/quá thời gian chỉ bị bỏ qua, không ảnh hưởng file khác
+    for file_path, documents in load_files_parallel(file_paths, timeout=LOADER_TIMEOUT, include_tabular=True):
+        all_documents.extend(documents)
     return all_documents
 
 
@@ -141,20 +130,24 @@ def retrivel(state: State) -> State:
     return {**state, "context": similarity_search}
 
 
+# Automaton từ khóa dựng một lần, không quét lại danh sách từ khóa ở mỗi request
+student_keywords = ["sinh viên", "mã số", "điểm", "kết quả học tập", "học sinh", "thời khóa biểu", "khóa", "lớp",
+                    "đồ án"]
+admission_keywords = ["tuyển sinh", "ngành", "chuyên ngành", "đăng ký", "học phí", "thời gian", "điều kiện",
+                      "đào tạo", "chỉ tiêu"]
+intent_classifier = IntentClassifier({
+    "student": {"keywords": dict.fromkeys(student_keywords, 1.0)},
+    "admission": {"keywords": dict.fromkeys(admission_keywords, 1.0)},
+})
+
+
 def generate(state: State):
     llm = LLM(api_key=api_key)
     context_text = "\n".join([doc.page_content for doc in state['context']])
 
-    student_keywords = ["sinh viên", "mã số", "điểm", "kết quả học tập", "học sinh", "thời khóa biểu", "khóa", "lớp",
-                        "đồ án"]
-    admission_keywords = ["tuyển sinh", "ngành", "chuyên ngành", "đăng ký", "học phí", "thời gian", "điều kiện",
-                          "đào tạo", "chỉ tiêu"]
-
-    question_lower = state['question'].lower()
-    is_student_query = any(keyword in question_lower for keyword in student_keywords)
-    is_admission_query = any(keyword in question_lower for keyword in admission_keywords)
+    intent = intent_classifier.classify(state['question']).intent
 
-    if is_student_query and not is_admission_query:
+    if intent == "student":
         prompt = (
             f"Bạn là trợ lý thông tin sinh viên của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. "
             f"Ưu tiên trả lời câu hỏi dựa trên các thông tin từ bảng hoặc file Excel nếu có. "
@@ -162,7 +155,7 @@ def generate(state: State):
             f"Nếu thông tin không liên quan hoặc không đủ để trả lời, hãy nói 'Tôi không tìm thấy thông tin phù hợp về sinh viên này'.\n"
             f"Nội dung được cung cấp:\n{context_text}\n"
             f"Câu hỏi của sinh viên: {state['question']}")
-    elif is_admission_query and not is_student_query:
+    elif intent == "admission":
         prompt = (
             f"Bạn là trợ lý tư vấn tuyển sinh của Trường Đại học Kỹ thuật Công nghiệp, Thái Nguyên. "
             f"Dựa trên nội dung sau, hãy trả lời câu hỏi của người dùng một cách đầy đủ và chính xác. "